@@ -1,30 +1,62 @@
+import asyncio
 import os
+import hashlib
+import shutil
+import tempfile
 from pathlib import Path
+from typing import Iterator, List
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
 from langchain_community.document_loaders import TextLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
 
+from embedding_model import EMBEDDING_MODEL, get_embeddings
+from llm_cache import get_llm_cache, stream_text
+from llm_provider import make_chat_model
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 load_dotenv(BASE_DIR / ".env")
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+VECTOR_CACHE_DIR = BASE_DIR / ".cache" / "faiss"
+
+
+def vector_cache_key(policy_file: Path, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP,
+                     model_name: str = EMBEDDING_MODEL) -> str:
+    digest = hashlib.sha256()
+    digest.update(Path(policy_file).read_bytes())
+    digest.update(f"|{chunk_size}|{chunk_overlap}|{model_name}".encode("utf-8"))
+    return digest.hexdigest()[:32]
+
 
 class ComplianceChatbot:
 
-    def __init__(self, policy_file: str | Path = None):
+    def __init__(
+        self,
+        policy_file: str | Path = None,
+        cache_dir: str | Path | None = VECTOR_CACHE_DIR,
+        embeddings: Embeddings | None = None,
+    ):
 
         self.policy_file = Path(policy_file) if policy_file else BASE_DIR / "data" / "politica_compliance.txt"
+        self.cache_dir = Path(cache_dir) if cache_dir else None
         self.llm = None
         self.retriever = None
         self.qa_chain = None
-        
-        self.load_documents()
+        self.documents = None
+        self.embeddings = embeddings or get_embeddings()
+        self.cache = get_llm_cache("policy", (self.policy_file,))
+
+        if not self.policy_file.exists():
+            raise FileNotFoundError(f"Arquivo de política não encontrado: {self.policy_file}")
+
         self.setup_embeddings()
         self.setup_llm()
         self.create_chain()
@@ -38,27 +70,60 @@ class ComplianceChatbot:
         documents = loader.load()
 
         text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=100,
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP,
         )
         self.documents = text_splitter.split_documents(documents)
     
     def setup_embeddings(self):
-        
-        embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2"
-        )
-        
-        self.vector_store = FAISS.from_documents(self.documents, embeddings)
+
+        self.vector_store = self._load_cached_index()
+        if self.vector_store is None:
+            self.load_documents()
+            self.vector_store = FAISS.from_documents(self.documents, self.embeddings)
+            self._save_cached_index()
+
         self.retriever = self.vector_store.as_retriever(search_kwargs={"k": 3})
     
+    def _cache_path(self) -> Path | None:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / vector_cache_key(self.policy_file)
+
+    def _load_cached_index(self):
+        path = self._cache_path()
+        if path is None or not (path / "index.faiss").exists():
+            return None
+        try:
+            # O índice é gerado localmente por _save_cached_index.
+            return FAISS.load_local(str(path), self.embeddings, allow_dangerous_deserialization=True)
+        except Exception:
+            return None
+
+    def _save_cached_index(self):
+        path = self._cache_path()
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = Path(tempfile.mkdtemp(dir=path.parent))
+            self.vector_store.save_local(str(tmp))
+            try:
+                tmp.rename(path)
+            except OSError:
+                # Outro processo gravou o mesmo índice primeiro.
+                shutil.rmtree(tmp, ignore_errors=True)
+        except OSError:
+            pass
+
     def setup_llm(self):
         
-        self.llm = ChatGroq(
+        self.llm = make_chat_model(
             api_key=GROQ_API_KEY,
             model_name="llama-3.3-70b-versatile",
             temperature=0.2,
             max_tokens=800,
+            cache=self.cache,
         )
     
     def create_chain(self):
@@ -85,7 +150,7 @@ class ComplianceChatbot:
         Se não houver resposta no documento, a saída deve ser apenas:
         Esta informação não está documentada na política de compliance atual. """
         
-        prompt = PromptTemplate(
+        self.prompt = PromptTemplate(
             input_variables=["context", "question"],
             template=template
         )
@@ -94,14 +159,69 @@ class ComplianceChatbot:
             llm=self.llm,
             chain_type="stuff",
             retriever=self.retriever,
-            chain_type_kwargs={"prompt": prompt},
+            chain_type_kwargs={"prompt": self.prompt},
             return_source_documents=True,
         )
     
-    def ask(self, question: str) -> dict:
-       
-        result = self.qa_chain.invoke({"query": question})
+    def ask(self, question: str, docs: List[Document] | None = None) -> dict:
+        """
+        Resposta da chain RetrievalQA. Com `docs` já buscados (`retrieve`, na
+        especulação do orquestrador), só a etapa "stuff" + LLM roda.
+        """
+        cached = self.cache.lookup_answer("policy", question) if self.cache else None
+        if cached is not None:
+            return {"query": question, "result": cached, "source_documents": []}
+
+        if docs is None:
+            result = self.qa_chain.invoke({"query": question})
+        else:
+            answer = self.qa_chain.combine_documents_chain.invoke({"input_documents": docs, "question": question})
+            result = {"query": question, "result": answer["output_text"], "source_documents": docs}
+        if self.cache:
+            self.cache.update_answer("policy", question, result["result"])
         return result
+
+    def retrieve(self, question: str) -> List[Document]:
+        """Trechos da política para a pergunta (sem LLM); usado na especulação do orquestrador."""
+        return self.retriever.invoke(question)
+
+    async def aask(self, question: str, docs: List[Document] | None = None) -> dict:
+        """
+        Versão async de `ask`: a chain usa o retriever async e `ainvoke` no
+        LLM; o cache semântico (embedding da pergunta) roda numa thread.
+        """
+        cached = await asyncio.to_thread(self.cache.lookup_answer, "policy", question) if self.cache else None
+        if cached is not None:
+            return {"query": question, "result": cached, "source_documents": []}
+
+        if docs is None:
+            result = await self.qa_chain.ainvoke({"query": question})
+        else:
+            answer = await self.qa_chain.combine_documents_chain.ainvoke({"input_documents": docs, "question": question})
+            result = {"query": question, "result": answer["output_text"], "source_documents": docs}
+        if self.cache:
+            await asyncio.to_thread(self.cache.update_answer, "policy", question, result["result"])
+        return result
+
+    def stream(self, question: str) -> Iterator[str]:
+        """
+        Mesma resposta de `ask`, token a token. Monta o prompt como a chain
+        "stuff" (trechos separados por linha em branco), então compartilha o
+        cache exato com `ask`.
+        """
+        cached = self.cache.lookup_answer("policy", question) if self.cache else None
+        if cached is not None:
+            yield cached
+            return
+
+        docs = self.retriever.invoke(question)
+        context = "\n\n".join(doc.page_content for doc in docs)
+        parts = []
+        for token in stream_text(self.llm, self.prompt.format(context=context, question=question)):
+            parts.append(token)
+            yield token
+        if self.cache:
+            self.cache.update_answer("policy", question, "".join(parts))
     
     def answer(self, result: dict):
 
@@ -1,21 +1,130 @@
+import asyncio
 import os
 import re
 import json
+import threading
+import unicodedata
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterator, List, Optional, Set, Tuple
 from dateutil import parser as dateparser
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
+
+from email_retrieval import EmailRetriever, get_email_retriever
+from llm_cache import get_llm_cache, stream_text
+from llm_provider import make_chat_model
+from speculation import Speculation, SpeculationStats, atake, default_speculative, take
+from token_budget import TokenCounter, get_token_counter
 
 load_dotenv()
 
-EMAIL_PATH = "../data/emails_internos.txt"
+BASE_DIR = Path(__file__).resolve().parent.parent
+EMAIL_PATH = BASE_DIR / "data" / "emails_internos.txt"
+EMAIL_SEPARATOR = "-------------------------------------------------------------------------------"
+
+DEFAULT_TOKEN_BUDGET = 6000
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_TOP_K = 20
+MIN_EMAIL_TOKENS = 500
+NO_EVIDENCE = "Não há evidências de conspiração contra Toby nos e-mails fornecidos."
+INVALID_QUESTION = "Este chatbot só responde perguntas relacionadas à investigação de conspiração contra Toby."
+
+
+def default_token_budget() -> int:
+    """Tokens por chamada de análise (prompt + e-mails)."""
+    return int(os.getenv("CONSPIRACY_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET))
+
+
+def default_top_k() -> int:
+    """E-mails recuperados por busca semântica a cada pergunta."""
+    return int(os.getenv("CONSPIRACY_TOP_K", DEFAULT_TOP_K))
+
+
+def default_max_concurrency() -> int:
+    """Chamadas simultâneas ao LLM na fase map."""
+    return int(os.getenv("CONSPIRACY_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY))
+
+
+@dataclass(frozen=True)
+class EmailRecord:
+    sender: str
+    to: str
+    date: Optional[str]
+    subject: str
+    body: str
+    raw: str
+    timestamp: Optional[datetime] = None
+    relevant: bool = False
+
+    def to_dict(self) -> Dict:
+        return {
+            "from": self.sender,
+            "to": self.to,
+            "date": self.date,
+            "subject": self.subject,
+            "body": self.body,
+            "raw": self.raw,
+        }
+
+    def to_prompt(self) -> str:
+        """Uma linha de cabeçalho e o corpo numa linha só, sem `raw` nem endereços."""
+        when = self.timestamp.strftime("%Y-%m-%d %H:%M") if self.timestamp else (self.date or "?")
+        body = " ".join(_strip_quoted(self.body).split())
+        return (
+            f"De: {_display_names(self.sender)} | Para: {_display_names(self.to)} | {when}"
+            f" | Assunto: {self.subject}\n{body}"
+        )
+
+
+def _display_names(field: str) -> str:
+    """'Michael Scott <michael.scott@...>, Dwight ...' -> 'Michael Scott, Dwight ...'."""
+    names = [re.sub(r"\s*<[^>]*>", "", part).strip() for part in field.split(",")]
+    return ", ".join(n for n in names if n)
+
+
+_QUOTE_HEADER = re.compile(r"^\s*(Em .+ escreveu:|On .+ wrote:|-{3,}\s*Mensagem original)", re.IGNORECASE)
+
 
-def read_email_file():
-    with open(EMAIL_PATH, "r", encoding="utf-8") as f:
+def _strip_quoted(body: str) -> str:
+    """Remove o histórico citado de respostas/encaminhamentos."""
+    lines = []
+    for line in body.splitlines():
+        if _QUOTE_HEADER.match(line):
+            break
+        if not line.lstrip().startswith(">"):
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def _is_relevant_raw(raw: str) -> bool:
+    raw = raw.lower()
+
+    if "para: toby flenderson" in raw or "toby.flenderson@" in raw:
+        return False
+
+    if "toby" in raw or "flenderson" in raw:
+        return True
+
+    return False
+
+
+def is_relevant_email(e):
+    return _is_relevant_raw(e["raw"])
+
+
+def read_email_file(path=None):
+    with open(path or EMAIL_PATH, "r", encoding="utf-8") as f:
         return f.read()
 
 
-def parse_emails(raw):
-    blocks = raw.split("-------------------------------------------------------------------------------")
+def parse_emails(raw) -> List[Dict]:
+    return [e.to_dict() for e in parse_email_records(raw)]
+
+
+def parse_email_records(raw) -> List[EmailRecord]:
+    blocks = raw.split(EMAIL_SEPARATOR)
     emails = []
 
     for block in blocks:
@@ -40,67 +149,259 @@ def parse_emails(raw):
         except:
             timestamp = None
 
-        emails.append({
-            "from": sender,
-            "to": to,
-            "date": timestamp.isoformat() if timestamp else None,
-            "subject": subject,
-            "body": body,
-            "raw": b,
-        })
+        emails.append(EmailRecord(
+            sender=sender,
+            to=to,
+            date=timestamp.isoformat() if timestamp else None,
+            subject=subject,
+            body=body,
+            raw=b,
+            timestamp=timestamp,
+            relevant=_is_relevant_raw(b),
+        ))
 
     return emails
 
-def get_all_emails():
-    return parse_emails(read_email_file())
 
+def _parse_target_date(date_str) -> Optional[date]:
+    try:
+        return dateparser.parse(date_str).date()
+    except:
+        return None
+
+
+class EmailIndex:
+    """
+    Índices secundários sobre um snapshot imutável dos e-mails.
+    Os conjuntos guardam posições em `emails`, então filtros combinados
+    viram interseções de sets.
+    """
+
+    def __init__(self, emails: Tuple[EmailRecord, ...]):
+        self.emails = emails
+        self.by_sender: Dict[str, Set[int]] = {}
+        self.by_recipient: Dict[str, Set[int]] = {}
+        self.by_date: Dict[date, Set[int]] = {}
+        self.relevant: FrozenSet[int] = frozenset(
+            i for i, e in enumerate(emails) if e.relevant
+        )
 
-def get_all_people():
-    pessoas = set()
-    for e in get_all_emails():
-        nome = e["from"].strip()
-        if nome:
-            pessoas.add(nome)
-    return sorted(list(pessoas))
+        for i, e in enumerate(emails):
+            self.by_sender.setdefault(e.sender.lower(), set()).add(i)
+            for recipient in e.to.split(","):
+                recipient = recipient.strip().lower()
+                if recipient:
+                    self.by_recipient.setdefault(recipient, set()).add(i)
+            if e.timestamp:
+                self.by_date.setdefault(e.timestamp.date(), set()).add(i)
+
+    @staticmethod
+    def _lookup(table: Dict[str, Set[int]], name: str) -> Set[int]:
+        # Busca parcial ("dwight" casa "Dwight Schrute <...>") sobre as chaves
+        # distintas, que crescem com o número de pessoas e não de e-mails.
+        # Uma chave igual ao nome não encerra a busca: "michael" também casa
+        # "michael scott <...>", como no filtro original.
+        needle = (name or "").lower()
+        if not needle:
+            return set()
+        result: Set[int] = set()
+        for key, ids in table.items():
+            if needle in key:
+                result |= ids
+        return result
+
+    def ids_by_person(self, name) -> Set[int]:
+        return self._lookup(self.by_sender, name)
+
+    def ids_by_recipient(self, name) -> Set[int]:
+        return self._lookup(self.by_recipient, name)
+
+    def ids_by_date(self, date_str) -> Set[int]:
+        target = _parse_target_date(date_str)
+        if target is None:
+            return set()
+        return set(self.by_date.get(target, ()))
+
+    def records(self, ids) -> List[EmailRecord]:
+        return [self.emails[i] for i in sorted(ids)]
+
+    def people(self) -> List[str]:
+        return sorted({e.sender.strip() for e in self.emails if e.sender.strip()})
+
+
+class EmailStore:
+    """
+    Mantém o dump de e-mails parseado e indexado em memória.
+    O arquivo só é relido quando mtime ou tamanho mudam.
+    """
+
+    def __init__(self, path=EMAIL_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._index = EmailIndex(())
+
+    def _stat_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
 
+    def _load(self, signature) -> None:
+        if signature is None:
+            emails = ()
+        else:
+            emails = tuple(parse_email_records(read_email_file(self.path)))
+        self._index = EmailIndex(emails)
+        self._signature = signature
 
-def get_emails_by_person(name):
-    emails = get_all_emails()
-    return [e for e in emails if name.lower() in e["from"].lower()]
+    def refresh(self) -> bool:
+        signature = self._stat_signature()
+        if signature == self._signature and self._signature is not None:
+            return False
+        with self._lock:
+            if signature == self._signature and self._signature is not None:
+                return False
+            self._load(signature)
+            return True
 
+    def index(self) -> EmailIndex:
+        self.refresh()
+        return self._index
 
-def get_emails_by_date(date_str):
-    try:
-        target = dateparser.parse(date_str).date()
-    except:
-        return []
+    def emails(self) -> Tuple[EmailRecord, ...]:
+        return self.index().emails
 
-    emails = get_all_emails()
-    result = []
-    for e in emails:
-        if not e["date"]:
-            continue
-        d = dateparser.parse(e["date"]).date()
-        if d == target:
-            result.append(e)
-    return result
 
-def is_relevant_email(e):
-    raw = e["raw"].lower()
+_stores: Dict[Path, EmailStore] = {}
+_stores_lock = threading.Lock()
 
-    if "para: toby flenderson" in raw or "toby.flenderson@" in raw:
-        return False
 
-    if "toby" in raw or "flenderson" in raw:
-        return True
+def get_email_store(path=None) -> EmailStore:
+    key = Path(path or EMAIL_PATH).resolve()
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = EmailStore(key)
+        return store
+
+
+# As funções abaixo devolvem dicts ("from", "to", "date", ...), como antes do
+# EmailStore; os EmailRecord imutáveis ficam dentro do store.
+def get_all_emails() -> List[Dict]:
+    return [e.to_dict() for e in get_email_store().emails()]
+
+
+def get_all_people():
+    return get_email_store().index().people()
+
+
+def get_emails_by_person(name) -> List[Dict]:
+    index = get_email_store().index()
+    return [e.to_dict() for e in index.records(index.ids_by_person(name))]
+
+
+def get_emails_by_recipient(name) -> List[Dict]:
+    index = get_email_store().index()
+    return [e.to_dict() for e in index.records(index.ids_by_recipient(name))]
 
-    return False
+
+def get_emails_by_date(date_str) -> List[Dict]:
+    index = get_email_store().index()
+    return [e.to_dict() for e in index.records(index.ids_by_date(date_str))]
 
 
 def filter_relevant(emails):
     return [e for e in emails if is_relevant_email(e)]
 
 
+# Radicais (sem acento) que costumam aparecer em e-mails conspiratórios.
+CONSPIRACY_TERMS = (
+    "toby", "flenderson", "rh", "conspir", "sabot", "plano", "operacao", "secret",
+    "segredo", "apague", "inimigo", "livrar", "demit", "transfer", "espion", "vigi",
+)
+_STOPWORDS = {
+    "alguem", "algum", "alguma", "contra", "esta", "estao", "sobre", "quem", "qual",
+    "quais", "para", "pelo", "pela", "isso", "esse", "essa", "existe", "algo", "toby",
+}
+
+
+def _normalize(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.findall(r"[a-z0-9]+", text)
+
+
+def relevance_score(email: EmailRecord, question_terms: Set[str] = frozenset()) -> int:
+    """Termos conspiratórios e termos da pergunta; o assunto vale o dobro."""
+    score = 0
+    for words, weight in ((_normalize(email.subject), 2), (_normalize(email.body), 1)):
+        for word in words:
+            if word in question_terms:
+                score += 2 * weight
+            elif any(word.startswith(t) for t in CONSPIRACY_TERMS):
+                score += weight
+    return score
+
+
+def dedupe_emails(emails: List[EmailRecord]) -> List[EmailRecord]:
+    """Mantém a primeira ocorrência de cada (remetente, assunto, corpo) e o histórico citado fora."""
+    seen = set()
+    unique = []
+    for e in emails:
+        key = (e.sender.lower(), " ".join(_normalize(e.subject)), " ".join(_normalize(_strip_quoted(e.body))))
+        if key not in seen:
+            seen.add(key)
+            unique.append(e)
+    return unique
+
+
+def rank_emails(emails: List[EmailRecord], question: str = "") -> List[EmailRecord]:
+    terms = {w for w in _normalize(question) if len(w) >= 4 and w not in _STOPWORDS}
+    order = sorted(
+        enumerate(dedupe_emails(emails)),
+        key=lambda item: (-relevance_score(item[1], terms), item[1].timestamp or datetime.max, item[0]),
+    )
+    return [e for _, e in order]
+
+
+def pack_emails(
+    emails: List[EmailRecord],
+    question: str,
+    budget: int,
+    counter: Optional[TokenCounter] = None,
+) -> List[str]:
+    """
+    Divide os e-mails em blocos de até `budget` tokens. Os mais relevantes
+    entram primeiro, então o primeiro bloco é sempre o mais importante; dentro
+    de cada bloco a ordem é cronológica. Um e-mail que sozinho passa do
+    orçamento tem o corpo cortado.
+    """
+    counter = counter or get_token_counter()
+    batches: List[List[Tuple[EmailRecord, str]]] = []
+    current: List[Tuple[EmailRecord, str]] = []
+    used = 0
+    for email in rank_emails(emails, question):
+        text = email.to_prompt()
+        cost = counter.count(text) + 1
+        if cost > budget:
+            text = text[: max(1, len(text) * budget // cost - 3)] + "..."
+            cost = counter.count(text) + 1
+        if current and used + cost > budget:
+            batches.append(current)
+            current, used = [], 0
+        current.append((email, text))
+        used += cost
+    if current:
+        batches.append(current)
+
+    return [
+        "\n\n".join(text for _, text in sorted(batch, key=lambda item: item[0].timestamp or datetime.max))
+        for batch in batches
+    ]
+
+
 INTENT_SYSTEM_PROMPT = """
 Você é um sistema de classificação de intenção especializado em perguntas sobre
 conspiração contra Toby Flenderson.
@@ -184,7 +485,7 @@ REGRAS IMPORTANTES:
 - NÃO use interpretações além do texto literal.
 
 ------------------------------------------------------------
-E-MAILS FORNECIDOS:
+E-MAILS FORNECIDOS (cabeçalho "De | Para | data | Assunto" e, na linha seguinte, o corpo):
 {emails}
 ------------------------------------------------------------
 
@@ -229,87 +530,401 @@ AGORA PRODUZA APENAS A RESPOSTA FINAL.
 """
 
 
+REDUCE_PROMPT = """
+Você é o auditor oficial da Dunder Mifflin. Os e-mails foram analisados em lotes
+e cada lote gerou um resultado parcial no formato "Resultado da Investigação".
+Junte os resultados parciais abaixo em UM único resultado.
+
+REGRAS IMPORTANTES:
+- Use SOMENTE o que está nos resultados parciais.
+- NÃO invente e-mails, pessoas, trechos ou intenções.
+- Una as listas de pessoas sem repetir nomes.
+- Mantenha TODAS as evidências, sem repetir o mesmo trecho, e copie os trechos exatamente como estão.
+
+------------------------------------------------------------
+RESULTADOS PARCIAIS:
+{partials}
+------------------------------------------------------------
+
+Pergunta do usuário:
+{question}
+
+------------------------------------------------------------
+Responda SEGUINDO EXATAMENTE ESTA ESTRUTURA:
+
+### Resultado da Investigação
+- **Conspiração detectada?**: Sim
+
+### Pessoas Envolvidas
+- <pessoas, sem repetição>
+
+### Evidências Encontradas
+- **De:** <remetente> → **Para:** <destinatário>
+  **Trecho:** "<trecho literal>"
+
+### Conclusão Final
+- Uma conclusão curta e objetiva baseada apenas nas evidências acima.
+
+------------------------------------------------------------
+AGORA PRODUZA APENAS A RESPOSTA FINAL.
+"""
+
+
 class ConspiracyChatbot:
 
-    def __init__(self, api_key):
-        self.llm = ChatGroq(
+    def __init__(
+        self,
+        api_key,
+        token_budget: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        retriever: Optional[EmailRetriever] = None,
+        top_k: Optional[int] = None,
+        speculative: Optional[bool] = None,
+    ):
+        self.cache = get_llm_cache("conspiracy", (EMAIL_PATH,))
+        self.llm = make_chat_model(
             api_key=api_key,
             model_name="llama-3.3-70b-versatile",
             temperature=0.2,
+            cache=self.cache,
         )
+        self.token_budget = token_budget or default_token_budget()
+        self.token_counter = get_token_counter()
+        self.max_concurrency = max(1, max_concurrency or default_max_concurrency())
+        self.retriever = retriever or get_email_retriever()
+        self.top_k = top_k or default_top_k()
+        self.speculative = default_speculative() if speculative is None else speculative
+        self.speculation_stats = SpeculationStats()
 
 
     def classify_intent(self, question):
+        return self._parse_intent(self.llm.invoke(self._intent_prompt(question)).content)
+
+    async def aclassify_intent(self, question):
+        return self._parse_intent((await self.llm.ainvoke(self._intent_prompt(question))).content)
+
+    @staticmethod
+    def _intent_prompt(question) -> str:
         people_list = json.dumps(get_all_people(), ensure_ascii=False)
 
         prompt = INTENT_SYSTEM_PROMPT.format(people=people_list)
-        prompt += "\nPergunta do usuário:\n" + question
-
-        raw = self.llm.invoke(prompt).content.strip()
+        return prompt + "\nPergunta do usuário:\n" + question
 
+    @staticmethod
+    def _parse_intent(raw) -> dict:
         try:
-            return json.loads(raw)
+            return json.loads(raw.strip())
         except:
             return {"intent": "invalid", "person": None, "date": None}
 
 
-    def collect_data(self, intent):
+    def collect_data(self, intent, question=None):
+        index = get_email_store().index()
+
+        if question and intent["intent"] in ("general", "by_person", "by_date", "by_person_and_date"):
+            emails = self.retrieve(question, intent, index)
+            if emails is not None:
+                return emails
+
         match intent["intent"]:
 
             case "general":
-                return filter_relevant(get_all_emails())
+                return index.records(index.relevant)
 
             case "all_emails":
-                return filter_relevant(get_all_emails())
+                return index.records(index.relevant)
 
             case "by_person":
-                per = get_emails_by_person(intent["person"])
-                return filter_relevant(per)
+                return index.records(index.ids_by_person(intent["person"]) & index.relevant)
 
             case "by_date":
-                dt = get_emails_by_date(intent["date"])
-                return filter_relevant(dt)
+                return index.records(index.ids_by_date(intent["date"]) & index.relevant)
 
             case "by_person_and_date":
-                per = get_emails_by_person(intent["person"])
-                dt = [e for e in per if e["date"] and dateparser.parse(e["date"]).date() == dateparser.parse(intent["date"]).date()]
-                return filter_relevant(dt)
+                ids = index.ids_by_person(intent["person"]) & index.ids_by_date(intent["date"])
+                return index.records(ids & index.relevant)
 
             case _:
                 return []
 
-    def analyze(self, question, emails):
-        emails_json = json.dumps(emails, ensure_ascii=False, indent=2)
-        prompt = ANALYSIS_PROMPT.format(emails=emails_json, question=question)
-        return self.llm.invoke(prompt).content.strip()
+    def prefetch(self, question) -> Optional[List[EmailRecord]]:
+        """
+        E-mails da intenção "general" (pré-filtro de relevância + busca
+        semântica), sem LLM: é o que a maioria das perguntas vai usar, então
+        roda em paralelo com a classificação quando a especulação está ligada.
+        """
+        return self.collect_data({"intent": "general", "person": None, "date": None}, question)
+
+    def retrieve(self, question, intent, index: EmailIndex) -> Optional[List[EmailRecord]]:
+        """
+        Os `top_k` e-mails semanticamente mais próximos da pergunta, dentro dos
+        filtros de pessoa/data da intenção, cortados para caber num único
+        prompt. None se a busca semântica não está disponível.
+        """
+        candidates = None
+        if intent["intent"] in ("by_person", "by_person_and_date"):
+            candidates = index.ids_by_person(intent["person"])
+        if intent["intent"] in ("by_date", "by_person_and_date"):
+            by_date = index.ids_by_date(intent["date"])
+            candidates = by_date if candidates is None else candidates & by_date
+
+        ids = self.retriever.top_k(question, index.emails, self.top_k, candidates)
+        if ids is None:
+            return None
+
+        budget = self._email_budget(question)
+        emails, used = [], 0
+        for i in ids:
+            cost = self.token_counter.count(index.emails[i].to_prompt()) + 1
+            if emails and used + cost > budget:
+                break
+            emails.append(index.emails[i])
+            used += cost
+        return emails
+
+    def _email_budget(self, question) -> int:
+        overhead = self.token_counter.count(ANALYSIS_PROMPT.format(emails="", question=question))
+        return max(self.token_budget - overhead, MIN_EMAIL_TOKENS)
+
+    def email_batches(self, question, emails) -> List[str]:
+        """E-mails compactados em blocos que cabem, com o prompt, em `token_budget`."""
+        return pack_emails(emails, question, self._email_budget(question), self.token_counter)
 
-    def ask(self, question):
+    def analyze(self, question, emails):
+        batches = self.email_batches(question, emails)
+        if len(batches) == 1:
+            prompt = ANALYSIS_PROMPT.format(emails=batches[0], question=question)
+            return self.llm.invoke(prompt).content.strip()
+        return self.analyze_map_reduce(question, batches)
+
+    async def aanalyze(self, question, emails):
+        batches = self.email_batches(question, emails)
+        if len(batches) == 1:
+            prompt = ANALYSIS_PROMPT.format(emails=batches[0], question=question)
+            return (await self.llm.ainvoke(prompt)).content.strip()
+        return await self.aanalyze_map_reduce(question, batches)
+
+    def analyze_stream(self, question, emails) -> Iterator[str]:
+        """Como analyze, mas a última chamada ao LLM (análise única ou reduce final) sai token a token."""
+        batches = self.email_batches(question, emails)
+        if len(batches) == 1:
+            yield from stream_text(self.llm, ANALYSIS_PROMPT.format(emails=batches[0], question=question))
+            return
+        partials = self._map_reduce_partials(question, batches)
+        if len(partials) == 1:
+            yield partials[0]
+        else:
+            yield from stream_text(self.llm, self._reduce_prompt(question, partials))
+
+    def analyze_map_reduce(self, question, batches: List[str]) -> str:
+        """
+        Map: cada lote é analisado com ANALYSIS_PROMPT, no máximo
+        `max_concurrency` chamadas ao mesmo tempo. Reduce: os resultados com
+        evidências são fundidos numa única "Resultado da Investigação"; se não
+        couberem juntos no orçamento, a fusão é feita em níveis.
+        """
+        partials = self._map_reduce_partials(question, batches)
+        if len(partials) == 1:
+            return partials[0]
+        return self.llm.invoke(self._reduce_prompt(question, partials)).content.strip()
+
+    async def aanalyze_map_reduce(self, question, batches: List[str]) -> str:
+        """Versão async de `analyze_map_reduce`."""
+        partials = await self._amap_reduce_partials(question, batches)
+        if len(partials) == 1:
+            return partials[0]
+        return (await self.llm.ainvoke(self._reduce_prompt(question, partials))).content.strip()
+
+    def _map_reduce_partials(self, question, batches: List[str]) -> List[str]:
+        """Fase map e os níveis de reduce até sobrar um único grupo, que fica para a fusão final."""
+
+        def call(prompt: str) -> str:
+            return self.llm.invoke(prompt).content.strip()
+
+        def reduce(group: List[str]) -> str:
+            return call(self._reduce_prompt(question, group)) if len(group) > 1 else group[0]
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="map-reduce") as pool:
+            answers = list(pool.map(call, (ANALYSIS_PROMPT.format(emails=b, question=question) for b in batches)))
+            partials = [a for a in answers if NO_EVIDENCE not in a]
+            if not partials:
+                return [NO_EVIDENCE]
+            budget = self._reduce_budget(question)
+            while (groups := self._reduce_groups(partials, budget)) is not None:
+                partials = list(pool.map(reduce, groups))
+        return partials
+
+    async def _amap_reduce_partials(self, question, batches: List[str]) -> List[str]:
+        """Versão async de `_map_reduce_partials`."""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def call(prompt: str) -> str:
+            async with semaphore:
+                return (await self.llm.ainvoke(prompt)).content.strip()
+
+        async def reduce(group: List[str]) -> str:
+            return await call(self._reduce_prompt(question, group)) if len(group) > 1 else group[0]
+
+        answers = await asyncio.gather(
+            *(call(ANALYSIS_PROMPT.format(emails=batch, question=question)) for batch in batches)
+        )
+        partials = [a for a in answers if NO_EVIDENCE not in a]
+        if not partials:
+            return [NO_EVIDENCE]
+        budget = self._reduce_budget(question)
+        while (groups := self._reduce_groups(partials, budget)) is not None:
+            partials = await asyncio.gather(*(reduce(group) for group in groups))
+        return partials
+
+    def _reduce_budget(self, question) -> int:
+        overhead = self.token_counter.count(REDUCE_PROMPT.format(partials="", question=question))
+        return max(self.token_budget - overhead, MIN_EMAIL_TOKENS)
+
+    def _reduce_groups(self, partials: List[str], budget: int) -> Optional[List[List[str]]]:
+        """Próximo nível de reduce, ou None quando tudo já cabe na fusão final."""
+        if len(partials) <= 1:
+            return None
+        groups = self._group_partials(partials, budget)
+        if len(groups) == len(partials):
+            # Cada parcial sozinho já enche o orçamento: funde de dois em dois.
+            groups = [partials[i:i + 2] for i in range(0, len(partials), 2)]
+        return groups if len(groups) > 1 else None
+
+    @staticmethod
+    def _reduce_prompt(question, partials: List[str]) -> str:
+        return REDUCE_PROMPT.format(partials="\n\n---\n\n".join(partials), question=question)
+
+    def _group_partials(self, partials: List[str], budget: int) -> List[List[str]]:
+        groups: List[List[str]] = []
+        used = 0
+        for partial in partials:
+            cost = self.token_counter.count(partial) + 3
+            if groups and used + cost <= budget:
+                groups[-1].append(partial)
+                used += cost
+            else:
+                groups.append([partial])
+                used = cost
+        return groups
+
+    def _prepare(
+        self, question, prefetched: Optional[Future] = None
+    ) -> Tuple[Optional[str], List[EmailRecord], Optional[str]]:
+        """
+        (resposta pronta, e-mails, namespace): a resposta vem pronta quando a
+        pergunta é inválida, não há e-mails ou o cache semântico acertou; senão
+        os e-mails seguem para a análise.
+
+        `prefetched` é um future de `prefetch` já em andamento (especulação
+        do orquestrador); sem ele e com `speculative`, a própria classificação
+        dispara `prefetch`. O resultado só é usado se a intenção for "general".
+        """
+        speculation = self._speculate(question, prefetched)
         intent = self.classify_intent(question)
+        prefetched = self._winner(intent, speculation, prefetched)
 
         if intent["intent"] == "invalid":
-            return "Este chatbot só responde perguntas relacionadas à investigação de conspiração contra Toby."
+            return INVALID_QUESTION, [], None
+
+        emails = take(prefetched)
+        if emails is None:
+            emails = self.collect_data(intent, question)
+        return self._answer_or_emails(intent, question, emails)
+
+    async def _aprepare(
+        self, question, prefetched: Optional[Future] = None
+    ) -> Tuple[Optional[str], List[EmailRecord], Optional[str]]:
+        """
+        Versão async de `_prepare`. A busca nos e-mails e o cache semântico
+        (embeddings, FAISS, SQLite) rodam em threads para não travar o event loop.
+        """
+        speculation = self._speculate(question, prefetched)
+        intent = await self.aclassify_intent(question)
+        prefetched = self._winner(intent, speculation, prefetched)
 
-        emails = self.collect_data(intent)
+        if intent["intent"] == "invalid":
+            return INVALID_QUESTION, [], None
+
+        emails = await atake(prefetched)
+        if emails is None:
+            emails = await asyncio.to_thread(self.collect_data, intent, question)
+        return await asyncio.to_thread(self._answer_or_emails, intent, question, emails)
+
+    def _speculate(self, question, prefetched: Optional[Future]) -> Optional[Speculation]:
+        if prefetched is not None or not self.speculative:
+            return None
+        speculation = Speculation(self.speculation_stats)
+        speculation.start("general", self.prefetch, question)
+        return speculation
+
+    @staticmethod
+    def _winner(intent, speculation: Optional[Speculation], prefetched: Optional[Future]) -> Optional[Future]:
+        if speculation is not None:
+            return speculation.resolve(intent["intent"])
+        if prefetched is not None and intent["intent"] != "general":
+            prefetched.cancel()
+            return None
+        return prefetched
+
+    def _answer_or_emails(
+        self, intent, question, emails: List[EmailRecord]
+    ) -> Tuple[Optional[str], List[EmailRecord], Optional[str]]:
         if not emails:
 
             if intent["intent"] == "by_date":
                 return (
                     f"Não existem e-mails registrados na data {intent['date']}. "
                     "Portanto, não há evidências de conspiração contra Toby nesse dia."
-                )
+                ), [], None
 
             if intent["intent"] == "by_person":
                 pessoa = intent["person"]
                 return (
                     f"Não há qualquer evidência nos e-mails de que {pessoa} "
                     "esteja envolvido(a) em conspiração, sabotagem ou movimentação contra Toby ou o RH."
-                )
-
-            return "Não foram encontradas evidências de conspiração contra Toby nos e-mails disponíveis."
-
-
-
-        return self.analyze(question, emails)
+                ), [], None
+
+            return "Não foram encontradas evidências de conspiração contra Toby nos e-mails disponíveis.", [], None
+
+        # Perguntas parecidas só compartilham resposta se a intenção (pessoa/data) for a mesma.
+        namespace = json.dumps(intent, sort_keys=True, ensure_ascii=False)
+        cached = self.cache.lookup_answer(namespace, question) if self.cache else None
+        return cached, emails, namespace
+
+    def _remember(self, namespace, question, answer) -> None:
+        if self.cache and namespace:
+            self.cache.update_answer(namespace, question, answer)
+
+    def ask(self, question, prefetched: Optional[Future] = None):
+        answer, emails, namespace = self._prepare(question, prefetched)
+        if answer is not None:
+            return answer
+
+        answer = self.analyze(question, emails)
+        self._remember(namespace, question, answer)
+        return answer
+
+    async def aask(self, question, prefetched: Optional[Future] = None):
+        answer, emails, namespace = await self._aprepare(question, prefetched)
+        if answer is not None:
+            return answer
+
+        answer = await self.aanalyze(question, emails)
+        await asyncio.to_thread(self._remember, namespace, question, answer)
+        return answer
+
+    def stream(self, question) -> Iterator[str]:
+        """Mesma resposta de `ask`, em pedaços conforme o LLM gera."""
+        answer, emails, namespace = self._prepare(question)
+        if answer is not None:
+            yield answer
+            return
+
+        parts = []
+        for token in self.analyze_stream(question, emails):
+            parts.append(token)
+            yield token
+        self._remember(namespace, question, "".join(parts).strip())
 
 
 if __name__ == "__main__":
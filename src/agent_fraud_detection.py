@@ -1,26 +1,40 @@
-import csv
+import asyncio
+import hashlib
 import json
 import os
+import re
+import threading
+import unicodedata
 from pathlib import Path
-from typing import List, Dict
+from typing import Iterator, List, Dict, Literal, Tuple
 
+import numpy as np
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
+
+from findings_query import interpretar_consulta
+from findings_store import FINDINGS_REPORT_DB_PATH, FindingsQuery, FindingsStore
+from intent_classifier import EXAMPLES_DIR, LocalIntentClassifier
+from keyword_matcher import KeywordAutomaton
+from llm_cache import get_llm_cache
+from llm_provider import make_chat_model
+from structuring import sliding_window_clusters, vendor_key
+from transaction_table import TransactionTable, iter_csv_chunks, to_ordinal
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 TRANSACTIONS_PATH = BASE_DIR / "data" / "transacoes_bancarias.csv"
 EMAILS_PATH = BASE_DIR / "data" / "emails_internos.txt"
 POLICY_PATH = BASE_DIR / "data" / "politica_compliance.txt"
+EMAIL_SEPARATOR = "-------------------------------------------------------------------------------"
 
 load_dotenv()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
 
-def _to_float(value: str) -> float:
-    try:
-        return float(value)
-    except ValueError:
-        return 0.0
+def regra_id(nome: str) -> str:
+    """Identificador estável de uma regra: 'Armamento/itens táticos' -> 'armamento_itens_taticos'."""
+    nome = unicodedata.normalize("NFKD", nome.lower())
+    nome = "".join(c for c in nome if not unicodedata.combining(c))
+    return re.sub(r"[^a-z0-9]+", "_", nome).strip("_")
 
 
 class FraudDetectionAgent:
@@ -35,11 +49,35 @@ class FraudDetectionAgent:
         transactions_path: Path = TRANSACTIONS_PATH,
         emails_path: Path = EMAILS_PATH,
         policy_path: Path = POLICY_PATH,
+        janela_fracionamento_dias: int = 1,
+        limite_fracionamento: float = 500.0,
+        fracionamento_por_fornecedor: bool = False,
+        carregar_transacoes: bool = True,
+        findings_path: Path = FINDINGS_REPORT_DB_PATH,
     ):
         self.transactions_path = Path(transactions_path)
         self.emails_path = Path(emails_path)
         self.policy_path = Path(policy_path)
 
+        # Fracionamento: janela deslizante por funcionário (1 dia = mesmo dia) e,
+        # opcionalmente, vários funcionários comprando no mesmo fornecedor.
+        self.janela_fracionamento_dias = janela_fracionamento_dias
+        self.limite_fracionamento = limite_fracionamento
+        self.fracionamento_por_fornecedor = fracionamento_por_fornecedor
+        # Com carregar_transacoes=False o ledger não fica em memória e a
+        # auditoria (executar_auditoria, findings_store) é feita por auditar_em_fluxo.
+        self.carregar_transacoes = carregar_transacoes
+        # Banco de achados para consultas filtradas; só é aberto na primeira consulta.
+        self.findings_path = Path(findings_path)
+        self._store: FindingsStore | None = None
+
+        self._cache_lock = threading.RLock()
+        self._cache: Dict[str, object] = {}
+        self._memo_locks: Dict[str, threading.Lock] = {}
+        self._matcher: tuple | None = None
+        self._indice: tuple | None = None
+        self._assinatura_fontes = self._assinatura_arquivos()
+
         self.policy_text = self._ler_politica()
         self.transactions = self._carregar_transacoes()
         self.emails = self._carregar_emails()
@@ -104,29 +142,200 @@ class FraudDetectionAgent:
             },
         ]
 
+        self._indice_transacoes()
+
+    def _assinatura_arquivos(self) -> tuple:
+        sig = []
+        for path in (self.transactions_path, self.emails_path, self.policy_path):
+            try:
+                st = path.stat()
+                sig.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                sig.append(None)
+        return tuple(sig)
+
+    def _assinatura_regras(self) -> str:
+        payload = json.dumps(
+            [
+                self.blacklist_keywords,
+                self.context_rules,
+                self.janela_fracionamento_dias,
+                self.limite_fracionamento,
+                self.fracionamento_por_fornecedor,
+            ],
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def _automato(self) -> KeywordAutomaton:
+        """Autômato único com as palavras-chave de todas as regras; refeito se as regras mudarem."""
+        regras = self._assinatura_regras()
+        if self._matcher is None or self._matcher[0] != regras:
+            keywords = {"hooters", "servidor", "licença"}
+            for kws in self.blacklist_keywords.values():
+                keywords.update(kws)
+            for rule in self.context_rules:
+                keywords.update(rule["email_keywords"])
+                keywords.update(rule["tx_keywords"])
+            self._matcher = (regras, KeywordAutomaton(keywords))
+        return self._matcher[1]
+
+    def _indice_transacoes(self) -> tuple:
+        """
+        Índice invertido palavra-chave -> posições em self.transactions, junto
+        com as palavras-chave encontradas em cada descrição. Refeito quando as
+        transações são recarregadas ou as regras mudam.
+        """
+        automato = self._automato()
+        if self._indice is None or self._indice[0] is not automato or self._indice[1] is not self.transactions:
+            hits_por_tx, postings = self._indexar_tabela(self.transactions, automato)
+            self._indice = (automato, self.transactions, hits_por_tx, postings)
+        return self._indice[2], self._indice[3]
+
+    @staticmethod
+    def _indexar_tabela(table: TransactionTable, automato: KeywordAutomaton) -> tuple:
+        hits_por_tx: List[frozenset] = []
+        postings: Dict[str, List[int]] = {}
+        for pos, desc in enumerate(table.column("descricao")):
+            hits = automato.find(desc.lower())
+            hits_por_tx.append(hits)
+            for kw in hits:
+                postings.setdefault(kw, []).append(pos)
+        return hits_por_tx, postings
+
+    def _validar_cache(self) -> None:
+        """Recarrega as fontes e descarta o cache se arquivos ou regras mudaram."""
+        arquivos = self._assinatura_arquivos()
+        regras = self._assinatura_regras()
+        if arquivos == self._assinatura_fontes and regras == self._cache.get("regras"):
+            return
+        if arquivos != self._assinatura_fontes:
+            self.policy_text = self._ler_politica()
+            self.transactions = self._carregar_transacoes()
+            self.emails = self._carregar_emails()
+            self._assinatura_fontes = arquivos
+        self._indice_transacoes()
+        self._cache = {"regras": regras}
+
+    def _memo(self, key: str, compute):
+        """
+        Valor de `key` no cache, calculado uma vez por versão das fontes.
+        O cálculo roda fora de `_cache_lock`, sob um lock só da chave: uma
+        auditoria fria não trava as consultas já em cache. O resultado só é
+        publicado se o cache não foi descartado enquanto isso.
+        """
+        with self._cache_lock:
+            self._validar_cache()
+            if key in self._cache:
+                return self._cache[key]
+            lock = self._memo_locks.setdefault(key, threading.Lock())
+        with lock:
+            with self._cache_lock:
+                self._validar_cache()
+                cache = self._cache
+                if key in cache:
+                    return cache[key]
+            value = compute()
+            with self._cache_lock:
+                if self._cache is cache:
+                    cache[key] = value
+            return value
+
+    def quebras_diretas(self) -> List[Dict]:
+        if not self.carregar_transacoes:
+            return self._auditoria_em_fluxo()["direct_violations"]
+        return self._memo("direct", self.detectar_quebras_diretas)
+
+    def quebras_contexto(self) -> List[Dict]:
+        if not self.carregar_transacoes:
+            return self._auditoria_em_fluxo()["contextual_flags"]
+        return self._memo("contextual", self.detectar_quebras_contexto)
+
+    def _auditoria_em_fluxo(self) -> Dict[str, List[Dict]]:
+        """Sem o ledger em memória (carregar_transacoes=False), os achados saem de auditar_em_fluxo."""
+
+        def auditar():
+            if self.fracionamento_por_fornecedor:
+                raise ValueError("fracionamento_por_fornecedor exige carregar_transacoes=True.")
+            report: Dict[str, List[Dict]] = {"direct_violations": [], "contextual_flags": []}
+            for tipo, item in self.auditar_em_fluxo():
+                report[tipo].append(item)
+            return report
+
+        return self._memo("fluxo", auditar)
+
+    def relatorio_quebras_diretas(self) -> str:
+        return self._memo("direct_text", lambda: self._formatar_quebras_diretas(self.quebras_diretas()))
+
+    def relatorio_quebras_contexto(self) -> str:
+        return self._memo("contextual_text", lambda: self._formatar_quebras_contexto(self.quebras_contexto()))
+
+    def findings_store(self) -> FindingsStore:
+        """
+        Store de achados sincronizado com a auditoria atual. Só reaudita e
+        regrava quando as fontes ou as regras mudaram desde a última gravação,
+        inclusive entre execuções do processo. A auditoria e a gravação rodam
+        fora de `_cache_lock` (ver `_memo`).
+        """
+
+        def sincronizar():
+            if self._store is None:
+                self._store = FindingsStore(self.findings_path)
+            estado = {
+                "fontes": [str(self.transactions_path), str(self.emails_path), str(self.policy_path)],
+                "assinatura": [list(sig) if sig else None for sig in self._assinatura_fontes],
+                "regras": self._assinatura_regras(),
+                # Em fluxo as flags de contexto saem em outra ordem.
+                "carregar_transacoes": self.carregar_transacoes,
+            }
+            if self._store.estado("auditoria") != estado:
+                self._store.gravar_relatorio(self.executar_auditoria(), estado)
+            return self._store
+
+        return self._memo("store", sincronizar)
+
+    def consultar_achados(self, consulta: FindingsQuery) -> List[Dict]:
+        return self.findings_store().consultar(consulta)
+
+    def interpretar_consulta(self, mensagem: str) -> FindingsQuery:
+        """
+        Filtros da mensagem. Funcionários e anos vêm do ledger em memória, então
+        interpretar não audita nem abre o store; só sem o ledger carregado
+        (carregar_transacoes=False) eles vêm dos achados gravados.
+        """
+        with self._cache_lock:
+            self._validar_cache()
+            labels = self.transactions.labels
+        if labels.get("funcionario"):
+            anos = sorted({int(d[:4]) for d in labels.get("data", []) if d[:4].isdigit()})
+            anos = list(range(anos[0], anos[-1] + 1)) if anos else []
+            return interpretar_consulta(mensagem, sorted(labels["funcionario"]), anos)
+        store = self.findings_store()
+        return interpretar_consulta(mensagem, store.funcionarios(), store.anos())
+
+    def relatorio_consulta(self, consulta: FindingsQuery, limite: int = 50) -> str:
+        return self._formatar_consulta(consulta, self.consultar_achados(consulta), limite)
+
     def _ler_politica(self) -> str:
         if not self.policy_path.exists():
             return ""
         return self.policy_path.read_text(encoding="utf-8")
 
-    def _carregar_transacoes(self) -> List[Dict]:
-        if not self.transactions_path.exists():
-            return []
-
-        with self.transactions_path.open("r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            data = []
-            for row in reader:
-                row["valor"] = _to_float(row.get("valor", "0"))
-                data.append(row)
-            return data
+    def _carregar_transacoes(self) -> TransactionTable:
+        if not self.carregar_transacoes or not self.transactions_path.exists():
+            return TransactionTable.empty()
+        return TransactionTable.from_csv(self.transactions_path)
 
     def _carregar_emails(self) -> List[Dict]:
         if not self.emails_path.exists():
             return []
 
-        raw = self.emails_path.read_text(encoding="utf-8")
-        blocks = raw.split("-------------------------------------------------------------------------------")
+        return self._parse_emails(self.emails_path.read_text(encoding="utf-8"))
+
+    @staticmethod
+    def _parse_emails(raw: str) -> List[Dict]:
+        blocks = raw.split(EMAIL_SEPARATOR)
         emails = []
 
         for block in blocks:
@@ -153,110 +362,323 @@ class FraudDetectionAgent:
             )
         return emails
 
-    def detectar_quebras_diretas(self) -> List[Dict]:
-        findings: List[Dict] = []
-
-        for tx in self.transactions:
-            motivos: List[str] = []
-            desc_lower = tx.get("descricao", "").lower()
-            categoria = tx.get("categoria", "").lower()
-            valor = tx.get("valor", 0)
-
-            if valor > 500:
-                motivos.append("Valor acima de US$500 sem evidência de PO aprovado (Seção 1.3).")
-            if 50 < valor <= 500:
-                motivos.append("Despesa intermediária requer aprovação prévia de gestão (Seção 1.2) — verifique documentação.")
-            if categoria == "diversos" and valor > 5:
-                motivos.append("Categoria 'Diversos' não pode ser usada para valores acima de US$5 (Seção 2).")
-            if "hooters" in desc_lower:
-                motivos.append("Hooters é local restrito e não reembolsável (Seção 2.1).")
-            if categoria == "ti" or "servidor" in desc_lower or "licença" in desc_lower:
-                if valor > 100:
-                    motivos.append("Compras de TI acima de US$100 exigem validação do RH/NY (Seção 2.3).")
-
-            for policy_ref, keywords in self.blacklist_keywords.items():
-                if any(k in desc_lower for k in keywords):
-                    motivos.append(f"Item proibido ou conflito de interesse ({policy_ref}).")
-
-            if motivos:
-                findings.append(
-                    {
-                        "id_transacao": tx.get("id_transacao"),
-                        "data": tx.get("data"),
-                        "funcionario": tx.get("funcionario"),
-                        "descricao": tx.get("descricao"),
-                        "categoria": tx.get("categoria"),
-                        "valor": valor,
-                        "motivos": sorted(set(motivos)),
-                    }
-                )
+    @staticmethod
+    def _mascara_palavras(table: TransactionTable, postings: Dict[str, List[int]], keywords) -> np.ndarray:
+        mask = np.zeros(len(table), dtype=bool)
+        for kw in keywords:
+            mask[postings.get(kw, [])] = True
+        return mask
 
+    def detectar_quebras_diretas(self) -> List[Dict]:
+        _, postings = self._indice_transacoes()
+        findings = [finding for _, finding in self._violacoes_diretas(self.transactions, postings)]
         findings.extend(self._detectar_fracionamento())
         return findings
 
+    def _violacoes_diretas(self, table: TransactionTable, postings: Dict[str, List[int]]) -> List[Tuple[int, Dict]]:
+        """Pares (posição na tabela, achado), em ordem de linha. Não inclui fracionamento."""
+        findings: List[Tuple[int, Dict]] = []
+        if not len(table):
+            return findings
+
+        valor = table.valor
+        diversos = table.mask_in("categoria", lambda c: c.lower() == "diversos")
+        ti = table.mask_in("categoria", lambda c: c.lower() == "ti")
+
+        def palavras(keywords):
+            return self._mascara_palavras(table, postings, keywords)
+
+        # (id da regra, máscara, motivo)
+        regras = [
+            ("po_acima_500", valor > 500, "Valor acima de US$500 sem evidência de PO aprovado (Seção 1.3)."),
+            (
+                "aprovacao_gestao",
+                (valor > 50) & (valor <= 500),
+                "Despesa intermediária requer aprovação prévia de gestão (Seção 1.2) — verifique documentação.",
+            ),
+            (
+                "diversos_acima_5",
+                diversos & (valor > 5),
+                "Categoria 'Diversos' não pode ser usada para valores acima de US$5 (Seção 2).",
+            ),
+            ("hooters", palavras(["hooters"]), "Hooters é local restrito e não reembolsável (Seção 2.1)."),
+            (
+                "ti_acima_100",
+                (ti | palavras(["servidor", "licença"])) & (valor > 100),
+                "Compras de TI acima de US$100 exigem validação do RH/NY (Seção 2.3).",
+            ),
+        ]
+        for policy_ref, keywords in self.blacklist_keywords.items():
+            regras.append(
+                (regra_id(policy_ref), palavras(keywords), f"Item proibido ou conflito de interesse ({policy_ref}).")
+            )
+
+        matriz = np.vstack([mask for _, mask, _ in regras])
+        linhas = np.flatnonzero(matriz.any(axis=0))
+        # Linhas com o mesmo conjunto de regras violadas compartilham a lista de motivos.
+        assinaturas = np.packbits(matriz[:, linhas].T, axis=1)
+        motivos_por_assinatura: Dict[bytes, tuple] = {}
+
+        colunas = {
+            name: table.take(name, linhas)
+            for name in ("id_transacao", "data", "funcionario", "descricao", "categoria", "valor")
+        }
+        for k, (i, assinatura) in enumerate(zip(linhas, assinaturas)):
+            key = assinatura.tobytes()
+            violadas = motivos_por_assinatura.get(key)
+            if violadas is None:
+                por_motivo = {msg: rid for (rid, mask, msg) in regras if mask[i]}
+                motivos = sorted(por_motivo)
+                violadas = motivos_por_assinatura[key] = (motivos, [por_motivo[m] for m in motivos])
+            finding = {name: col[k] for name, col in colunas.items()}
+            finding["motivos"] = list(violadas[0])
+            finding["regras"] = list(violadas[1])
+            findings.append((int(i), finding))
+        return findings
+
+    def _alerta_fracionamento(self, ids: List[str], dias: List[str], funcionario: str, total: float) -> Dict:
+        limite = self.limite_fracionamento
+        janela = self.janela_fracionamento_dias
+        dias = sorted(set(dias))
+        if janela == 1:
+            descricao = f"Múltiplas transações no mesmo dia somando > US${limite:.0f}."
+        else:
+            descricao = f"Múltiplas transações em uma janela de {janela} dias somando > US${limite:.0f}."
+        return {
+            "id_transacao": ", ".join(ids),
+            "data": dias[0] if len(dias) == 1 else f"{dias[0]} a {dias[-1]}",
+            "funcionario": funcionario,
+            "descricao": descricao,
+            "categoria": "Múltiplas",
+            "valor": round(total, 2),
+            "motivos": ["Estruturação suspeita para evitar aprovação de grandes despesas (Seção 1.3)."],
+            "regras": ["fracionamento"],
+        }
+
     def _detectar_fracionamento(self) -> List[Dict]:
-        grouped: Dict[tuple, List[Dict]] = {}
-        for tx in self.transactions:
-            key = (tx.get("funcionario"), tx.get("data"))
-            grouped.setdefault(key, []).append(tx)
+        table = self.transactions
+        if not len(table) or "funcionario" not in table.codes:
+            return []
+
+        limite = self.limite_fracionamento
+        janela = self.janela_fracionamento_dias
+        ids = table.column("id_transacao")
+        datas = table.column("data")
+        funcionarios = table.labels["funcionario"]
 
         alerts = []
-        for (func, date), txs in grouped.items():
-            total = sum(t["valor"] for t in txs)
-            max_single = max(t["valor"] for t in txs)
-            if len(txs) > 1 and total > 500 and max_single < 500:
-                alerts.append(
-                    {
-                        "id_transacao": ", ".join(t["id_transacao"] for t in txs),
-                        "data": date,
-                        "funcionario": func,
-                        "descricao": "Múltiplas transações no mesmo dia somando > US$500.",
-                        "categoria": "Múltiplas",
-                        "valor": round(total, 2),
-                        "motivos": [
-                            "Estruturação suspeita para evitar aprovação de grandes despesas (Seção 1.3)."
-                        ],
-                    }
+        for cluster in sliding_window_clusters(
+            table.codes["funcionario"], table.data_ordinal, table.valor, janela, limite
+        ):
+            rows = cluster.rows
+            alerts.append(
+                self._alerta_fracionamento(
+                    [ids[i] for i in rows], [datas[i] for i in rows], funcionarios[cluster.group], cluster.total
                 )
+            )
+
+        if self.fracionamento_por_fornecedor:
+            fornecedores: Dict[str, int] = {}
+            codigos = np.array(
+                [fornecedores.setdefault(vendor_key(d), len(fornecedores)) for d in table.column("descricao")],
+                dtype=np.int64,
+            )
+            nomes = list(fornecedores)
+            por_funcionario = table.take("funcionario", None)
+            for cluster in sliding_window_clusters(
+                codigos, table.data_ordinal, table.valor, janela, limite,
+                members=table.codes["funcionario"], min_membros=2,
+            ):
+                rows = cluster.rows
+                envolvidos = sorted({por_funcionario[i] for i in rows})
+                alerta = self._alerta_fracionamento(
+                    [ids[i] for i in rows], [datas[i] for i in rows], ", ".join(envolvidos), cluster.total
+                )
+                alerta["descricao"] = (
+                    f"Compras de {len(envolvidos)} funcionários no fornecedor '{nomes[cluster.group]}' "
+                    f"somando > US${limite:.0f} em {janela} dia(s)."
+                )
+                alerta["motivos"] = [
+                    "Possível fracionamento combinado entre funcionários no mesmo fornecedor (Seção 1.3)."
+                ]
+                alerta["regras"] = ["fracionamento_fornecedor"]
+                alerts.append(alerta)
         return alerts
 
-    def detectar_quebras_contexto(self) -> List[Dict]:
-        flags: List[Dict] = []
-        for email in self.emails:
-            content = email.get("raw_lower", "")
+    def _regras_contexto_disparadas(self, emails: List[Dict] | None = None) -> List[Tuple[Dict, Dict, int]]:
+        """
+        (regra, primeiro e-mail que a dispara, quantidade de e-mails), na ordem
+        em que as regras aparecem pela primeira vez nos e-mails.
+        """
+        disparadas: Dict[str, list] = {}
+        automato = self._automato()
+        for email in self.emails if emails is None else emails:
+            hits = automato.find(email.get("raw_lower", ""))
             for rule in self.context_rules:
-                if all(keyword in content for keyword in rule["email_keywords"]):
-                    matches = self._filtrar_transacoes_por_palavras(rule["tx_keywords"])
-                    for tx in matches:
-                        flags.append(
-                            {
-                                "id_transacao": tx.get("id_transacao"),
-                                "data": tx.get("data"),
-                                "funcionario": tx.get("funcionario"),
-                                "descricao": tx.get("descricao"),
-                                "categoria": tx.get("categoria"),
-                                "valor": tx.get("valor"),
-                                "motivo": rule["reason"],
-                                "evidencia_email": email.get("body", "")[:320],
-                                "email_assunto": email.get("subject"),
-                                "email_data": email.get("date"),
-                            }
-                        )
+                if hits.issuperset(rule["email_keywords"]):
+                    if rule["name"] in disparadas:
+                        disparadas[rule["name"]][2] += 1
+                    else:
+                        disparadas[rule["name"]] = [rule, email, 1]
+        return [tuple(item) for item in disparadas.values()]
+
+    def _flags_contexto(
+        self,
+        table: TransactionTable,
+        postings: Dict[str, List[int]],
+        disparadas: List[Tuple[Dict, Dict, int]],
+    ) -> List[Tuple[int, Dict]]:
+        """Pares (posição na tabela, flag), agrupados por regra na ordem de `disparadas`."""
+        flags: List[Tuple[int, Dict]] = []
+        for rule, email, qtd_emails in disparadas:
+            posicoes = set()
+            for kw in rule["tx_keywords"]:
+                posicoes.update(postings.get(kw, ()))
+            for pos in sorted(posicoes):
+                tx = table[pos]
+                flags.append(
+                    (pos, {
+                        "id_transacao": tx.get("id_transacao"),
+                        "data": tx.get("data"),
+                        "funcionario": tx.get("funcionario"),
+                        "descricao": tx.get("descricao"),
+                        "categoria": tx.get("categoria"),
+                        "valor": tx.get("valor"),
+                        "regra": rule["name"],
+                        "motivo": rule["reason"],
+                        "evidencia_email": email.get("body", "")[:320],
+                        "email_assunto": email.get("subject"),
+                        "email_data": email.get("date"),
+                        "qtd_emails": qtd_emails,
+                    })
+                )
         return flags
 
+    def detectar_quebras_contexto(self) -> List[Dict]:
+        """
+        Uma flag por (regra, transação). Quando vários e-mails disparam a mesma
+        regra, a evidência é a do primeiro e `qtd_emails` conta os demais.
+        """
+        _, postings = self._indice_transacoes()
+        flags = self._flags_contexto(self.transactions, postings, self._regras_contexto_disparadas())
+        return [flag for _, flag in flags]
+
     def _filtrar_transacoes_por_palavras(self, keywords: List[str]) -> List[Dict]:
-        result = []
-        for tx in self.transactions:
-            desc_lower = tx.get("descricao", "").lower()
-            if any(k in desc_lower for k in keywords):
-                result.append(tx)
-        return result
+        _, postings = self._indice_transacoes()
+        posicoes = set()
+        for kw in keywords:
+            posicoes.update(postings.get(kw, ()))
+        return [self.transactions[pos] for pos in sorted(posicoes)]
+
+    def auditar_em_fluxo(self, path: Path | None = None, chunk_size: int = 50_000) -> Iterator[Tuple[str, Dict]]:
+        """
+        Auditoria em streaming para ledgers que não cabem em memória.
+
+        Lê o CSV em blocos de `chunk_size` linhas e devolve pares
+        ("direct_violations" | "contextual_flags", item) à medida que são
+        encontrados. Do fracionamento só ficam agregados por (funcionário, dia);
+        uma segunda leitura recupera os IDs dos grupos suspeitos, e esses
+        alertas saem por último. O fracionamento por fornecedor não roda aqui.
+        """
+        path = Path(path) if path else self.transactions_path
+        if not path.exists():
+            return
+
+        automato = self._automato()
+        disparadas = self._regras_contexto_disparadas()
+        agregados: Dict[Tuple[str, str], List[float]] = {}
+
+        for chunk in iter_csv_chunks(path, chunk_size):
+            _, postings = self._indexar_tabela(chunk, automato)
+            for _, finding in self._violacoes_diretas(chunk, postings):
+                yield "direct_violations", finding
+            for _, flag in self._flags_contexto(chunk, postings, disparadas):
+                yield "contextual_flags", flag
+            self._acumular_fracionamento(chunk, agregados)
+
+        cluster_da_chave = self._grupos_fracionamento(agregados)
+        if not cluster_da_chave:
+            return
+        # Segunda leitura: só as linhas dos grupos suspeitos são guardadas.
+        membros: Dict[int, List[tuple]] = {}
+        for c, chunk in enumerate(iter_csv_chunks(path, chunk_size)):
+            self._coletar_membros(chunk, cluster_da_chave, membros, lambda i, c=c: (c, i))
+        for alerta in self._alertas_de_membros(membros):
+            yield "direct_violations", alerta
+
+    def _acumular_fracionamento(self, chunk: TransactionTable, agregados: Dict) -> None:
+        if not len(chunk) or "funcionario" not in chunk.codes or "data" not in chunk.codes:
+            return
+        n_datas = len(chunk.labels["data"])
+        chave = chunk.codes["funcionario"].astype(np.int64) * n_datas + chunk.codes["data"]
+        unicas, inverse = np.unique(chave, return_inverse=True)
+        contagem = np.bincount(inverse)
+        soma = np.bincount(inverse, weights=chunk.valor)
+        grandes = np.bincount(inverse, weights=(chunk.valor >= self.limite_fracionamento).astype(np.float64))
+        funcionarios, datas = chunk.labels["funcionario"], chunk.labels["data"]
+        for k, c, v, g in zip(unicas.tolist(), contagem.tolist(), soma.tolist(), grandes.tolist()):
+            key = (funcionarios[k // n_datas], datas[k % n_datas])
+            acc = agregados.get(key)
+            if acc is None:
+                agregados[key] = [c, v, g]
+            else:
+                acc[0] += c
+                acc[1] += v
+                acc[2] += g
+
+    def _grupos_fracionamento(self, agregados: Dict) -> Dict[Tuple[str, str], int]:
+        """(funcionário, dia) -> número do cluster suspeito, a partir dos agregados diários."""
+        if not agregados:
+            return {}
+
+        chaves = list(agregados)
+        nomes: Dict[str, int] = {}
+        grupos = np.array([nomes.setdefault(f, len(nomes)) for f, _ in chaves], dtype=np.int64)
+        ordinais = np.array([to_ordinal(d) for _, d in chaves], dtype=np.int64)
+        valores = np.array([agregados[k][1] for k in chaves], dtype=np.float64)
+        contagem = np.array([agregados[k][0] for k in chaves], dtype=np.int64)
+        grandes = np.array([agregados[k][2] for k in chaves], dtype=np.float64)
+
+        clusters = sliding_window_clusters(
+            grupos, ordinais, valores, self.janela_fracionamento_dias, self.limite_fracionamento,
+            contagem=contagem, grandes=grandes,
+        )
+        return {chaves[i]: n for n, c in enumerate(clusters) for i in c.rows.tolist()}
+
+    @staticmethod
+    def _coletar_membros(chunk: TransactionTable, cluster_da_chave: Dict, membros: Dict, ordem) -> None:
+        """
+        Acrescenta a `membros[cluster]` as linhas de `chunk` que caem em grupos
+        suspeitos, como (ordem(i), id, funcionário, data, valor). `ordem` dá a
+        posição global da linha e define a ordem final dos alertas.
+        """
+        ids = chunk.column("id_transacao")
+        funcionarios = chunk.column("funcionario")
+        datas = chunk.column("data")
+        valores = chunk.valor.tolist()
+        for i, key in enumerate(zip(funcionarios, datas)):
+            n = cluster_da_chave.get(key)
+            if n is not None:
+                membros.setdefault(n, []).append((ordem(i), ids[i], key[0], key[1], valores[i]))
+
+    def _alertas_de_membros(self, membros: Dict[int, List[tuple]]) -> List[Dict]:
+        alerts = []
+        for linhas in sorted((sorted(linhas) for linhas in membros.values()), key=lambda linhas: linhas[0][0]):
+            alerts.append(
+                self._alerta_fracionamento(
+                    [linha[1] for linha in linhas],
+                    [linha[3] for linha in linhas],
+                    linhas[0][2],
+                    sum(linha[4] for linha in linhas),
+                )
+            )
+        return alerts
 
     def executar_auditoria(self) -> Dict:
         return {
             "policy_path": str(self.policy_path),
-            "direct_violations": self.detectar_quebras_diretas(),
-            "contextual_flags": self.detectar_quebras_contexto(),
+            "direct_violations": self.quebras_diretas(),
+            "contextual_flags": self.quebras_contexto(),
         }
 
     def imprimir_relatorio(self, report: Dict) -> None:
@@ -264,6 +686,32 @@ class FraudDetectionAgent:
         print()
         print(self._formatar_quebras_contexto(report["contextual_flags"]))
 
+    @staticmethod
+    def _linhas_quebra_direta(item: Dict) -> List[str]:
+        lines = [
+            f"- {item['id_transacao']} | {item['data']} | {item['funcionario']} | ${item['valor']:.2f}",
+            f"  Descrição: {item['descricao']}",
+            "  Violações:",
+        ]
+        for motivo in item["motivos"]:
+            lines.append(f"    • {motivo}")
+        lines.append("")
+        return lines
+
+    @staticmethod
+    def _linhas_quebra_contexto(flag: Dict) -> List[str]:
+        lines = [
+            f"- {flag['id_transacao']} | {flag['data']} | {flag['funcionario']} | ${flag['valor']:.2f}",
+            f"  Descrição: {flag['descricao']}",
+            f"  Motivo: {flag['motivo']}",
+            f"  Evidência ({flag['email_data']} - {flag['email_assunto']}):",
+            f"    \"{flag['evidencia_email']}\"",
+        ]
+        if flag.get("qtd_emails", 1) > 1:
+            lines.append(f"  (+{flag['qtd_emails'] - 1} e-mail(s) com a mesma evidência)")
+        lines.append("")
+        return lines
+
     def _formatar_quebras_diretas(self, direct: List[Dict]) -> str:
         if not direct:
             return "Nenhuma quebra direta encontrada nas transações."
@@ -273,14 +721,7 @@ class FraudDetectionAgent:
             "----------------------------------------",
         ]
         for item in direct:
-            lines.append(
-                f"- {item['id_transacao']} | {item['data']} | {item['funcionario']} | ${item['valor']:.2f}"
-            )
-            lines.append(f"  Descrição: {item['descricao']}")
-            lines.append("  Violações:")
-            for motivo in item["motivos"]:
-                lines.append(f"    • {motivo}")
-            lines.append("")
+            lines.extend(self._linhas_quebra_direta(item))
         return "\n".join(lines)
 
     def _formatar_quebras_contexto(self, ctx: List[Dict]) -> str:
@@ -291,14 +732,23 @@ class FraudDetectionAgent:
             "----------------------------------------",
         ]
         for flag in ctx:
-            lines.append(
-                f"- {flag['id_transacao']} | {flag['data']} | {flag['funcionario']} | ${flag['valor']:.2f}"
-            )
-            lines.append(f"  Descrição: {flag['descricao']}")
-            lines.append(f"  Motivo: {flag['motivo']}")
-            lines.append(f"  Evidência ({flag['email_data']} - {flag['email_assunto']}):")
-            lines.append(f"    \"{flag['evidencia_email']}\"")
-            lines.append("")
+            lines.extend(self._linhas_quebra_contexto(flag))
+        return "\n".join(lines)
+
+    def _formatar_consulta(self, consulta: FindingsQuery, achados: List[Dict], limite: int = 50) -> str:
+        if not achados:
+            return f"Nenhuma quebra encontrada para: {consulta.descricao()}."
+        lines = [
+            f"Quebras para {consulta.descricao()}: {len(achados)} achado(s).",
+            "----------------------------------------",
+        ]
+        for item in achados[:limite]:
+            if "motivos" in item:
+                lines.extend(self._linhas_quebra_direta(item))
+            else:
+                lines.extend(self._linhas_quebra_contexto(item))
+        if len(achados) > limite:
+            lines.append(f"... e mais {len(achados) - limite} achado(s). Refine os filtros para ver o restante.")
         return "\n".join(lines)
 
 
@@ -309,7 +759,7 @@ Classifique a mensagem do usuário em UMA das opções:
 - help -> quando pedir ajuda ou como usar.
 - simple -> quando pedir quebras simples/diretas (basta a transação para apontar violação). Inclui termos como "quebra de compliance simples", "fraude simples", "violação direta".
 - complex -> quando pedir quebras complexas/contextuais (precisa cruzar e-mail + transação). Inclui termos como "quebra de compliance complexa", "fraude com e-mail", "precisa olhar e-mails".
-- all -> quando pedir tudo/relatório completo.
+- all -> quando pedir tudo/relatório completo, ou quebras filtradas por funcionário, mês, valor ou regra sem dizer se são simples ou complexas (ex.: "quebras do Dwight acima de 500 em abril").
 - unknown -> qualquer outra coisa.
 
 Definições para o modelo:
@@ -325,35 +775,93 @@ Mensagem: \"{msg}\"
 """
 
 
+FraudIntent = Literal["greeting", "help", "simple", "complex", "all", "unknown"]
+
+
 class FraudChatRouter:
-    def __init__(self, detector: FraudDetectionAgent, model_name: str = "llama-3.3-70b-versatile"):
-        if not GROQ_API_KEY:
-            raise RuntimeError("GROQ_API_KEY não definida no ambiente.")
+    def __init__(
+        self,
+        detector: FraudDetectionAgent,
+        model_name: str = "llama-3.3-70b-versatile",
+        intent_threshold: float | None = None,
+    ):
         self.detector = detector
-        self.llm = ChatGroq(
+        self.llm = make_chat_model(
             api_key=GROQ_API_KEY,
             model_name=model_name,
             temperature=0.0,
+            cache=get_llm_cache("fraud"),
+        )
+        self.intent_classifier = LocalIntentClassifier.from_file(
+            EXAMPLES_DIR / "fraud.jsonl", threshold=intent_threshold
         )
 
     def classificar(self, message: str) -> str:
+        intent = self._classificar_por_palavras(message)
+        if intent is not None:
+            return intent
+        return self.intent_classifier.classify(message, self._classificar_com_llm)
+
+    async def aclassificar(self, message: str) -> str:
+        intent = self._classificar_por_palavras(message)
+        if intent is not None:
+            return intent
+        return await self.intent_classifier.aclassify(message, self._aclassificar_com_llm)
+
+    @staticmethod
+    def _classificar_por_palavras(message: str) -> str | None:
         low = message.lower()
         if "quebra" in low or "fraude" in low or "compliance" in low:
             if "simples" in low or "diret" in low:
                 return "simple"
             if "complex" in low or "email" in low or "contexto" in low:
                 return "complex"
+        return None
 
-        prompt = INTENT_PROMPT.format(msg=message)
-        raw = self.llm.invoke(prompt).content.strip()
+    def _classificar_com_llm(self, message: str) -> str:
+        return self._ler_intencao(self.llm.invoke(INTENT_PROMPT.format(msg=message)).content)
+
+    async def _aclassificar_com_llm(self, message: str) -> str:
+        return self._ler_intencao((await self.llm.ainvoke(INTENT_PROMPT.format(msg=message))).content)
+
+    @staticmethod
+    def _ler_intencao(raw: str) -> str:
         try:
-            data = json.loads(raw)
+            data = json.loads(raw.strip())
             return data.get("intent", "unknown")
         except Exception:
             return "unknown"
 
     def responder(self, message: str) -> str:
-        intent = self.classificar(message)
+        return self.responder_intencao(self.classificar(message), message)
+
+    async def aresponder(self, message: str) -> str:
+        return await self.aresponder_intencao(await self.aclassificar(message), message)
+
+    async def aresponder_intencao(self, intent: FraudIntent, message: str | None = None) -> str:
+        """Relatórios são CPU/disco, sem LLM: rodam numa thread fora do event loop."""
+        return await asyncio.to_thread(self.responder_intencao, intent, message)
+
+    def prefetch(self, intent: FraudIntent) -> None:
+        """
+        Pré-calcula os relatórios da intenção (ficam no cache do detector);
+        usado na especulação do orquestrador.
+        """
+        if intent in ("simple", "all"):
+            self.detector.relatorio_quebras_diretas()
+        if intent in ("complex", "all"):
+            self.detector.relatorio_quebras_contexto()
+
+    def responder_intencao(self, intent: FraudIntent, message: str | None = None) -> str:
+        """
+        Responde a uma intenção já resolvida, sem nova classificação. Se a
+        mensagem trouxer filtros (funcionário, período, valor, regra), a
+        resposta vem do store de achados em vez do relatório completo.
+        """
+        if message and intent in ("simple", "complex", "all"):
+            consulta = self.detector.interpretar_consulta(message)
+            if consulta.tem_filtros():
+                return self.detector.relatorio_consulta(consulta)
 
         if intent == "greeting":
             return (
@@ -365,19 +873,32 @@ class FraudChatRouter:
             return (
                 "Use: 'quebras simples' para violações diretas (só a transação), "
                 "'quebras complexas' para fraudes que exigem cruzar e-mail + transação, "
-                "ou 'mostrar tudo' para o relatório completo."
+                "ou 'mostrar tudo' para o relatório completo. Dá para filtrar por funcionário, "
+                "mês, valor ou regra, por exemplo: 'quebras do Dwight acima de 500 em abril'."
             )
         if intent == "simple":
-            return self.detector._formatar_quebras_diretas(self.detector.detectar_quebras_diretas())
+            return self.detector.relatorio_quebras_diretas()
         if intent == "complex":
-            return self.detector._formatar_quebras_contexto(self.detector.detectar_quebras_contexto())
+            return self.detector.relatorio_quebras_contexto()
         if intent == "all":
-            direct = self.detector.detectar_quebras_diretas()
-            ctx = self.detector.detectar_quebras_contexto()
-            return self.detector._formatar_quebras_diretas(direct) + "\n\n" + self.detector._formatar_quebras_contexto(ctx)
+            return self.detector.relatorio_quebras_diretas() + "\n\n" + self.detector.relatorio_quebras_contexto()
 
         return "Não entendi. Peça por 'quebras simples', 'quebras complexas' ou 'mostrar tudo'."
 
+    def stream(self, message: str) -> Iterator[str]:
+        return self.stream_intencao(self.classificar(message), message)
+
+    def stream_intencao(self, intent: FraudIntent, message: str | None = None) -> Iterator[str]:
+        """
+        As respostas não vêm de um LLM; o relatório completo sai em duas partes
+        para as quebras diretas aparecerem antes de a análise de contexto terminar.
+        """
+        if intent == "all" and not (message and self.detector.interpretar_consulta(message).tem_filtros()):
+            yield self.detector.relatorio_quebras_diretas()
+            yield "\n\n" + self.detector.relatorio_quebras_contexto()
+            return
+        yield self.responder_intencao(intent, message)
+
     def modo_interativo(self) -> None:
         print("AGENTE DE FRAUDES: Quebra de compliance")
         print("Diga oi/ajuda ou pergunte por 'quebras simples' ou 'quebras complexas'.")
@@ -391,10 +912,13 @@ class FraudChatRouter:
             print(self.responder(user))
 
 
-def criar_agente_fraude():
+def criar_roteador_fraude() -> FraudChatRouter:
     detector = FraudDetectionAgent()
-    router = FraudChatRouter(detector)
-    return router.responder
+    return FraudChatRouter(detector)
+
+
+def criar_agente_fraude():
+    return criar_roteador_fraude().responder
 
 
 if __name__ == "__main__":
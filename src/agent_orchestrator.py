@@ -1,9 +1,13 @@
+import asyncio
+import logging
 import os
 from pathlib import Path
 import json
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, Optional
 
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
 
 BASE_DIR = Path(__file__).resolve().parent
 load_dotenv(BASE_DIR / ".env")
@@ -11,7 +15,13 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
 from agent_compliance import ComplianceChatbot
 from agent_conspiracy import ConspiracyChatbot
-from agent_fraud_detection import criar_agente_fraude
+from agent_fraud_detection import FraudChatRouter, criar_roteador_fraude
+from intent_classifier import EXAMPLES_DIR, LocalIntentClassifier
+from llm_cache import get_llm_cache
+from llm_provider import make_chat_model
+from speculation import Speculation, SpeculationStats, atake, default_branches, default_speculative, take
+
+logger = logging.getLogger(__name__)
 
 
 INTENT_PROMPT = """
@@ -21,7 +31,7 @@ Classifique a mensagem do usuário em UMA das opções:
 - conspiracy -> perguntas sobre conspiração contra Toby usando e-mails.
 - fraud_simple -> auditoria de transações que, sozinhas, indicam quebra (sem e-mail). Inclui pedidos como "quebra de compliance simples", "violação direta", "fraude simples".
 - fraud_complex -> auditoria de fraudes que precisam de contexto de e-mail. Inclui pedidos como "quebra de compliance complexa", "fraude com e-mail", "precisa olhar e-mails".
-- fraud_all -> pedir auditoria completa de fraudes (diretas + contexto).
+- fraud_all -> pedir auditoria completa de fraudes (diretas + contexto), inclusive filtrada por funcionário, mês, valor ou regra.
 - greeting/help/other -> saudação ou qualquer outro tema.
 
 Retorne APENAS o JSON:
@@ -32,28 +42,153 @@ Retorne APENAS o JSON:
 Mensagem: \"{msg}\"
 """
 
+HELP_MESSAGE = (
+    "Sou o orquestrador. Peça: política de compliance, conspiração contra Toby, "
+    "quebras simples (fraude direta), quebras complexas (com e-mail) ou relatório completo."
+)
+
+# Intenções do orquestrador já resolvidas, repassadas direto ao agente de fraude.
+FRAUD_INTENTS = {
+    "fraud_simple": "simple",
+    "fraud_complex": "complex",
+    "fraud_all": "all",
+}
+
+
+def _log_warm_up_failure(name: str, future: Future) -> None:
+    # Sem isso a falha some: ninguém espera pelos futures do warm-up. O agente
+    # volta a ser construído (e o erro aparece) na primeira pergunta.
+    error = future.exception()
+    if error is not None:
+        logger.error("Falha ao pré-carregar o agente %r.", name, exc_info=error)
+
 
 class TobyOrchestrator:
     """
     Roteia a pergunta do usuário para o agente correto:
     - policy: RAG sobre política de compliance (ComplianceChatbot)
     - conspiracy: investigação nos e-mails sobre Toby (ConspiracyChatbot)
-    - fraud: detecção de quebras diretas ou com contexto de e-mail (criar_agente_fraude)
+    - fraud: detecção de quebras diretas ou com contexto de e-mail (FraudChatRouter)
+
+    Os agentes são construídos sob demanda, na primeira pergunta que precisa
+    deles. Com warm_up=True todos são construídos em paralelo em background.
+
+    Com speculative=True (ou SPECULATIVE_PREFETCH=1), enquanto o LLM roteador
+    classifica, o trabalho sem LLM das intenções mais prováveis segundo o
+    classificador local já começa (ver speculation.py).
+
+    `factories` troca a construção de um agente pelo nome ("policy",
+    "conspiracy", "fraud"), por exemplo para usar embeddings falsas nos
+    benchmarks.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        warm_up: bool = False,
+        intent_threshold: float | None = None,
+        speculative: bool | None = None,
+        factories: Dict[str, Callable] | None = None,
+    ):
 
-        self.router_llm = ChatGroq(
+        self.router_llm = make_chat_model(
             api_key=GROQ_API_KEY,
             model_name="llama-3.3-70b-versatile",
             temperature=0.0,
+            cache=get_llm_cache("orchestrator"),
+        )
+        self.intent_classifier = LocalIntentClassifier.from_file(
+            EXAMPLES_DIR / "orchestrator.jsonl", threshold=intent_threshold
         )
 
-        self._policy_bot = ComplianceChatbot()
-        self._conspiracy_bot = ConspiracyChatbot(api_key=GROQ_API_KEY)
-        self._fraud_agent = criar_agente_fraude()
+        self._factories: Dict[str, Callable] = {
+            "policy": ComplianceChatbot,
+            "conspiracy": lambda: ConspiracyChatbot(api_key=GROQ_API_KEY),
+            "fraud": criar_roteador_fraude,
+        }
+        unknown = set(factories or ()) - self._factories.keys()
+        if unknown:
+            raise ValueError(f"Agentes desconhecidos: {', '.join(sorted(unknown))}")
+        self._factories.update(factories or {})
+        self._agents: Dict[str, object] = {}
+        self._agent_locks = {name: threading.Lock() for name in self._factories}
+
+        self.speculative = default_speculative() if speculative is None else speculative
+        self.speculation_branches = default_branches()
+        self.speculation_stats = SpeculationStats()
+
+        if warm_up:
+            self.warm_up()
+
+    def _get_agent(self, name: str):
+        agent = self._agents.get(name)
+        if agent is not None:
+            return agent
+        with self._agent_locks[name]:
+            agent = self._agents.get(name)
+            if agent is None:
+                agent = self._factories[name]()
+                self._agents[name] = agent
+            return agent
+
+    def warm_up(self, wait: bool = False) -> Dict[str, Future]:
+        executor = ThreadPoolExecutor(max_workers=len(self._factories), thread_name_prefix="agent-warmup")
+        futures = {name: executor.submit(self._get_agent, name) for name in self._factories}
+        for name, future in futures.items():
+            future.add_done_callback(lambda f, name=name: _log_warm_up_failure(name, f))
+        executor.shutdown(wait=wait)
+        return futures
+
+    def is_ready(self, name: str) -> bool:
+        return name in self._agents
+
+    @property
+    def _policy_bot(self) -> ComplianceChatbot:
+        return self._get_agent("policy")
+
+    @property
+    def _conspiracy_bot(self) -> ConspiracyChatbot:
+        return self._get_agent("conspiracy")
+
+    @property
+    def _fraud_agent(self) -> FraudChatRouter:
+        return self._get_agent("fraud")
+
+    async def _aget_agent(self, name: str):
+        """Como `_get_agent`; a construção (índices, modelos) roda numa thread."""
+        agent = self._agents.get(name)
+        if agent is not None:
+            return agent
+        return await asyncio.to_thread(self._get_agent, name)
+
+    def classify_intent(self, message: str, speculation: Optional[Speculation] = None) -> str:
+        intent = self._keyword_intent(message)
+        if intent is not None:
+            return intent
+        if speculation is None:
+            return self.intent_classifier.classify(message, self._classify_with_llm)
+
+        def classify_speculating(text: str) -> str:
+            # Só especula quando a decisão vai mesmo esperar o LLM.
+            self._speculate(speculation, text)
+            return self._classify_with_llm(text)
+
+        return self.intent_classifier.classify(message, classify_speculating)
 
-    def classify_intent(self, message: str) -> str:
+    async def aclassify_intent(self, message: str, speculation: Optional[Speculation] = None) -> str:
+        intent = self._keyword_intent(message)
+        if intent is not None:
+            return intent
+        if speculation is None:
+            return await self.intent_classifier.aclassify(message, self._aclassify_with_llm)
+
+        async def classify_speculating(text: str) -> str:
+            self._speculate(speculation, text)
+            return await self._aclassify_with_llm(text)
+
+        return await self.intent_classifier.aclassify(message, classify_speculating)
+
+    @staticmethod
+    def _keyword_intent(message: str) -> Optional[str]:
         low = message.lower()
         if "conspira" in low or "toby" in low and "email" in low:
             return "conspiracy"
@@ -62,41 +197,103 @@ class TobyOrchestrator:
                 return "fraud_simple"
             if "complex" in low or "email" in low or "contexto" in low:
                 return "fraud_complex"
-        prompt = INTENT_PROMPT.format(msg=message)
-        raw = self.router_llm.invoke(prompt).content.strip()
+        return None
+
+    def _speculate(self, speculation: Speculation, message: str) -> None:
+        """
+        Dispara o trabalho barato das `speculation_branches` intenções mais
+        prováveis. Agentes ainda não construídos ficam de fora: construí-los
+        não é barato.
+        """
+        for _, intent in self.intent_classifier.ranked(message)[: self.speculation_branches]:
+            if intent == "policy" and self.is_ready("policy"):
+                speculation.start(intent, self._agents["policy"].retrieve, message)
+            elif intent == "conspiracy" and self.is_ready("conspiracy"):
+                speculation.start(intent, self._agents["conspiracy"].prefetch, message)
+            elif intent in FRAUD_INTENTS and self.is_ready("fraud"):
+                speculation.start(intent, self._agents["fraud"].prefetch, FRAUD_INTENTS[intent])
+
+    def _classify_with_llm(self, message: str) -> str:
+        return self._parse_intent(self.router_llm.invoke(INTENT_PROMPT.format(msg=message)).content)
+
+    async def _aclassify_with_llm(self, message: str) -> str:
+        return self._parse_intent((await self.router_llm.ainvoke(INTENT_PROMPT.format(msg=message))).content)
+
+    @staticmethod
+    def _parse_intent(raw: str) -> str:
         try:
-            data = json.loads(raw)
+            data = json.loads(raw.strip())
             return data.get("intent", "other")
         except Exception:
             return "other"
 
+    def _speculation(self) -> Optional[Speculation]:
+        return Speculation(self.speculation_stats) if self.speculative else None
+
     def handle(self, message: str) -> str:
-        intent = self.classify_intent(message)
+        speculation = self._speculation()
+        intent = self.classify_intent(message, speculation)
+        prefetched = speculation.resolve(intent) if speculation else None
 
         if intent == "policy":
-            result = self._policy_bot.ask(message)
+            result = self._policy_bot.ask(message, take(prefetched))
             return result.get("result", "Não encontrei resposta na política.")
 
         if intent == "conspiracy":
-            return self._conspiracy_bot.ask(message)
+            return self._conspiracy_bot.ask(message, prefetched)
 
-        if intent == "fraud_simple":
-            return self._fraud_agent("quebras simples")
+        if intent in FRAUD_INTENTS:
+            agent = self._fraud_agent
+            take(prefetched)
+            return agent.responder_intencao(FRAUD_INTENTS[intent], message)
 
-        if intent == "fraud_complex":
-            return self._fraud_agent("quebras complexas")
+        return HELP_MESSAGE
 
-        if intent == "fraud_all":
-            return self._fraud_agent("mostrar tudo")
+    async def ahandle(self, message: str) -> str:
+        """
+        Versão async de `handle`: enquanto espera o LLM a requisição não
+        ocupa uma thread, então um único event loop atende muitas conversas
+        ao mesmo tempo (o limite de chamadas ao provedor continua sendo o pool
+        de llm_pool).
+        """
+        speculation = self._speculation()
+        intent = await self.aclassify_intent(message, speculation)
+        prefetched = speculation.resolve(intent) if speculation else None
 
-        return (
-            "Sou o orquestrador. Peça: política de compliance, conspiração contra Toby, "
-            "quebras simples (fraude direta), quebras complexas (com e-mail) ou relatório completo."
-        )
+        if intent == "policy":
+            docs = await atake(prefetched)
+            result = await (await self._aget_agent("policy")).aask(message, docs)
+            return result.get("result", "Não encontrei resposta na política.")
+
+        if intent == "conspiracy":
+            return await (await self._aget_agent("conspiracy")).aask(message, prefetched)
+
+        if intent in FRAUD_INTENTS:
+            agent = await self._aget_agent("fraud")
+            await atake(prefetched)
+            return await agent.aresponder_intencao(FRAUD_INTENTS[intent], message)
+
+        return HELP_MESSAGE
 
     def ask(self, message: str) -> str:
         return self.handle(message)
 
+    async def aask(self, message: str) -> str:
+        return await self.ahandle(message)
+
+    def stream(self, message: str) -> Iterator[str]:
+        """Mesma resposta de `handle`, em pedaços conforme cada agente produz."""
+        intent = self.classify_intent(message)
+
+        if intent == "policy":
+            yield from self._policy_bot.stream(message)
+        elif intent == "conspiracy":
+            yield from self._conspiracy_bot.stream(message)
+        elif intent in FRAUD_INTENTS:
+            yield from self._fraud_agent.stream_intencao(FRAUD_INTENTS[intent], message)
+        else:
+            yield HELP_MESSAGE
+
 
 def main():
     bot = TobyOrchestrator()
@@ -0,0 +1,96 @@
+"""
+Conversas simultâneas num único event loop (aask) vs uma thread por conversa (ask).
+
+O orquestrador real roda com o LLM stub (LLM_PROVIDER=stub), que espera a
+latência de `--latency` (asyncio.sleep no caminho async, time.sleep no
+síncrono). No modo async todas as conversas são corrotinas de um só event
+loop; no modo threads cada conversa ocupa uma thread do começo ao fim.
+O pool de LLM (--pool) é grande para que o gargalo seja o modelo de execução.
+
+    cd src
+    python benchmarks/bench_async_chats.py --chats 50 200 500 --pool 512
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Caminho para src/
+SRC_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SRC_DIR))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chats", type=int, nargs="+", default=[50, 200, 500])
+    parser.add_argument("--latency", default="fixed:0.5", help="distribuição de latência do LLM stub")
+    parser.add_argument("--pool", type=int, default=512, help="LLM_MAX_CONCURRENCY")
+    parser.add_argument("--threads", type=int, default=32, help="threads do modo síncrono")
+    return parser.parse_args()
+
+
+args = parse_args()
+os.environ["LLM_MAX_CONCURRENCY"] = str(args.pool)
+os.environ["LLM_CACHE"] = "0"
+os.environ["LLM_PROVIDER"] = "stub"
+os.environ["LLM_STUB_LATENCY"] = args.latency
+
+from agent_conspiracy import ConspiracyChatbot  # noqa: E402
+from agent_orchestrator import TobyOrchestrator  # noqa: E402
+from email_retrieval import EmailRetriever  # noqa: E402
+
+MESSAGES = [
+    "Alguém está conspirando contra o Toby?",
+    "O Michael conspirou contra o Toby?",
+    "oi, tudo bem?",
+]
+
+
+def build_bot() -> TobyOrchestrator:
+    def conspiracy():
+        # Sem busca semântica: o modelo de embeddings não entra na medida.
+        agent = ConspiracyChatbot(api_key=None, retriever=EmailRetriever(None))
+        agent.retriever.available = False
+        return agent
+
+    return TobyOrchestrator(factories={"conspiracy": conspiracy})
+
+
+def jobs(chats: int):
+    return [MESSAGES[i % len(MESSAGES)] for i in range(chats)]
+
+
+def run_threads(bot: TobyOrchestrator, chats: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(bot.ask, jobs(chats)))
+    return time.perf_counter() - start
+
+
+async def run_async(bot: TobyOrchestrator, chats: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(bot.aask(m) for m in jobs(chats)))
+    return time.perf_counter() - start
+
+
+def main():
+    bot = build_bot()
+    for message in MESSAGES:  # aquece agentes e índices
+        bot.ask(message)
+
+    print(f"LLM stub: latência {args.latency}, pool de {args.pool}")
+    print(f"{'conversas':>9} | {'modo':>14} | {'tempo (s)':>9} | {'conversas/s':>11}")
+    for chats in args.chats:
+        for mode in ("threads", "async"):
+            if mode == "threads":
+                elapsed, label = run_threads(bot, chats), f"{args.threads} threads"
+            else:
+                elapsed, label = asyncio.run(run_async(bot, chats)), "1 event loop"
+            print(f"{chats:>9} | {label:>14} | {elapsed:>9.2f} | {chats / elapsed:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Compara o laço de substrings original (`any(k in desc ...)` por categoria)
+com o KeywordAutomaton, usando as descrições reais do CSV e conjuntos de
+regras sintéticos cada vez maiores.
+
+    cd src
+    python benchmarks/bench_keyword_matcher.py
+"""
+import argparse
+import csv
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+# Caminho para src/
+SRC_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SRC_DIR))
+
+from agent_fraud_detection import TRANSACTIONS_PATH  # noqa: E402
+from keyword_matcher import KeywordAutomaton  # noqa: E402
+
+BASE_RULES = {
+    "entretenimento": ["mágica", "ilusionismo", "algemas", "karaok", "discoteca", "strip"],
+    "armamento": ["katana", "arma", "ninja", "nunchaku", "spray de pimenta"],
+    "conflito": ["wuphf", "dunder infinity", "serenity", "vela", "startup", "tech solutions", "sparkl"],
+}
+
+
+def synthetic_rules(n_categories: int, per_category: int, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+    rules = dict(BASE_RULES)
+    for i in range(n_categories):
+        rules[f"regra_{i}"] = [
+            "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 10)))
+            for _ in range(per_category)
+        ]
+    return rules
+
+
+def load_descriptions(path: Path) -> list:
+    with path.open("r", encoding="utf-8") as f:
+        return [row.get("descricao", "").lower() for row in csv.DictReader(f)]
+
+
+def substring_loop(texts, rules):
+    hits = 0
+    for desc in texts:
+        for keywords in rules.values():
+            if any(k in desc for k in keywords):
+                hits += 1
+    return hits
+
+
+def automaton_scan(texts, rules, automaton):
+    sets = [frozenset(kws) for kws in rules.values()]
+    hits = 0
+    for desc in texts:
+        found = automaton.find(desc)
+        if not found:
+            continue
+        for keywords in sets:
+            if not found.isdisjoint(keywords):
+                hits += 1
+    return hits
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--copies", type=int, default=5, help="quantas vezes replicar as descrições do CSV")
+    args = parser.parse_args()
+
+    texts = load_descriptions(TRANSACTIONS_PATH) * args.copies
+    print(f"{len(texts)} descrições")
+    print(f"{'keywords':>9} | {'substring (s)':>13} | {'automato (s)':>12} | {'build (s)':>9} | speedup")
+
+    for n_categories in (0, 10, 100, 500):
+        rules = synthetic_rules(n_categories, per_category=10)
+        n_keywords = sum(len(v) for v in rules.values())
+
+        start = time.perf_counter()
+        automaton = KeywordAutomaton(k for kws in rules.values() for k in kws)
+        build = time.perf_counter() - start
+
+        t_loop, r_loop = best_of(lambda: substring_loop(texts, rules), args.repeat)
+        t_auto, r_auto = best_of(lambda: automaton_scan(texts, rules, automaton), args.repeat)
+        assert r_loop == r_auto, "resultados divergentes"
+
+        print(f"{n_keywords:>9} | {t_loop:>13.4f} | {t_auto:>12.4f} | {build:>9.4f} | {t_loop / t_auto:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
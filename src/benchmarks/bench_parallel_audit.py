@@ -0,0 +1,56 @@
+"""
+Escalabilidade da auditoria paralela (parallel_audit) de 1 a N processos.
+
+Gera um ledger sintético reamostrando as linhas do CSV real (com
+funcionários, datas e valores sorteados), compara com `executar_auditoria`
+em memória e confere que todas as execuções devolvem o mesmo relatório.
+
+    cd src
+    python benchmarks/bench_parallel_audit.py --rows 1000000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Caminho para src/
+SRC_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SRC_DIR))
+
+from agent_fraud_detection import FraudDetectionAgent  # noqa: E402
+from parallel_audit import auditar_em_paralelo  # noqa: E402
+from synthetic_ledger import synthetic_ledger  # noqa: E402
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--particao", choices=["bytes", "funcionario"], default="bytes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "ledger.csv"
+        synthetic_ledger(path, args.rows)
+
+        base, referencia = timed(lambda: FraudDetectionAgent(path).executar_auditoria())
+        print(f"{args.rows} linhas, {os.cpu_count()} CPUs, partição por {args.particao}")
+        print(f"{'processos':>9} | {'tempo (s)':>9} | {'vs. memória':>11} | achados")
+        print(f"{'memória':>9} | {base:>9.2f} | {1.0:>10.2f}x | {len(referencia['direct_violations'])}")
+
+        for workers in sorted(set(args.workers)):
+            t, report = timed(lambda: auditar_em_paralelo([path], workers, args.particao))
+            assert report == referencia, f"relatório com {workers} processo(s) diverge da auditoria em memória"
+            print(f"{workers:>9} | {t:>9.2f} | {base / t:>10.2f}x | {len(report['direct_violations'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Latência do orquestrador com e sem especulação (SPECULATIVE_PREFETCH).
+
+Os LLMs são do provedor stub (LLM_PROVIDER=stub); o roteador devolve a
+intenção rotulada de cada mensagem (regras gravadas num arquivo temporário,
+antes das regras padrão). As embeddings são falsas mas esperam `--embed-latency`
+segundos por chamada, simulando o modelo local, para que a busca no FAISS
+(política e e-mails) tenha custo. As mensagens são, na maioria, ambíguas
+para o classificador local; só essas passam pelo LLM roteador e especulam.
+
+    cd src
+    python benchmarks/bench_speculation.py --rounds 5 --latency fixed:0.3 --embed-latency 0.1
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Caminho para src/
+SRC_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SRC_DIR))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5, help="repetições de cada mensagem")
+    parser.add_argument("--latency", default="fixed:0.3", help="distribuição de latência do LLM stub")
+    parser.add_argument("--embed-latency", type=float, default=0.1, help="segundos por chamada às embeddings")
+    parser.add_argument("--branches", type=int, default=2, help="SPECULATIVE_BRANCHES")
+    return parser.parse_args()
+
+
+args = parse_args()
+os.environ["LLM_CACHE"] = "0"
+os.environ["SPECULATIVE_BRANCHES"] = str(args.branches)
+os.environ["LLM_PROVIDER"] = "stub"
+os.environ["LLM_STUB_LATENCY"] = args.latency
+
+from langchain_core.embeddings import FakeEmbeddings  # noqa: E402
+
+from agent_compliance import ComplianceChatbot  # noqa: E402
+from agent_conspiracy import ConspiracyChatbot  # noqa: E402
+from agent_orchestrator import TobyOrchestrator  # noqa: E402
+from email_retrieval import EmailRetriever  # noqa: E402
+from llm_provider import STUB_REPLAY_PATH  # noqa: E402
+from speculation import SpeculationStats  # noqa: E402
+
+# Mensagens ambíguas para o classificador local, com a intenção esperada.
+LABELLED = {
+    "quero saber dos reembolsos de abril": "policy",
+    "posso levar um cliente pra jantar e pedir o dinheiro de volta?": "policy",
+    "o que o Michael anda tramando?": "conspiracy",
+    "Jim e Dwight combinaram algo?": "conspiracy",
+    "me mostra tudo de auditoria": "fraud_all",
+    "tem alguma despesa estranha?": "fraud_simple",
+}
+
+
+class SlowFakeEmbeddings(FakeEmbeddings):
+    latency: float = 0.1
+
+    def embed_documents(self, texts):
+        time.sleep(self.latency)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        time.sleep(self.latency)
+        return super().embed_query(text)
+
+
+def build_bot(speculative: bool) -> TobyOrchestrator:
+    embeddings = SlowFakeEmbeddings(size=64, latency=args.embed_latency)
+
+    def policy():
+        return ComplianceChatbot(cache_dir=None, embeddings=embeddings)
+
+    def conspiracy():
+        return ConspiracyChatbot(api_key=None, retriever=EmailRetriever(None, embeddings=embeddings), speculative=False)
+
+    bot = TobyOrchestrator(speculative=speculative, factories={"policy": policy, "conspiracy": conspiracy})
+    bot.warm_up(wait=True)
+    return bot
+
+
+async def measure(bot: TobyOrchestrator):
+    latencies = []
+    for _ in range(args.rounds):
+        for message in LABELLED:
+            start = time.perf_counter()
+            await bot.aask(message)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def write_router_rules() -> str:
+    """Regras do roteador com a intenção rotulada de cada mensagem, antes das padrão."""
+    rules = tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False, encoding="utf-8")
+    with rules:
+        for message, intent in LABELLED.items():
+            match = "auditoria da Dunder Mifflin.*Mensagem: \"" + re.escape(message) + "\""
+            rules.write(json.dumps({"match": match, "response": json.dumps({"intent": intent})}) + "\n")
+    return rules.name
+
+
+def main():
+    rules = write_router_rules()
+    os.environ["LLM_STUB_REPLAY"] = os.pathsep.join([rules, str(STUB_REPLAY_PATH)])
+    print(f"LLM stub: latência {args.latency}; embeddings: {args.embed_latency:.2f}s; ramos: {args.branches}")
+    print(f"{'modo':>12} | {'média (s)':>9} | {'p50 (s)':>7} | {'p95 (s)':>7}")
+    for speculative in (False, True):
+        bot = build_bot(speculative)
+        asyncio.run(measure(bot))  # aquece índices e relatórios
+        bot.speculation_stats = SpeculationStats()
+        latencies = sorted(asyncio.run(measure(bot)))
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+        label = "especulativo" if speculative else "sequencial"
+        print(
+            f"{label:>12} | {statistics.mean(latencies):>9.3f} | {statistics.median(latencies):>7.3f} | {p95:>7.3f}"
+        )
+        if speculative:
+            print(json.dumps(bot.speculation_stats.snapshot(), indent=2))
+    os.unlink(rules)
+
+
+if __name__ == "__main__":
+    main()
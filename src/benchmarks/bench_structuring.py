@@ -0,0 +1,81 @@
+"""
+Benchmark do detector de fracionamento em ledgers sintéticos.
+
+Compara o agrupamento antigo (dict de listas por (funcionário, data)) com
+sliding_window_clusters para janelas de 1, 3 e 7 dias. O agrupamento antigo
+só roda até --legacy-max linhas, porque materializa um dict por transação.
+
+    cd src
+    python benchmarks/bench_structuring.py --sizes 100000 1000000 10000000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Caminho para src/
+SRC_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SRC_DIR))
+
+from structuring import sliding_window_clusters  # noqa: E402
+
+
+def synthetic_ledger(n: int, employees: int = 2000, days: int = 365, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    groups = rng.integers(0, employees, n, dtype=np.int32)
+    ordinals = (733000 + rng.integers(0, days, n)).astype(np.int32)
+    valor = np.round(rng.lognormal(mean=4.0, sigma=1.0, size=n), 2)
+    return groups, ordinals, valor
+
+
+def legacy_same_day(groups, ordinals, valor):
+    grouped = {}
+    for i, (g, d, v) in enumerate(zip(groups.tolist(), ordinals.tolist(), valor.tolist())):
+        grouped.setdefault((g, d), []).append((i, v))
+    alerts = 0
+    for txs in grouped.values():
+        total = sum(v for _, v in txs)
+        if len(txs) > 1 and total > 500 and max(v for _, v in txs) < 500:
+            alerts += 1
+    return alerts
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--legacy-max", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"{'linhas':>10} | {'legado (s)':>10} | {'janela 1d (s)':>13} | {'janela 3d (s)':>13} | {'janela 7d (s)':>13} | alertas 1d")
+    for n in args.sizes:
+        groups, ordinals, valor = synthetic_ledger(n)
+
+        legacy = "-"
+        legacy_alerts = None
+        if n <= args.legacy_max:
+            t, legacy_alerts = timed(lambda: legacy_same_day(groups, ordinals, valor))
+            legacy = f"{t:.3f}"
+
+        cols = []
+        alerts_1d = None
+        for janela in (1, 3, 7):
+            t, clusters = timed(lambda: sliding_window_clusters(groups, ordinals, valor, janela_dias=janela))
+            cols.append(f"{t:>13.3f}")
+            if janela == 1:
+                alerts_1d = len(clusters)
+
+        if legacy_alerts is not None:
+            assert legacy_alerts == alerts_1d, "janela de 1 dia diverge do agrupamento antigo"
+        print(f"{n:>10} | {legacy:>10} | " + " | ".join(cols) + f" | {alerts_1d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+"""
+Suíte de benchmarks ponta a ponta do orquestrador e dos agentes.
+
+Estágios (--stages):
+- cold_start: import + construção do TobyOrchestrator + cada agente, em
+  processos novos (--cold-repeat vezes, mediana), com o cache em disco do
+  índice FAISS da política já gravado por uma execução anterior, como numa
+  partida normal. A execução que grava o cache sai em cold_start.no_cache.
+- intents: latência por intenção (p50/p95/p99) de `ask`, com o LLM stub.
+- emails: vazão do parsing de e-mails (agent_conspiracy e agent_fraud_detection)
+  sobre o arquivo real repetido --email-copies vezes.
+- audit: vazão da auditoria de fraude em ledgers sintéticos de --ledger-sizes
+  linhas (em memória até --memory-max; em fluxo para todos).
+- faiss: construção do índice de e-mails e latência das buscas no FAISS
+  (política e e-mails).
+
+Os LLMs são do provedor stub (LLM_PROVIDER=stub, latência --llm-latency,
+padrão zero: mede só a orquestração) e o cache de LLM fica desligado. Com
+--embeddings fake as embeddings são determinísticas e sem modelo (mede
+FAISS, não o encoder) e os índices em disco ficam num diretório temporário;
+com hf usa o modelo local configurado e os caches de sempre (.cache/).
+
+Os resultados vão em JSON (--output) e são comparados com um baseline
+salvo (--baseline); --save-baseline grava o resultado como novo baseline e
+--fail-on-regression sai com código 1 se alguma métrica piorar além de
+--tolerance.
+
+    cd src
+    python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py --stages audit --ledger-sizes 10000 100000 1000000 10000000
+    python benchmarks/bench_suite.py --save-baseline
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+
+# Caminho para src/
+SRC_DIR = Path(__file__).resolve().parent.parent
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SRC_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+
+STAGES = ("cold_start", "intents", "emails", "audit", "faiss")
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+RESULTS_PATH = BENCH_DIR / "results" / "bench_suite.json"
+
+INTENT_MESSAGES = {
+    "policy": ["Qual o limite de gastos sem aprovação?", "O que diz a política de compliance sobre reembolso?"],
+    "conspiracy": ["Alguém está conspirando contra o Toby?", "O Michael conspirou contra o Toby?"],
+    "fraud_simple": ["Quero ver as quebras de compliance simples"],
+    "fraud_complex": ["Mostre as quebras de compliance complexas com contexto de e-mail"],
+    "fraud_all": ["Quero o relatório completo de fraudes"],
+    "other": ["oi, tudo bem?"],
+}
+POLICY_QUERIES = [
+    "limite de gastos sem aprovação",
+    "reembolso de refeição com cliente",
+    "presentes de fornecedores",
+    "uso da categoria diversos",
+]
+EMAIL_QUERIES = [
+    "Alguém está conspirando contra o Toby?",
+    "plano para tirar o Toby do RH",
+    "reclamações sobre o RH",
+    "reunião secreta no depósito",
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--embeddings", choices=["fake", "hf"], default="fake")
+    parser.add_argument("--llm-latency", default="fixed:0", help="distribuição de latência do LLM stub")
+    parser.add_argument("--cold-repeat", type=int, default=3)
+    parser.add_argument("--requests", type=int, default=30, help="requisições por intenção")
+    parser.add_argument("--email-copies", type=int, default=20)
+    parser.add_argument("--ledger-sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--memory-max", type=int, default=1_000_000, help="maior ledger auditado em memória")
+    parser.add_argument("--queries", type=int, default=50, help="buscas por índice no estágio faiss")
+    parser.add_argument("--output", type=Path, default=RESULTS_PATH)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.20, help="piora relativa tolerada")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--child-cold-start", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--cache-dir", type=Path, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def configure_env(args) -> None:
+    os.environ["LLM_PROVIDER"] = "stub"
+    os.environ["LLM_STUB_LATENCY"] = args.llm_latency
+    os.environ["LLM_CACHE"] = "0"
+    os.environ["SPECULATIVE_PREFETCH"] = "0"
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Percentil pelo posto mais próximo."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered) + 0.5)) - 1))]
+
+
+class Results:
+    """Métricas planas: nome -> valor, unidade e se é melhor maior ou menor."""
+
+    def __init__(self):
+        self.metrics: Dict[str, Dict] = {}
+
+    def add(self, name: str, value: float, unit: str, better: str = "lower") -> None:
+        self.metrics[name] = {"value": round(value, 6), "unit": unit, "better": better}
+        print(f"  {name:<48} {value:>14.4f} {unit}")
+
+    def latencies(self, prefix: str, seconds: List[float]) -> None:
+        for q in (0.50, 0.95, 0.99):
+            self.add(f"{prefix}.p{int(q * 100)}_ms", percentile(seconds, q) * 1000, "ms")
+
+
+# ---------------------------------------------------------------------------
+# Montagem do orquestrador
+# ---------------------------------------------------------------------------
+
+
+def fake_embeddings():
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+
+    return DeterministicFakeEmbedding(size=384)
+
+
+def build_orchestrator(args, cache_dir: Path | None = None):
+    """
+    Orquestrador com o LLM stub. Com --embeddings fake, política e e-mails usam
+    embeddings determinísticas, com os índices em `cache_dir` (só em memória
+    sem ele).
+    """
+    from agent_orchestrator import TobyOrchestrator
+
+    if args.embeddings != "fake":
+        return TobyOrchestrator()
+
+    from agent_compliance import ComplianceChatbot
+    from agent_conspiracy import ConspiracyChatbot
+    from email_retrieval import EmailRetriever
+
+    embeddings = fake_embeddings()
+
+    def policy():
+        return ComplianceChatbot(cache_dir=cache_dir and cache_dir / "faiss", embeddings=embeddings)
+
+    def conspiracy():
+        retriever = EmailRetriever(cache_dir and cache_dir / "email_faiss", embeddings=embeddings)
+        return ConspiracyChatbot(api_key=None, retriever=retriever)
+
+    return TobyOrchestrator(factories={"policy": policy, "conspiracy": conspiracy})
+
+
+# ---------------------------------------------------------------------------
+# Estágios
+# ---------------------------------------------------------------------------
+
+
+def child_cold_start(args) -> None:
+    """Roda num processo novo: imprime os tempos de import e construção em JSON."""
+    t_import, _ = timed(lambda: __import__("agent_orchestrator"))
+    t_build, bot = timed(lambda: build_orchestrator(args, args.cache_dir))
+    agents = {}
+    for name in bot._factories:
+        agents[name], _ = timed(lambda: bot._get_agent(name))
+    print(json.dumps({"import": t_import, "construct": t_build, "agents": agents}))
+
+
+def stage_cold_start(results: Results, args) -> None:
+    def run(cmd: List[str]) -> Dict:
+        out = subprocess.run(cmd, capture_output=True, text=True, check=True, env=os.environ.copy())
+        return json.loads(out.stdout.strip().splitlines()[-1])
+
+    cmd = [
+        sys.executable, str(Path(__file__).resolve()), "--child-cold-start",
+        "--embeddings", args.embeddings, "--llm-latency", args.llm_latency,
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.embeddings == "fake":
+            cmd += ["--cache-dir", tmp]
+        # A primeira execução grava o cache do FAISS (com hf, só se ainda não existir).
+        first = run(cmd)
+        runs = [run(cmd) for _ in range(args.cold_repeat)]
+
+    results.add("cold_start.no_cache.total_s", first["import"] + first["construct"] + sum(first["agents"].values()), "s")
+    results.add("cold_start.import_s", statistics.median(r["import"] for r in runs), "s")
+    results.add("cold_start.construct_s", statistics.median(r["construct"] for r in runs), "s")
+    for name in runs[0]["agents"]:
+        results.add(f"cold_start.agent.{name}_s", statistics.median(r["agents"][name] for r in runs), "s")
+    total = [r["import"] + r["construct"] + sum(r["agents"].values()) for r in runs]
+    results.add("cold_start.total_s", statistics.median(total), "s")
+
+
+def stage_intents(results: Results, args) -> None:
+    bot = build_orchestrator(args)
+    bot.warm_up(wait=True)
+    for intent, messages in INTENT_MESSAGES.items():
+        routed = {bot.classify_intent(m) for m in messages}
+        if routed != {intent}:
+            print(f"  aviso: mensagens de {intent} roteadas para {sorted(routed)}")
+        bot.ask(messages[0])  # memoização e índices já prontos
+        latencies = []
+        for i in range(args.requests):
+            t, _ = timed(lambda: bot.ask(messages[i % len(messages)]))
+            latencies.append(t)
+        results.latencies(f"intents.{intent}", latencies)
+
+
+def stage_emails(results: Results, args) -> None:
+    from agent_conspiracy import parse_email_records, read_email_file
+    from agent_fraud_detection import FraudDetectionAgent
+
+    raw = read_email_file() * args.email_copies
+    megabytes = len(raw.encode("utf-8")) / 1e6
+    parsers: Dict[str, Callable] = {
+        "conspiracy": parse_email_records,
+        "fraud": FraudDetectionAgent._parse_emails,
+    }
+    for name, parse in parsers.items():
+        best, emails = min(timed(lambda: parse(raw)) for _ in range(3))
+        results.add(f"emails.{name}.emails_per_s", len(emails) / best, "emails/s", "higher")
+        results.add(f"emails.{name}.mb_per_s", megabytes / best, "MB/s", "higher")
+
+
+def stage_audit(results: Results, args) -> None:
+    from agent_fraud_detection import FraudDetectionAgent
+    from synthetic_ledger import synthetic_ledger
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.ledger_sizes:
+            path = Path(tmp) / f"ledger_{rows}.csv"
+            synthetic_ledger(path, rows)
+            findings = Path(tmp) / "findings.sqlite3"
+
+            if rows <= args.memory_max:
+                t, _ = timed(lambda: FraudDetectionAgent(path, findings_path=findings).executar_auditoria())
+                results.add(f"audit.memory.rows_per_s@{rows}", rows / t, "linhas/s", "higher")
+
+            agent = FraudDetectionAgent(path, carregar_transacoes=False, findings_path=findings)
+            t, _ = timed(lambda: sum(1 for _ in agent.auditar_em_fluxo(path)))
+            results.add(f"audit.stream.rows_per_s@{rows}", rows / t, "linhas/s", "higher")
+            path.unlink()
+
+
+def stage_faiss(results: Results, args) -> None:
+    from agent_compliance import ComplianceChatbot
+    from agent_conspiracy import get_email_store
+    from email_retrieval import EmailRetriever
+
+    if args.embeddings == "fake":
+        embeddings = fake_embeddings()
+        policy = ComplianceChatbot(cache_dir=None, embeddings=embeddings)
+        retriever = EmailRetriever(None, embeddings=embeddings)
+    else:
+        policy = ComplianceChatbot()
+        retriever = EmailRetriever(None)
+
+    latencies = []
+    for i in range(args.queries):
+        t, _ = timed(lambda: policy.retriever.invoke(POLICY_QUERIES[i % len(POLICY_QUERIES)]))
+        latencies.append(t)
+    results.latencies("faiss.policy", latencies)
+
+    index = get_email_store().index()
+    emails = index.emails
+    t, _ = timed(lambda: retriever.sync(emails))
+    results.add("faiss.emails.build_s", t, "s")
+
+    latencies = []
+    for i in range(args.queries):
+        t, _ = timed(lambda: retriever.top_k(EMAIL_QUERIES[i % len(EMAIL_QUERIES)], emails, 20))
+        latencies.append(t)
+    results.latencies("faiss.emails", latencies)
+
+    person = index.ids_by_person("Michael Scott")
+    latencies = []
+    for i in range(args.queries):
+        t, _ = timed(lambda: retriever.top_k(EMAIL_QUERIES[i % len(EMAIL_QUERIES)], emails, 20, person))
+        latencies.append(t)
+    results.latencies("faiss.emails_filtered", latencies)
+
+
+# ---------------------------------------------------------------------------
+# Resultados e baseline
+# ---------------------------------------------------------------------------
+
+
+def git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SRC_DIR, capture_output=True, text=True)
+        return out.stdout.strip() or "desconhecido"
+    except OSError:
+        return "desconhecido"
+
+
+def metadata(args) -> Dict:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "embeddings": args.embeddings,
+        "llm_latency": args.llm_latency,
+        "stages": args.stages,
+    }
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Imprime a comparação com o baseline e devolve as métricas que pioraram além da tolerância."""
+    regressions = []
+    common = [name for name in current["metrics"] if name in baseline.get("metrics", {})]
+    if not common:
+        print("Nenhuma métrica em comum com o baseline.")
+        return regressions
+
+    base_meta = baseline.get("meta", {})
+    for key in ("embeddings", "llm_latency", "cpus"):
+        if base_meta.get(key) != current["meta"].get(key):
+            print(f"aviso: baseline com {key}={base_meta.get(key)!r}, atual {current['meta'].get(key)!r}")
+
+    print(f"\nComparação com o baseline ({base_meta.get('commit', '?')}, {base_meta.get('timestamp', '?')}):")
+    print(f"{'métrica':<48} | {'baseline':>12} | {'atual':>12} | {'variação':>9} | ")
+    for name in common:
+        cur = current["metrics"][name]
+        base = baseline["metrics"][name]["value"]
+        change = (cur["value"] - base) / base if base else 0.0
+        worse = change > tolerance if cur["better"] == "lower" else change < -tolerance
+        better = change < -tolerance if cur["better"] == "lower" else change > tolerance
+        status = "PIOROU" if worse else ("melhorou" if better else "")
+        if worse:
+            regressions.append(name)
+        print(f"{name:<48} | {base:>12.4f} | {cur['value']:>12.4f} | {change:>+8.1%} | {status}")
+    return regressions
+
+
+def main():
+    args = parse_args()
+    configure_env(args)
+    if args.child_cold_start:
+        child_cold_start(args)
+        return
+
+    stages = {
+        "cold_start": stage_cold_start,
+        "intents": stage_intents,
+        "emails": stage_emails,
+        "audit": stage_audit,
+        "faiss": stage_faiss,
+    }
+    results = Results()
+    for name in args.stages:
+        print(f"[{name}]")
+        stages[name](results, args)
+
+    current = {"meta": metadata(args), "metrics": results.metrics}
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(current, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    print(f"\nResultados em {args.output}")
+
+    regressions = []
+    if args.baseline.exists():
+        regressions = compare(current, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+    else:
+        print(f"Sem baseline em {args.baseline}.")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(current, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"Baseline salvo em {args.baseline}")
+
+    if regressions and args.fail_on_regression:
+        print(f"\n{len(regressions)} métrica(s) pioraram além de {args.tolerance:.0%}.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
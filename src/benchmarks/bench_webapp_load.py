@@ -0,0 +1,109 @@
+"""
+Teste de carga do webapp com o LLM stub (LLM_PROVIDER=stub, sem rede).
+
+Sobe o app (create_app) num servidor multi-thread, com o orquestrador real e
+os LLMs do provedor stub, que esperam uma latência sorteada de `--latency`
+(ver llm_provider.parse_latency), e dispara
+requisições de 1 a N usuários simultâneos. Como cada requisição passa a maior
+parte do tempo esperando o LLM, a vazão deve crescer com os usuários até
+bater em LLM_MAX_CONCURRENCY (--pool) chamadas simultâneas.
+
+    cd src
+    python benchmarks/bench_webapp_load.py --users 1 2 4 8 16 32 --pool 8 --latency lognormal:0.2,0.4
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Caminho para src/
+SRC_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SRC_DIR))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--requests", type=int, default=8, help="requisições por usuário")
+    parser.add_argument("--latency", default="fixed:0.2", help="distribuição de latência do LLM stub")
+    parser.add_argument("--pool", type=int, default=8, help="LLM_MAX_CONCURRENCY")
+    return parser.parse_args()
+
+
+args = parse_args()
+os.environ["LLM_MAX_CONCURRENCY"] = str(args.pool)
+os.environ["LLM_CACHE"] = "0"
+os.environ["LLM_PROVIDER"] = "stub"
+os.environ["LLM_STUB_LATENCY"] = args.latency
+
+from werkzeug.serving import make_server  # noqa: E402
+
+from agent_conspiracy import ConspiracyChatbot  # noqa: E402
+from agent_orchestrator import TobyOrchestrator  # noqa: E402
+from email_retrieval import EmailRetriever  # noqa: E402
+from llm_pool import get_llm_slots  # noqa: E402
+from webapp.app import create_app  # noqa: E402
+
+MESSAGES = [
+    "Alguém está conspirando contra o Toby?",
+    "Quero ver as quebras de compliance simples",
+    "oi, tudo bem?",
+    "O Michael conspirou contra o Toby?",
+]
+
+
+def build_bot() -> TobyOrchestrator:
+    def conspiracy():
+        # Sem busca semântica: o modelo de embeddings não entra na medida.
+        agent = ConspiracyChatbot(api_key=None, retriever=EmailRetriever(None))
+        agent.retriever.available = False
+        return agent
+
+    return TobyOrchestrator(factories={"conspiracy": conspiracy})
+
+
+def post(url: str, message: str) -> float:
+    body = json.dumps({"message": message}).encode("utf-8")
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=120) as res:
+        json.loads(res.read())
+    return time.perf_counter() - start
+
+
+def main():
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    app = create_app(build_bot())
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/api/chat"
+
+    for message in MESSAGES:  # aquece agentes e índices
+        post(url, message)
+
+    print(f"LLM stub: latência {args.latency}, pool de {args.pool}")
+    print(f"{'usuários':>8} | {'req/s':>7} | {'p50 (s)':>7} | {'p95 (s)':>7} | pico LLM")
+    for users in args.users:
+        jobs = [MESSAGES[i % len(MESSAGES)] for i in range(users * args.requests)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=users) as pool:
+            latencies = sorted(pool.map(lambda m: post(url, m), jobs))
+        elapsed = time.perf_counter() - start
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+        print(
+            f"{users:>8} | {len(jobs) / elapsed:>7.1f} | {statistics.median(latencies):>7.2f} | {p95:>7.2f} | "
+            f"{get_llm_slots().snapshot()['peak']}"
+        )
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
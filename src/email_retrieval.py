@@ -0,0 +1,188 @@
+"""
+Busca semântica sobre os e-mails internos (MiniLM + FAISS, como em agent_compliance).
+
+O índice fica em .cache/email_faiss e é atualizado de forma incremental:
+cada e-mail é identificado pelo hash do texto cru, então só os e-mails novos
+são codificados e os que sumiram do arquivo são removidos do índice.
+"""
+import hashlib
+import json
+import logging
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+
+from embedding_model import EMBEDDING_MODEL, get_embeddings
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+EMAIL_INDEX_DIR = BASE_DIR / ".cache" / "email_faiss"
+MANIFEST = "manifest.json"
+# Ancora a pergunta no tema da investigação.
+QUERY_CONTEXT = "conspiração contra Toby Flenderson do RH"
+
+
+def email_key(email) -> str:
+    return hashlib.sha256(email.raw.encode("utf-8")).hexdigest()[:32]
+
+
+class EmailRetriever:
+    """
+    Índice vetorial dos e-mails. `sync` alinha o índice com um snapshot do
+    EmailStore; `top_k` devolve as posições dos e-mails mais próximos da
+    pergunta. Se o modelo de embeddings ou o índice não puderem ser montados,
+    `available` vira False e quem chama volta para o filtro por palavra-chave;
+    uma falha depois disso só afeta aquela pergunta.
+    """
+
+    def __init__(
+        self,
+        index_dir: Optional[Path] = EMAIL_INDEX_DIR,
+        embeddings: Optional[Embeddings] = None,
+        model_name: str = EMBEDDING_MODEL,
+    ):
+        self.index_dir = Path(index_dir) if index_dir else None
+        self.model_name = model_name
+        self.embeddings = embeddings or get_embeddings(model_name)
+        self.available = True
+        self._store: Optional[FAISS] = None
+        self._loaded = False
+        self._synced = None
+        self._positions: Dict[str, List[int]] = {}
+        # Busca e atualização do índice FAISS não podem se sobrepor.
+        self._lock = threading.RLock()
+
+    def _load(self) -> None:
+        self._loaded = True
+        if self.index_dir is None or not (self.index_dir / "index.faiss").exists():
+            return
+        try:
+            manifest = json.loads((self.index_dir / MANIFEST).read_text(encoding="utf-8"))
+            if manifest.get("model") != self.model_name:
+                return
+            # O índice é gerado localmente por _save.
+            self._store = FAISS.load_local(str(self.index_dir), self.embeddings, allow_dangerous_deserialization=True)
+        except Exception:
+            self._store = None
+
+    def _save(self) -> None:
+        if self.index_dir is None or self._store is None:
+            return
+        try:
+            self.index_dir.parent.mkdir(parents=True, exist_ok=True)
+            tmp = Path(tempfile.mkdtemp(dir=self.index_dir.parent))
+            self._store.save_local(str(tmp))
+            (tmp / MANIFEST).write_text(json.dumps({"model": self.model_name}), encoding="utf-8")
+            backup = self.index_dir.with_name(self.index_dir.name + ".old")
+            shutil.rmtree(backup, ignore_errors=True)
+            if self.index_dir.exists():
+                self.index_dir.rename(backup)
+            tmp.rename(self.index_dir)
+            shutil.rmtree(backup, ignore_errors=True)
+        except OSError:
+            pass
+
+    def _stored_keys(self) -> Set[str]:
+        if self._store is None:
+            return set()
+        return set(self._store.index_to_docstore_id.values())
+
+    def sync(self, emails: Sequence) -> int:
+        """Codifica só os e-mails que ainda não estão no índice; devolve quantos foram adicionados."""
+        if emails is self._synced:
+            return 0
+        with self._lock:
+            if emails is self._synced:
+                return 0
+            if not self._loaded:
+                self._load()
+
+            positions: Dict[str, List[int]] = {}
+            texts: Dict[str, str] = {}
+            for i, email in enumerate(emails):
+                key = email_key(email)
+                positions.setdefault(key, []).append(i)
+                texts.setdefault(key, email.to_prompt())
+
+            stored = self._stored_keys()
+            removed = stored - positions.keys()
+            new = [key for key in texts if key not in stored]
+            if removed:
+                self._store.delete(list(removed))
+            if new:
+                vectors = self.embeddings.embed_documents([texts[k] for k in new])
+                pairs = list(zip([texts[k] for k in new], vectors))
+                metadatas = [{"key": k} for k in new]
+                if self._store is None:
+                    self._store = FAISS.from_embeddings(pairs, self.embeddings, metadatas=metadatas, ids=new)
+                else:
+                    self._store.add_embeddings(pairs, metadatas=metadatas, ids=new)
+            if removed or new:
+                self._save()
+
+            self._positions = positions
+            self._synced = emails
+            return len(new)
+
+    def top_k(
+        self, question: str, emails: Sequence, k: int, candidates: Optional[Iterable[int]] = None
+    ) -> Optional[List[int]]:
+        """
+        Posições em `emails` dos k e-mails mais próximos da pergunta, do mais
+        para o menos relevante, restritas a `candidates` quando informado.
+        None se a busca semântica não está disponível.
+        """
+        if not self.available:
+            return None
+        try:
+            with self._lock:
+                return self._top_k(question, emails, k, candidates)
+        except Exception as e:
+            if self._synced is None or not getattr(self.embeddings, "loaded", True):
+                # Índice ou modelo nunca ficaram prontos (ex.: sem rede): desliga de vez.
+                logger.warning("Busca semântica de e-mails indisponível (%s); usando palavras-chave.", e)
+                self.available = False
+            else:
+                logger.warning("Busca semântica de e-mails falhou (%s); usando palavras-chave nesta pergunta.", e)
+            return None
+
+    def _top_k(self, question: str, emails: Sequence, k: int, candidates: Optional[Iterable[int]]) -> List[int]:
+        self.sync(emails)
+        if self._store is None or k <= 0:
+            return []
+        allowed = None if candidates is None else set(candidates)
+        if allowed is not None and not allowed:
+            return []
+
+        vector = self.embeddings.embed_query(f"{question}\n{QUERY_CONTEXT}")
+        total = self._store.index.ntotal
+        kwargs = {}
+        if allowed is not None:
+            keys = {email_key(emails[i]) for i in allowed}
+            kwargs = {"filter": lambda metadata: metadata.get("key") in keys, "fetch_k": total}
+        hits = self._store.similarity_search_with_score_by_vector(vector, k=min(k, total), **kwargs)
+
+        result: List[int] = []
+        for doc, _ in hits:
+            for i in self._positions.get(doc.metadata.get("key"), ()):
+                if allowed is None or i in allowed:
+                    result.append(i)
+        return result[:k]
+
+
+_retriever: Optional[EmailRetriever] = None
+_retriever_lock = threading.Lock()
+
+
+def get_email_retriever() -> EmailRetriever:
+    global _retriever
+    with _retriever_lock:
+        if _retriever is None:
+            _retriever = EmailRetriever()
+        return _retriever
@@ -0,0 +1,54 @@
+"""
+Modelo de embeddings (MiniLM) compartilhado pelo processo.
+
+A política (agent_compliance), a busca nos e-mails (email_retrieval) e o cache
+semântico (llm_cache) usam a mesma instância de `get_embeddings()`, então o
+modelo HuggingFace é carregado uma única vez.
+"""
+import threading
+from typing import Dict
+
+from langchain_core.embeddings import Embeddings
+from langchain_huggingface import HuggingFaceEmbeddings
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+class LazyEmbeddings(Embeddings):
+    """
+    Só carrega o modelo HuggingFace quando algum texto precisa ser codificado.
+    Com o índice vindo do cache, isso acontece apenas na primeira pergunta.
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def _get_model(self) -> HuggingFaceEmbeddings:
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = HuggingFaceEmbeddings(model_name=self.model_name)
+        return self._model
+
+    def embed_documents(self, texts):
+        return self._get_model().embed_documents(texts)
+
+    def embed_query(self, text):
+        return self._get_model().embed_query(text)
+
+
+_embeddings: Dict[str, LazyEmbeddings] = {}
+_embeddings_lock = threading.Lock()
+
+
+def get_embeddings(model_name: str = EMBEDDING_MODEL) -> LazyEmbeddings:
+    with _embeddings_lock:
+        if model_name not in _embeddings:
+            _embeddings[model_name] = LazyEmbeddings(model_name)
+        return _embeddings[model_name]
@@ -0,0 +1,130 @@
+import calendar
+import re
+import unicodedata
+from typing import Iterable, List, Optional, Tuple
+
+from findings_store import CONTEXTUAL, DIRECT, STRUCTURING, FindingsQuery
+
+MESES = {
+    "janeiro": 1,
+    "fevereiro": 2,
+    "marco": 3,
+    "abril": 4,
+    "maio": 5,
+    "junho": 6,
+    "julho": 7,
+    "agosto": 8,
+    "setembro": 9,
+    "outubro": 10,
+    "novembro": 11,
+    "dezembro": 12,
+}
+
+# Padrões (sobre o texto normalizado) que apontam para cada regra.
+REGRAS = {
+    "fracionamento": r"fracion|estruturac|dividid|parcelad",
+    "po_acima_500": r"\bpo\b|ordem de compra",
+    "aprovacao_gestao": r"aprovacao (previa|de gestao)|intermediari",
+    "diversos_acima_5": r"\bdiversos\b",
+    "hooters": r"hooters",
+    "ti_acima_100": r"\bti\b|tecnologia|informatica",
+    "entretenimento_inadequado_itens_proibidos": r"entretenimento|\bmagica|stripper|karaok",
+    "armamento_itens_taticos_proibidos": r"\barmas?\b|armamento|katana|ninja|tatic",
+    "conflito_de_interesses_negocios_paralelos": r"conflito de interess|negocios? paralelo|startup",
+    "surveillance_spend": r"vigilancia|espion|espia|walkie|binoculo",
+    "wuphf_servers": r"wuphf|servidor",
+    "magic_disguised": r"\bmagica|ilusionismo|algemas",
+    "wcs_receipt": r"\bwcs\b|recibo",
+    "helicopter_spy": r"helicoptero",
+}
+
+_VALOR = r"(?:us\$|r\$|\$)?\s*(\d[\d.,]*)"
+_ACIMA = re.compile(
+    r"(?:acima de|maior(?:es)? (?:do )?que|mais de|superior(?:es)? a|a partir de|>=?)\s*" + _VALOR
+)
+_ATE = re.compile(r"(?:abaixo de|menor(?:es)? (?:do )?que|menos de|inferior(?:es)? a|\bate\b|<=?)\s*" + _VALOR)
+_ENTRE = re.compile(r"\bentre\s*" + _VALOR + r"\s*e\s*" + _VALOR)
+
+
+def _normalizar(texto: str) -> str:
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+
+def _numero(texto: str) -> Optional[float]:
+    """'500', '49.50', '1.000', '1.000,50' -> float."""
+    texto = texto.strip(".,")
+    if re.fullmatch(r"\d{1,3}(\.\d{3})+(,\d+)?", texto) or "," in texto:
+        texto = texto.replace(".", "").replace(",", ".")
+    try:
+        return float(texto)
+    except ValueError:
+        return None
+
+
+def _funcionarios(texto: str, nomes: Iterable[str]) -> Tuple[str, ...]:
+    """Nomes cujo nome completo ou algum sobrenome/prenome (3+ letras) aparece na mensagem."""
+    palavras = set(re.findall(r"[a-z0-9]+", texto))
+    achados = []
+    for nome in nomes:
+        norm = _normalizar(nome)
+        partes = [p for p in re.findall(r"[a-z0-9]+", norm) if len(p) >= 3]
+        if norm in texto or any(p in palavras for p in partes):
+            achados.append(nome)
+    return tuple(achados)
+
+
+def _periodos(texto: str, anos_disponiveis: List[int]) -> Tuple[Tuple[str, str], ...]:
+    anos = sorted({int(a) for a in re.findall(r"\b((?:19|20)\d{2})\b", texto)}) or anos_disponiveis
+    meses = [MESES[m] for m in re.findall(r"\b(" + "|".join(MESES) + r")\b", texto)]
+    meses += [int(m) for m in re.findall(r"\b(?:19|20)\d{2}-(\d{2})\b", texto)]
+    meses += [int(m) for m in re.findall(r"\b(\d{1,2})/(?:19|20)\d{2}\b", texto)]
+    meses = sorted({m for m in meses if 1 <= m <= 12})
+
+    if not meses:
+        if not re.search(r"\b(?:19|20)\d{2}\b", texto):
+            return ()
+        return tuple((f"{a}-01-01", f"{a}-12-31") for a in anos)
+    return tuple(
+        (f"{a}-{m:02d}-01", f"{a}-{m:02d}-{calendar.monthrange(a, m)[1]:02d}") for a in anos for m in meses
+    )
+
+
+def interpretar_consulta(
+    mensagem: str,
+    funcionarios: Iterable[str] = (),
+    anos: Iterable[int] = (),
+) -> FindingsQuery:
+    """
+    Extrai filtros de um pedido em linguagem natural, por exemplo
+    "quebras do Dwight acima de 500 em abril". `funcionarios` e `anos` vêm do
+    store (FindingsStore.funcionarios/anos) e limitam o que pode ser reconhecido.
+    """
+    texto = _normalizar(mensagem)
+    # Números que fazem parte de datas não são valores.
+    sem_datas = re.sub(r"\b(?:19|20)\d{2}(?:-\d{2}(?:-\d{2})?)?\b|\b\d{1,2}/(?:19|20)\d{2}\b", " ", texto)
+
+    acima = ate = None
+    entre = _ENTRE.search(sem_datas)
+    if entre:
+        acima, ate = _numero(entre.group(1)), _numero(entre.group(2))
+    else:
+        m = _ACIMA.search(sem_datas)
+        acima = _numero(m.group(1)) if m else None
+        m = _ATE.search(sem_datas)
+        ate = _numero(m.group(1)) if m else None
+
+    tipos: Tuple[str, ...] = ()
+    if re.search(r"simples|diret", texto):
+        tipos = (DIRECT, STRUCTURING)
+    elif re.search(r"complex|e-?mail|contexto", texto):
+        tipos = (CONTEXTUAL,)
+
+    return FindingsQuery(
+        funcionarios=_funcionarios(texto, funcionarios),
+        periodos=_periodos(texto, sorted(anos)),
+        valor_acima_de=acima,
+        valor_ate=ate,
+        regras=tuple(regra for regra, padrao in REGRAS.items() if re.search(padrao, texto)),
+        tipos=tipos,
+    )
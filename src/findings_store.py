@@ -0,0 +1,403 @@
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+FINDINGS_DB_PATH = BASE_DIR / ".cache" / "findings.sqlite3"
+# Store do chat (relatório completo de executar_auditoria). Fica num arquivo
+# separado: gravar_relatorio e a auditoria incremental limpam o banco inteiro
+# e apagariam o trabalho um do outro.
+FINDINGS_REPORT_DB_PATH = BASE_DIR / ".cache" / "findings_report.sqlite3"
+
+# Incrementar quando o schema mudar: bancos antigos são recriados (é só cache).
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS audit_state (
+    fonte TEXT PRIMARY KEY,
+    estado TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS findings (
+    id INTEGER PRIMARY KEY,
+    tipo TEXT NOT NULL,
+    ordem INTEGER NOT NULL,
+    regra TEXT,
+    id_transacao TEXT,
+    data TEXT,
+    data_inicio TEXT,
+    data_fim TEXT,
+    funcionario TEXT,
+    valor REAL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_findings_tipo_funcionario ON findings (tipo, funcionario);
+CREATE INDEX IF NOT EXISTS idx_findings_funcionario ON findings (funcionario, data_inicio);
+CREATE INDEX IF NOT EXISTS idx_findings_data ON findings (data_inicio, data_fim);
+CREATE INDEX IF NOT EXISTS idx_findings_valor ON findings (valor);
+CREATE TABLE IF NOT EXISTS finding_rules (
+    finding_id INTEGER NOT NULL REFERENCES findings (id) ON DELETE CASCADE,
+    regra TEXT NOT NULL,
+    motivo TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_finding_rules_regra ON finding_rules (regra, finding_id);
+CREATE INDEX IF NOT EXISTS idx_finding_rules_finding ON finding_rules (finding_id);
+CREATE TABLE IF NOT EXISTS context_rules (
+    regra TEXT PRIMARY KEY,
+    ordem INTEGER NOT NULL,
+    qtd_emails INTEGER NOT NULL,
+    email TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ledger_rows (
+    ordem INTEGER PRIMARY KEY,
+    id_transacao TEXT,
+    funcionario TEXT,
+    data TEXT,
+    valor REAL
+);
+CREATE INDEX IF NOT EXISTS idx_ledger_rows_funcionario_data ON ledger_rows (funcionario, data);
+CREATE TABLE IF NOT EXISTS structuring_days (
+    funcionario TEXT NOT NULL,
+    data TEXT NOT NULL,
+    contagem INTEGER NOT NULL,
+    soma REAL NOT NULL,
+    grandes REAL NOT NULL,
+    PRIMARY KEY (funcionario, data)
+);
+"""
+
+# tipo de achado -> chave no relatório de executar_auditoria
+DIRECT, STRUCTURING, CONTEXTUAL = "direct", "structuring", "contextual"
+
+
+def _e_fracionamento(finding: Dict) -> bool:
+    return any(regra.startswith("fracionamento") for regra in finding.get("regras", ()))
+
+
+def _periodo(data: str | None) -> Tuple[str | None, str | None]:
+    """"2008-04-01" ou "2008-04-01 a 2008-04-03" -> (início, fim)."""
+    if not data:
+        return None, None
+    inicio, _, fim = data.partition(" a ")
+    return inicio, fim or inicio
+
+
+@dataclass(frozen=True)
+class FindingsQuery:
+    """
+    Filtros de FindingsStore.consultar. Campos vazios não filtram; `periodos`
+    são intervalos ISO fechados combinados com OU.
+    """
+
+    funcionarios: Tuple[str, ...] = ()
+    periodos: Tuple[Tuple[str, str], ...] = ()
+    valor_acima_de: Optional[float] = None
+    valor_ate: Optional[float] = None
+    regras: Tuple[str, ...] = ()
+    tipos: Tuple[str, ...] = ()
+
+    def tem_filtros(self) -> bool:
+        return bool(
+            self.funcionarios
+            or self.periodos
+            or self.regras
+            or self.valor_acima_de is not None
+            or self.valor_ate is not None
+        )
+
+    def descricao(self) -> str:
+        partes = []
+        if self.funcionarios:
+            partes.append(", ".join(self.funcionarios))
+        if self.valor_acima_de is not None:
+            partes.append(f"acima de US${self.valor_acima_de:.2f}")
+        if self.valor_ate is not None:
+            partes.append(f"até US${self.valor_ate:.2f}")
+        if self.periodos:
+            partes.append(" ou ".join(a if a == b else f"{a} a {b}" for a, b in self.periodos))
+        if self.regras:
+            partes.append("regra " + " ou ".join(self.regras))
+        return "; ".join(partes) or "sem filtros"
+
+
+class FindingsStore:
+    """
+    Achados de auditoria persistidos em SQLite.
+
+    Além dos achados, guarda o estado que a auditoria incremental precisa:
+    marcas d'água por fonte (audit_state), regras de contexto já disparadas
+    e o estado do fracionamento: agregados por (funcionário, dia) e as colunas
+    do ledger que identificam as transações de cada dia.
+    """
+
+    def __init__(self, path: str | Path = FINDINGS_DB_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._profundidade = 0
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA foreign_keys = ON")
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                tabelas = self._conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+                for (nome,) in tabelas:
+                    self._conn.execute(f"DROP TABLE IF EXISTS {nome}")
+                self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @contextmanager
+    def transacao(self) -> Iterator["FindingsStore"]:
+        """Agrupa as escritas num único commit (ou rollback em caso de erro). Reentrante."""
+        with self._lock:
+            if self._profundidade:
+                self._profundidade += 1
+                try:
+                    yield self
+                finally:
+                    self._profundidade -= 1
+                return
+            self._profundidade = 1
+            try:
+                with self._conn:
+                    yield self
+            finally:
+                self._profundidade = 0
+
+    def limpar(self) -> None:
+        with self.transacao():
+            for table in ("audit_state", "finding_rules", "findings", "context_rules", "ledger_rows", "structuring_days"):
+                self._conn.execute(f"DELETE FROM {table}")
+
+    # Estado ----------------------------------------------------------------
+
+    def estado(self, fonte: str) -> Dict:
+        with self._lock:
+            row = self._conn.execute("SELECT estado FROM audit_state WHERE fonte = ?", (fonte,)).fetchone()
+        return json.loads(row["estado"]) if row else {}
+
+    def salvar_estado(self, fonte: str, estado: Dict) -> None:
+        with self.transacao():
+            self._conn.execute(
+                "INSERT OR REPLACE INTO audit_state (fonte, estado) VALUES (?, ?)",
+                (fonte, json.dumps(estado, ensure_ascii=False)),
+            )
+
+    # Achados ---------------------------------------------------------------
+
+    def adicionar(self, tipo: str, itens: Iterable[Tuple[int, Dict]]) -> int:
+        """
+        Insere pares (ordem, achado); `ordem` é a posição da linha no ledger.
+        Cada regra do achado (`regras`/`motivos` ou `regra`/`motivo`) vira uma
+        linha em finding_rules.
+        """
+        total = 0
+        with self.transacao():
+            for ordem, item in itens:
+                inicio, fim = _periodo(item.get("data"))
+                cur = self._conn.execute(
+                    "INSERT INTO findings (tipo, ordem, regra, id_transacao, data, data_inicio, data_fim, "
+                    "funcionario, valor, payload) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        tipo,
+                        ordem,
+                        item.get("regra"),
+                        item.get("id_transacao"),
+                        item.get("data"),
+                        inicio,
+                        fim,
+                        item.get("funcionario"),
+                        item.get("valor"),
+                        json.dumps(item, ensure_ascii=False),
+                    ),
+                )
+                if "regras" in item:
+                    regras = zip(item["regras"], item.get("motivos") or [None] * len(item["regras"]))
+                else:
+                    regras = [(item.get("regra"), item.get("motivo"))] if item.get("regra") else []
+                self._conn.executemany(
+                    "INSERT INTO finding_rules (finding_id, regra, motivo) VALUES (?, ?, ?)",
+                    [(cur.lastrowid, regra, motivo) for regra, motivo in regras],
+                )
+                total += 1
+        return total
+
+    def gravar_relatorio(self, report: Dict, estado: Dict) -> None:
+        """
+        Substitui o conteúdo do store por um relatório completo de
+        executar_auditoria. `estado` identifica as fontes e regras que o geraram
+        (ver `estado("auditoria")`). O estado da auditoria incremental do mesmo banco
+        é descartado; por isso o chat grava em FINDINGS_REPORT_DB_PATH.
+        """
+        direct = report.get("direct_violations", [])
+        with self.transacao():
+            self.limpar()
+            self.adicionar(DIRECT, ((i, f) for i, f in enumerate(direct) if not _e_fracionamento(f)))
+            self.adicionar(STRUCTURING, ((i, f) for i, f in enumerate(direct) if _e_fracionamento(f)))
+            self.adicionar(CONTEXTUAL, enumerate(report.get("contextual_flags", [])))
+            self.salvar_estado("auditoria", estado)
+
+    def consultar(self, consulta: FindingsQuery) -> List[Dict]:
+        """Achados que atendem a todos os filtros, por data e ordem no ledger; cada um com a chave `tipo`."""
+        where, params = [], []
+
+        def em(coluna: str, valores) -> None:
+            where.append(f"{coluna} IN ({', '.join('?' * len(valores))})")
+            params.extend(valores)
+
+        if consulta.tipos:
+            em("f.tipo", consulta.tipos)
+        if consulta.funcionarios:
+            em("f.funcionario", consulta.funcionarios)
+        if consulta.periodos:
+            where.append("(" + " OR ".join("(f.data_inicio <= ? AND f.data_fim >= ?)" for _ in consulta.periodos) + ")")
+            for inicio, fim in consulta.periodos:
+                params.extend((fim, inicio))
+        if consulta.valor_acima_de is not None:
+            where.append("f.valor > ?")
+            params.append(consulta.valor_acima_de)
+        if consulta.valor_ate is not None:
+            where.append("f.valor <= ?")
+            params.append(consulta.valor_ate)
+        if consulta.regras:
+            where.append(
+                f"f.id IN (SELECT finding_id FROM finding_rules WHERE regra IN ({', '.join('?' * len(consulta.regras))}))"
+            )
+            params.extend(consulta.regras)
+
+        query = "SELECT f.tipo, f.payload FROM findings f"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY f.data_inicio, f.ordem, f.id"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [{**json.loads(row["payload"]), "tipo": row["tipo"]} for row in rows]
+
+    def funcionarios(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT funcionario FROM findings WHERE funcionario IS NOT NULL ORDER BY funcionario"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def anos(self) -> List[int]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(data_inicio), MAX(data_fim) FROM findings WHERE data_inicio GLOB '[0-9][0-9][0-9][0-9]-*'"
+            ).fetchone()
+        if not row or not row[0]:
+            return []
+        return list(range(int(row[0][:4]), int(row[1][:4]) + 1))
+
+    def fracionamento_de(self, funcionarios: Iterable[str]) -> List[Tuple[int, str, str]]:
+        """(id, funcionario, data) dos alertas de fracionamento já gravados desses funcionários."""
+        with self._lock:
+            return [
+                tuple(row)
+                for f in funcionarios
+                for row in self._conn.execute(
+                    "SELECT id, funcionario, data FROM findings WHERE tipo = ? AND funcionario = ?",
+                    (STRUCTURING, f),
+                )
+            ]
+
+    def remover(self, ids: Iterable[int]) -> None:
+        with self.transacao():
+            self._conn.executemany("DELETE FROM findings WHERE id = ?", [(i,) for i in ids])
+
+    def achados(self, tipo: str) -> List[Dict]:
+        if tipo == CONTEXTUAL:
+            query = (
+                "SELECT f.payload FROM findings f LEFT JOIN context_rules r ON r.regra = f.regra "
+                "WHERE f.tipo = ? ORDER BY COALESCE(r.ordem, 0), f.ordem, f.id"
+            )
+        else:
+            query = "SELECT payload FROM findings WHERE tipo = ? ORDER BY ordem, id"
+        with self._lock:
+            rows = self._conn.execute(query, (tipo,)).fetchall()
+        return [json.loads(row["payload"]) for row in rows]
+
+    def relatorio(self, policy_path: str | Path) -> Dict:
+        """Mesmo formato de FraudDetectionAgent.executar_auditoria."""
+        return {
+            "policy_path": str(policy_path),
+            "direct_violations": self.achados(DIRECT) + self.achados(STRUCTURING),
+            "contextual_flags": self.achados(CONTEXTUAL),
+        }
+
+    # Regras de contexto ----------------------------------------------------
+
+    def regras_disparadas(self) -> Dict[str, Dict]:
+        """regra -> {"ordem", "qtd_emails", "email"}, na ordem do primeiro disparo."""
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM context_rules ORDER BY ordem").fetchall()
+        return {
+            row["regra"]: {"ordem": row["ordem"], "qtd_emails": row["qtd_emails"], "email": json.loads(row["email"])}
+            for row in rows
+        }
+
+    def salvar_regra(self, regra: str, ordem: int, qtd_emails: int, email: Dict) -> None:
+        """Grava a regra e propaga `qtd_emails` para as flags que ela já gerou."""
+        with self.transacao():
+            self._conn.execute(
+                "INSERT OR REPLACE INTO context_rules (regra, ordem, qtd_emails, email) VALUES (?, ?, ?, ?)",
+                (regra, ordem, qtd_emails, json.dumps(email, ensure_ascii=False)),
+            )
+            self._conn.execute(
+                "UPDATE findings SET payload = json_set(payload, '$.qtd_emails', ?) WHERE tipo = ? AND regra = ?",
+                (qtd_emails, CONTEXTUAL, regra),
+            )
+
+    # Linhas do ledger (estado do fracionamento) ------------------------------
+
+    def adicionar_linhas(self, rows: Iterable[Tuple[int, str, str, str, float]]) -> None:
+        """(ordem, id_transacao, funcionario, data, valor)"""
+        with self.transacao():
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO ledger_rows (ordem, id_transacao, funcionario, data, valor) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def linhas_dos_dias(self, chaves: Iterable[Tuple[str, str]]) -> List[Tuple[int, str, str, str, float]]:
+        """Linhas do ledger de cada (funcionário, dia), em ordem de linha."""
+        with self._lock:
+            rows = [
+                tuple(row)
+                for funcionario, data in chaves
+                for row in self._conn.execute(
+                    "SELECT ordem, id_transacao, funcionario, data, valor FROM ledger_rows "
+                    "WHERE funcionario = ? AND data = ?",
+                    (funcionario, data),
+                )
+            ]
+        return sorted(rows)
+
+    def acumular_dias(self, agregados: Dict[Tuple[str, str], List[float]]) -> None:
+        """Soma agregados (contagem, soma, grandes) aos dias já gravados."""
+        with self.transacao():
+            self._conn.executemany(
+                "INSERT INTO structuring_days (funcionario, data, contagem, soma, grandes) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (funcionario, data) DO UPDATE SET "
+                "contagem = contagem + excluded.contagem, soma = soma + excluded.soma, "
+                "grandes = grandes + excluded.grandes",
+                [(f, d, c, v, g) for (f, d), (c, v, g) in agregados.items()],
+            )
+
+    def dias_de(self, funcionarios: Iterable[str]) -> Dict[Tuple[str, str], List[float]]:
+        with self._lock:
+            return {
+                (row[0], row[1]): [row[2], row[3], row[4]]
+                for f in funcionarios
+                for row in self._conn.execute(
+                    "SELECT funcionario, data, contagem, soma, grandes FROM structuring_days WHERE funcionario = ?",
+                    (f,),
+                )
+            }
@@ -0,0 +1,309 @@
+"""
+Auditoria incremental: a cada execução só as transações e e-mails novos.
+
+O ledger e o dump de e-mails são tratados como arquivos só de acréscimo. Para
+cada fonte fica uma marca d'água no FindingsStore: no ledger, o offset em
+bytes, a quantidade de linhas e o último `id_transacao` auditado; nos
+e-mails, o offset logo após o último separador lido. Na execução seguinte:
+
+- e-mails novos atualizam as regras de contexto disparadas; uma regra que
+  dispara pela primeira vez varre o ledger já auditado em busca das suas
+  transações;
+- transações novas passam pelas regras diretas e de contexto;
+- o fracionamento é recalculado a partir dos agregados por (funcionário,
+  dia) guardados no store, só para os funcionários com transações novas;
+  apenas os alertas cujo período mudou são refeitos.
+
+Se a marca d'água não bate mais com o arquivo (arquivo truncado ou
+reescrito) ou se as regras mudaram, o store é zerado e tudo é reauditado.
+Linhas sem quebra de linha no fim e texto depois do último separador de
+e-mail ficam para a próxima execução.
+
+    cd src
+    python incremental_audit.py --relatorio
+"""
+import argparse
+import csv
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from agent_fraud_detection import EMAIL_SEPARATOR, FraudDetectionAgent
+from findings_store import CONTEXTUAL, DIRECT, STRUCTURING, FindingsStore
+from transaction_table import iter_csv_chunks, to_ordinal
+
+TRANSACOES, EMAILS = "transacoes", "emails"
+SEPARADOR = EMAIL_SEPARATOR.encode("utf-8")
+
+
+def _fim_linhas_completas(path: Path) -> int:
+    """Offset logo após a última quebra de linha do arquivo."""
+    with path.open("rb") as f:
+        fim = f.seek(0, 2)
+        while fim > 0:
+            passo = min(fim, 64 * 1024)
+            f.seek(fim - passo)
+            bloco = f.read(passo)
+            k = bloco.rfind(b"\n")
+            if k >= 0:
+                return fim - passo + k + 1
+            fim -= passo
+    return 0
+
+
+def _inicio_ultima_linha(path: Path, fim: int) -> int:
+    """Offset do início da linha que termina em `fim` (exclusive)."""
+    with path.open("rb") as f:
+        inicio = max(fim - 1, 0)
+        while inicio > 0:
+            passo = min(inicio, 64 * 1024)
+            f.seek(inicio - passo)
+            k = f.read(passo).rfind(b"\n")
+            if k >= 0:
+                return inicio - passo + k + 1
+            inicio -= passo
+    return 0
+
+
+def _cabecalho(path: Path) -> Tuple[List[str], int]:
+    with path.open("rb") as f:
+        linha = f.readline()
+        return next(csv.reader([linha.decode("utf-8")]), []), f.tell()
+
+
+def _id_na_linha(path: Path, offset: int) -> str | None:
+    header, _ = _cabecalho(path)
+    if "id_transacao" not in header:
+        return None
+    with path.open("rb") as f:
+        f.seek(offset)
+        row = next(csv.reader([f.readline().decode("utf-8")]), [])
+    col = header.index("id_transacao")
+    return row[col] if col < len(row) else None
+
+
+def _estado_valido(agente: FraudDetectionAgent, estado_tx: Dict, estado_em: Dict) -> bool:
+    if not estado_tx and not estado_em:
+        return True
+    if estado_em.get("regras", estado_tx.get("regras")) != agente._assinatura_regras():
+        return False
+
+    path = agente.transactions_path
+    if estado_tx and estado_tx.get("path") != str(path):
+        return False
+    if estado_tx.get("linhas"):
+        if not path.exists() or path.stat().st_size < estado_tx["offset"]:
+            return False
+        if _id_na_linha(path, estado_tx["ultima_linha"]) != estado_tx["last_id"]:
+            return False
+
+    offset = estado_em.get("offset", 0)
+    if offset:
+        path = agente.emails_path
+        if estado_em.get("path") != str(path) or not path.exists() or path.stat().st_size < offset:
+            return False
+        with path.open("rb") as f:
+            f.seek(offset - len(SEPARADOR))
+            if f.read(len(SEPARADOR)) != SEPARADOR:
+                return False
+    return True
+
+
+def _ler_emails_novos(agente: FraudDetectionAgent, offset: int) -> Tuple[List[Dict], int]:
+    """E-mails completos (terminados por separador) a partir de `offset`."""
+    path = agente.emails_path
+    if not path.exists():
+        return [], offset
+    with path.open("rb") as f:
+        f.seek(offset)
+        dados = f.read()
+    k = dados.rfind(SEPARADOR)
+    if k < 0:
+        return [], offset
+    fim = k + len(SEPARADOR)
+    return agente._parse_emails(dados[:fim].decode("utf-8")), offset + fim
+
+
+def _evidencia(email: Dict) -> Dict:
+    return {"subject": email.get("subject"), "date": email.get("date"), "body": email.get("body", "")}
+
+
+def _atualizar_regras(agente: FraudDetectionAgent, store: FindingsStore, emails: List[Dict]) -> List[str]:
+    """Soma os e-mails novos às regras de contexto; devolve as que dispararam agora pela primeira vez."""
+    disparadas = store.regras_disparadas()
+    novas = []
+    for rule, email, qtd in agente._regras_contexto_disparadas(emails):
+        atual = disparadas.get(rule["name"])
+        if atual:
+            store.salvar_regra(rule["name"], atual["ordem"], atual["qtd_emails"] + qtd, atual["email"])
+        else:
+            store.salvar_regra(rule["name"], len(disparadas) + len(novas), qtd, _evidencia(email))
+            novas.append(rule["name"])
+    return novas
+
+
+def _disparadas(agente: FraudDetectionAgent, store: FindingsStore, nomes=None) -> List[Tuple[Dict, Dict, int]]:
+    regras = {rule["name"]: rule for rule in agente.context_rules}
+    return [
+        (regras[nome], info["email"], info["qtd_emails"])
+        for nome, info in store.regras_disparadas().items()
+        if nome in regras and (nomes is None or nome in nomes)
+    ]
+
+
+def _periodo(data: str) -> Tuple[int, int]:
+    """Dias (ordinais) cobertos por um alerta: "2008-04-01" ou "2008-04-01 a 2008-04-03"."""
+    inicio, _, fim = data.partition(" a ")
+    return to_ordinal(inicio), to_ordinal(fim or inicio)
+
+
+def _recalcular_fracionamento(agente: FraudDetectionAgent, store: FindingsStore, dias_novos: Dict[str, set]) -> int:
+    """
+    Refaz os clusters dos funcionários com transações novas a partir dos
+    agregados diários. Alertas cujo período não mudou e não recebeu
+    transações novas ficam como estão; só os demais buscam as linhas no store.
+    """
+    funcionarios = sorted(dias_novos)
+    agregados = store.dias_de(funcionarios)
+    grupos = agente._grupos_fracionamento(agregados)
+
+    por_cluster: Dict[int, List[Tuple[str, str]]] = {}
+    for key, n in grupos.items():
+        por_cluster.setdefault(n, []).append(key)
+    periodos = {}
+    for n, chaves in por_cluster.items():
+        ordinais = [to_ordinal(d) for _, d in chaves]
+        periodos[(chaves[0][0], min(ordinais), max(ordinais))] = chaves
+
+    def tocado(funcionario: str, inicio: int, fim: int) -> bool:
+        return any(inicio <= to_ordinal(d) <= fim for d in dias_novos.get(funcionario, ()))
+
+    remover = []
+    for id_, funcionario, data in store.fracionamento_de(funcionarios):
+        periodo = (funcionario, *_periodo(data))
+        if periodo in periodos and not tocado(*periodo):
+            del periodos[periodo]
+        else:
+            remover.append(id_)
+    store.remover(remover)
+
+    alertas = []
+    for chaves in periodos.values():
+        membros = store.linhas_dos_dias(chaves)
+        alerta = agente._alerta_fracionamento(
+            [m[1] for m in membros], [m[3] for m in membros], membros[0][2], sum(m[4] for m in membros)
+        )
+        alertas.append((membros[0][0], alerta))
+    return store.adicionar(STRUCTURING, alertas)
+
+
+def auditar_incremental(
+    agente: FraudDetectionAgent | None = None,
+    store: FindingsStore | None = None,
+    chunk_size: int = 50_000,
+) -> Dict:
+    """
+    Audita o que entrou desde a última execução e grava os achados no store.
+    Devolve um resumo; o relatório completo sai de `store.relatorio(...)`.
+    O fracionamento por fornecedor não roda aqui.
+    """
+    agente = agente or FraudDetectionAgent(carregar_transacoes=False)
+    store = store or FindingsStore()
+    resumo = {"reprocessado": False, "transacoes_novas": 0, "emails_novos": 0, "achados_novos": 0}
+
+    with store.transacao():
+        estado_tx, estado_em = store.estado(TRANSACOES), store.estado(EMAILS)
+        if not estado_tx and not estado_em:
+            # Sem marca d'água: o que houver no store veio de outra origem.
+            store.limpar()
+        elif not _estado_valido(agente, estado_tx, estado_em):
+            store.limpar()
+            estado_tx, estado_em = {}, {}
+            resumo["reprocessado"] = True
+
+        automato = agente._automato()
+        path = agente.transactions_path
+        header_fim = _cabecalho(path)[1] if path.exists() else 0
+        offset = estado_tx.get("offset", header_fim)
+        linhas = estado_tx.get("linhas", 0)
+
+        # E-mails primeiro: as regras disparadas valem também para as transações novas.
+        emails, offset_emails = _ler_emails_novos(agente, estado_em.get("offset", 0))
+        resumo["emails_novos"] = len(emails)
+        regras_novas = _atualizar_regras(agente, store, emails)
+        if regras_novas and linhas:
+            disparadas = _disparadas(agente, store, regras_novas)
+            base = 0
+            for chunk in iter_csv_chunks(path, chunk_size, byte_range=(header_fim, offset)):
+                _, postings = agente._indexar_tabela(chunk, automato)
+                resumo["achados_novos"] += store.adicionar(
+                    CONTEXTUAL, ((base + i, f) for i, f in agente._flags_contexto(chunk, postings, disparadas))
+                )
+                base += len(chunk)
+        store.salvar_estado(
+            EMAILS,
+            {"path": str(agente.emails_path), "offset": offset_emails, "regras": agente._assinatura_regras()},
+        )
+
+        if not path.exists():
+            return resumo
+
+        fim = _fim_linhas_completas(path)
+        disparadas = _disparadas(agente, store)
+        dias_novos: Dict[str, set] = {}
+        last_id = estado_tx.get("last_id")
+        for chunk in iter_csv_chunks(path, chunk_size, byte_range=(offset, fim)) if fim > offset else ():
+            _, postings = agente._indexar_tabela(chunk, automato)
+            resumo["achados_novos"] += store.adicionar(
+                DIRECT, ((linhas + i, f) for i, f in agente._violacoes_diretas(chunk, postings))
+            )
+            resumo["achados_novos"] += store.adicionar(
+                CONTEXTUAL, ((linhas + i, f) for i, f in agente._flags_contexto(chunk, postings, disparadas))
+            )
+            ids = chunk.column("id_transacao")
+            nomes = chunk.column("funcionario")
+            store.adicionar_linhas(
+                zip(range(linhas, linhas + len(chunk)), ids, nomes, chunk.column("data"), chunk.valor.tolist())
+            )
+            agregados: Dict = {}
+            agente._acumular_fracionamento(chunk, agregados)
+            store.acumular_dias(agregados)
+            for funcionario, data in agregados:
+                dias_novos.setdefault(funcionario, set()).add(data)
+            last_id = ids[-1]
+            linhas += len(chunk)
+            resumo["transacoes_novas"] += len(chunk)
+
+        if dias_novos:
+            resumo["achados_novos"] += _recalcular_fracionamento(agente, store, dias_novos)
+        store.salvar_estado(
+            TRANSACOES,
+            {
+                "path": str(path),
+                "offset": max(fim, offset),
+                "linhas": linhas,
+                "last_id": last_id,
+                "ultima_linha": _inicio_ultima_linha(path, fim) if linhas else None,
+                "regras": agente._assinatura_regras(),
+            },
+        )
+    return resumo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", type=Path, default=None)
+    parser.add_argument("--reset", action="store_true", help="zera o store antes de auditar")
+    parser.add_argument("--relatorio", action="store_true", help="imprime o relatório completo do store")
+    args = parser.parse_args()
+
+    agente = FraudDetectionAgent(carregar_transacoes=False)
+    store = FindingsStore(args.db) if args.db else FindingsStore()
+    if args.reset:
+        store.limpar()
+    print(auditar_incremental(agente, store))
+    if args.relatorio:
+        agente.imprimir_relatorio(store.relatorio(agente.policy_path))
+
+
+if __name__ == "__main__":
+    main()
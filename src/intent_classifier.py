@@ -0,0 +1,167 @@
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+EXAMPLES_DIR = BASE_DIR / "data" / "intent_examples"
+
+DEFAULT_THRESHOLD = 0.12
+
+
+def default_threshold() -> float:
+    return float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", DEFAULT_THRESHOLD))
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"[^a-z0-9]+", " ", text).strip()
+
+
+def _features(text: str) -> Counter:
+    norm = _normalize(text)
+    feats: Counter = Counter()
+    for word in norm.split():
+        feats["w:" + word] += 1
+        padded = f" {word} "
+        for n in (3, 4):
+            for i in range(len(padded) - n + 1):
+                feats["c:" + padded[i:i + n]] += 1
+    return feats
+
+
+def _l2(vec: Dict[str, float]) -> Dict[str, float]:
+    norm = math.sqrt(sum(v * v for v in vec.values()))
+    if not norm:
+        return {}
+    return {k: v / norm for k, v in vec.items()}
+
+
+def _dot(a: Dict[str, float], b: Dict[str, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+def load_examples(path: str | Path) -> List[Tuple[str, str]]:
+    """Lê um JSONL com linhas {"text": ..., "intent": ...}."""
+    examples = []
+    with Path(path).open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            item = json.loads(line)
+            examples.append((item["text"], item["intent"]))
+    return examples
+
+
+@dataclass(frozen=True)
+class IntentPrediction:
+    intent: str
+    confidence: float
+
+
+class IntentStats:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.local = 0
+        self.fallback = 0
+
+    def record(self, used_fallback: bool) -> None:
+        with self._lock:
+            if used_fallback:
+                self.fallback += 1
+            else:
+                self.local += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            total = self.local + self.fallback
+            return {
+                "local": self.local,
+                "fallback": self.fallback,
+                "total": total,
+                "fallback_rate": (self.fallback / total) if total else 0.0,
+            }
+
+
+class LocalIntentClassifier:
+    """
+    Classificador de intenção local: TF-IDF (palavras + n-gramas de caracteres)
+    com centróide mais próximo. A confiança é a margem de similaridade entre o
+    centróide vencedor e o segundo colocado; abaixo de `threshold` a decisão
+    fica com o LLM.
+    """
+
+    def __init__(self, examples: Iterable[Tuple[str, str]], threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.stats = IntentStats()
+
+        examples = list(examples)
+        if not examples:
+            raise ValueError("Nenhum exemplo de intenção fornecido.")
+
+        doc_freq: Counter = Counter()
+        feats = []
+        for text, intent in examples:
+            f = _features(text)
+            feats.append((f, intent))
+            doc_freq.update(f.keys())
+
+        n_docs = len(examples)
+        self.idf = {k: math.log((1 + n_docs) / (1 + df)) + 1.0 for k, df in doc_freq.items()}
+
+        sums: Dict[str, Counter] = {}
+        for f, intent in feats:
+            vec = _l2(self._weigh(f))
+            acc = sums.setdefault(intent, Counter())
+            for k, v in vec.items():
+                acc[k] += v
+        self.centroids = {intent: _l2(dict(acc)) for intent, acc in sums.items()}
+
+    @classmethod
+    def from_file(cls, path: str | Path, threshold: Optional[float] = None) -> "LocalIntentClassifier":
+        return cls(load_examples(path), default_threshold() if threshold is None else threshold)
+
+    def _weigh(self, feats: Counter) -> Dict[str, float]:
+        return {k: (1 + math.log(tf)) * self.idf[k] for k, tf in feats.items() if k in self.idf}
+
+    def ranked(self, text: str) -> List[Tuple[float, str]]:
+        """(similaridade, intenção) para todas as intenções, da mais provável à menos."""
+        vec = _l2(self._weigh(_features(text)))
+        return sorted(
+            ((_dot(vec, centroid), intent) for intent, centroid in self.centroids.items()),
+            reverse=True,
+        )
+
+    def predict(self, text: str) -> IntentPrediction:
+        scores = self.ranked(text)
+        best_score, best = scores[0]
+        runner_up = scores[1][0] if len(scores) > 1 else 0.0
+        return IntentPrediction(best, best_score - runner_up)
+
+    def classify(self, text: str, fallback: Callable[[str], str]) -> str:
+        pred = self.predict(text)
+        if pred.confidence >= self.threshold:
+            self.stats.record(used_fallback=False)
+            return pred.intent
+        self.stats.record(used_fallback=True)
+        return fallback(text)
+
+    async def aclassify(self, text: str, fallback: Callable[[str], Awaitable[str]]) -> str:
+        """Como `classify`, com o fallback (LLM) assíncrono."""
+        pred = self.predict(text)
+        if pred.confidence >= self.threshold:
+            self.stats.record(used_fallback=False)
+            return pred.intent
+        self.stats.record(used_fallback=True)
+        return await fallback(text)
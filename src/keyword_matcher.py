@@ -0,0 +1,56 @@
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List
+
+
+class KeywordAutomaton:
+    """
+    Autômato de Aho–Corasick para várias palavras-chave ao mesmo tempo.
+    `find` varre o texto uma única vez e devolve todas as palavras-chave
+    que aparecem nele como substring (mesma semântica de `k in texto`).
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = sorted({k for k in keywords if k})
+
+        goto: List[Dict[str, int]] = [{}]
+        output: List[set] = [set()]
+        for kw in self.keywords:
+            state = 0
+            for ch in kw:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    output.append(set())
+                state = nxt
+            output[state].add(kw)
+
+        # BFS para links de falha; cada estado herda as transições e saídas do
+        # seu link, o que deixa a varredura com um único lookup por caractere.
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            transitions = dict(delta[fail[state]])
+            for ch, nxt in goto[state].items():
+                transitions[ch] = nxt
+                fail[nxt] = delta[fail[state]].get(ch, 0)
+                output[nxt] |= output[fail[nxt]]
+                queue.append(nxt)
+            delta[state] = transitions
+
+        self._delta = delta
+        self._output: List[FrozenSet[str]] = [frozenset(o) for o in output]
+
+    def find(self, text: str) -> FrozenSet[str]:
+        delta = self._delta
+        output = self._output
+        state = 0
+        hits = set()
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if output[state]:
+                hits |= output[state]
+        return frozenset(hits)
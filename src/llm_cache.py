@@ -0,0 +1,344 @@
+"""
+Cache de respostas dos LLMs, compartilhado por todos os agentes.
+
+- Exato: cada ChatGroq recebe `cache=get_llm_cache(...)` (interface BaseCache
+  do LangChain). A chave é o hash de (modelo e parâmetros, incluindo a
+  temperatura; prompt; assinatura dos arquivos de dados do agente).
+- Semântico (opcional): respostas finais guardadas com o embedding da
+  pergunta. Uma pergunta nova no mesmo namespace com similaridade de cosseno
+  >= LLM_CACHE_SEMANTIC_THRESHOLD reaproveita a resposta.
+
+Tudo fica num SQLite (.cache/llm_cache.sqlite3), com expiração por TTL e
+descarte LRU acima de `max_entries`. Quando um arquivo de dados muda (mtime
+ou tamanho), as entradas do escopo gravadas com a assinatura antiga são apagadas.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import warnings
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.embeddings import Embeddings
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration
+
+from embedding_model import get_embeddings
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+LLM_CACHE_PATH = BASE_DIR / ".cache" / "llm_cache.sqlite3"
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    scope TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created REAL NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_used ON responses(used);
+CREATE INDEX IF NOT EXISTS idx_responses_scope ON responses(scope, signature);
+
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY,
+    scope TEXT NOT NULL,
+    namespace TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    question TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    value TEXT NOT NULL,
+    created REAL NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_answers_lookup ON answers(scope, namespace, signature);
+CREATE INDEX IF NOT EXISTS idx_answers_used ON answers(used);
+"""
+
+
+def cache_enabled() -> bool:
+    return os.getenv("LLM_CACHE", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def default_semantic_threshold() -> Optional[float]:
+    value = os.getenv("LLM_CACHE_SEMANTIC_THRESHOLD", "").strip()
+    return float(value) if value else None
+
+
+def data_signature(paths: Iterable[str | Path]) -> str:
+    """Hash de (caminho, mtime, tamanho) dos arquivos; muda quando algum deles muda."""
+    digest = hashlib.sha256()
+    for path in sorted(str(p) for p in paths):
+        try:
+            st = os.stat(path)
+            digest.update(f"{path}|{st.st_mtime_ns}|{st.st_size}\n".encode("utf-8"))
+        except FileNotFoundError:
+            digest.update(f"{path}|ausente\n".encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+class SQLiteCacheBackend:
+    """Tabelas do cache num único arquivo SQLite, seguro entre threads."""
+
+    def __init__(self, path: str | Path = LLM_CACHE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def get(self, key: str, ttl: float) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] + ttl < now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE responses SET used = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def put(self, key: str, scope: str, signature: str, value: str, max_entries: int) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, scope, signature, value, created, used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, scope, signature, value, now, now),
+            )
+            self._evict("responses", "key", max_entries)
+
+    def answers(self, scope: str, namespace: str, signature: str, ttl: float) -> List[Tuple[int, bytes, str]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, embedding, value FROM answers "
+                "WHERE scope = ? AND namespace = ? AND signature = ? AND created >= ?",
+                (scope, namespace, signature, time.time() - ttl),
+            ).fetchall()
+
+    def touch_answer(self, id_: int) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE answers SET used = ? WHERE id = ?", (time.time(), id_))
+
+    def put_answer(
+        self, scope: str, namespace: str, signature: str, question: str, embedding: bytes, value: str, max_entries: int
+    ) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO answers (scope, namespace, signature, question, embedding, value, created, used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (scope, namespace, signature, question, embedding, value, now, now),
+            )
+            self._evict("answers", "id", max_entries)
+
+    def _evict(self, table: str, key: str, max_entries: int) -> None:
+        excesso = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] - max_entries
+        if excesso > 0:
+            self._conn.execute(
+                f"DELETE FROM {table} WHERE {key} IN (SELECT {key} FROM {table} ORDER BY used LIMIT ?)", (excesso,)
+            )
+
+    def purge_stale(self, scope: str, signature: str) -> None:
+        """Apaga as entradas do escopo gravadas com outra assinatura de dados."""
+        with self._lock:
+            for table in ("responses", "answers"):
+                self._conn.execute(f"DELETE FROM {table} WHERE scope = ? AND signature != ?", (scope, signature))
+
+    def clear(self, scope: Optional[str] = None) -> None:
+        with self._lock:
+            for table in ("responses", "answers"):
+                if scope is None:
+                    self._conn.execute(f"DELETE FROM {table}")
+                else:
+                    self._conn.execute(f"DELETE FROM {table} WHERE scope = ?", (scope,))
+
+
+class LLMCache(BaseCache):
+    """
+    Cache de um escopo (um agente). `depends_on` são os arquivos de dados cujas
+    mudanças invalidam as respostas do escopo.
+    """
+
+    def __init__(
+        self,
+        scope: str,
+        depends_on: Iterable[str | Path] = (),
+        backend: Optional[SQLiteCacheBackend] = None,
+        ttl_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        semantic_threshold: Optional[float] = None,
+        embeddings: Optional[Embeddings] = None,
+    ):
+        self.scope = scope
+        self.depends_on = tuple(Path(p) for p in depends_on)
+        self.backend = backend or _get_backend(LLM_CACHE_PATH)
+        self.ttl_seconds = ttl_seconds or float(os.getenv("LLM_CACHE_TTL", DEFAULT_TTL_SECONDS))
+        self.max_entries = max_entries or int(os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+        self.semantic_threshold = semantic_threshold
+        self._embeddings = embeddings
+        self._signature: Optional[str] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def signature(self) -> str:
+        signature = data_signature(self.depends_on)
+        if signature != self._signature:
+            with self._lock:
+                if signature != self._signature:
+                    self.backend.purge_stale(self.scope, signature)
+                    self._signature = signature
+        return signature
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _key(self, prompt: str, llm_string: str, signature: str) -> str:
+        digest = hashlib.sha256()
+        for part in (self.scope, llm_string, prompt, signature):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        value = self.backend.get(self._key(prompt, llm_string, self.signature()), self.ttl_seconds)
+        if value is not None:
+            try:
+                with warnings.catch_warnings():
+                    # `loads` ainda é beta no langchain_core.
+                    warnings.simplefilter("ignore")
+                    generations = [loads(g) for g in json.loads(value)]
+                self._count(True)
+                return generations
+            except Exception:
+                pass
+        self._count(False)
+        return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        signature = self.signature()
+        value = json.dumps([dumps(g) for g in return_val])
+        self.backend.put(self._key(prompt, llm_string, signature), self.scope, signature, value, self.max_entries)
+
+    def clear(self, **kwargs: Any) -> None:
+        self.backend.clear(self.scope)
+
+    @property
+    def semantic(self) -> bool:
+        return self.semantic_threshold is not None
+
+    def _embed(self, question: str) -> Optional[np.ndarray]:
+        try:
+            if self._embeddings is None:
+                self._embeddings = get_embeddings()
+            vector = np.asarray(self._embeddings.embed_query(question), dtype=np.float32)
+        except Exception as e:
+            logger.warning("Cache semântico desligado (%s).", e)
+            self.semantic_threshold = None
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup_answer(self, namespace: str, question: str) -> Optional[str]:
+        """Resposta de uma pergunta parecida o bastante no mesmo namespace."""
+        if not self.semantic:
+            return None
+        rows = self.backend.answers(self.scope, namespace, self.signature(), self.ttl_seconds)
+        vector = self._embed(question) if rows else None
+        if vector is None:
+            return None
+        best, best_score = None, -1.0
+        for id_, blob, value in rows:
+            score = float(np.dot(vector, np.frombuffer(blob, dtype=np.float32)))
+            if score > best_score:
+                best, best_score = (id_, value), score
+        if best is None or best_score < self.semantic_threshold:
+            return None
+        self.backend.touch_answer(best[0])
+        return best[1]
+
+    def update_answer(self, namespace: str, question: str, answer: str) -> None:
+        if not self.semantic:
+            return
+        vector = self._embed(question)
+        if vector is None:
+            return
+        self.backend.put_answer(
+            self.scope, namespace, self.signature(), question, vector.tobytes(), answer, self.max_entries
+        )
+
+
+def stream_text(llm, prompt: str) -> Iterator[str]:
+    """
+    Texto de `llm.stream(prompt)` pedaço a pedaço, passando pelo cache exato do
+    modelo (o stream do LangChain não consulta o cache): um acerto sai inteiro
+    de uma vez e uma resposta nova é gravada quando o stream termina.
+    """
+    cache = llm.cache if isinstance(llm.cache, BaseCache) else None
+    if cache is not None:
+        key = dumps(llm._convert_input(prompt).to_messages())
+        llm_string = llm._get_llm_string()
+        cached = cache.lookup(key, llm_string)
+        if cached:
+            yield cached[0].text
+            return
+
+    parts = []
+    # closing: se o consumidor largar o stream, a vaga do pool é liberada na hora.
+    with closing(llm.stream(prompt)) as chunks:
+        for chunk in chunks:
+            if chunk.content:
+                parts.append(chunk.content)
+                yield chunk.content
+    if cache is not None:
+        cache.update(key, llm_string, [ChatGeneration(message=AIMessage(content="".join(parts)))])
+
+
+_backends: Dict[Path, SQLiteCacheBackend] = {}
+_caches: Dict[str, LLMCache] = {}
+_caches_lock = threading.Lock()
+
+
+def _get_backend(path: Path) -> SQLiteCacheBackend:
+    key = Path(path).resolve()
+    with _caches_lock:
+        backend = _backends.get(key)
+        if backend is None:
+            backend = _backends[key] = SQLiteCacheBackend(key)
+        return backend
+
+
+def get_llm_cache(scope: str, depends_on: Iterable[str | Path] = ()) -> Optional[LLMCache]:
+    """Cache compartilhado do escopo, ou None se LLM_CACHE=0."""
+    if not cache_enabled():
+        return None
+    depends_on = tuple(depends_on)
+    key = f"{scope}|{'|'.join(sorted(str(p) for p in depends_on))}"
+    cache = _caches.get(key)
+    if cache is None:
+        backend = _get_backend(LLM_CACHE_PATH)
+        with _caches_lock:
+            cache = _caches.get(key)
+            if cache is None:
+                cache = _caches[key] = LLMCache(
+                    scope, depends_on, backend, semantic_threshold=default_semantic_threshold()
+                )
+    return cache
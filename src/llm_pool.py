@@ -0,0 +1,264 @@
+"""
+Limite global de chamadas simultâneas aos LLMs.
+
+Todos os modelos de llm_provider são limitados: no máximo LLM_MAX_CONCURRENCY
+chamadas ao provedor ficam em andamento ao mesmo tempo no processo; as
+demais esperam uma vaga. Respostas vindas do cache (llm_cache) não ocupam vaga.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional, Union
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_groq import ChatGroq
+
+DEFAULT_LLM_CONCURRENCY = 8
+
+# Marca o contexto (thread ou tarefa) que já ocupa uma vaga.
+_holding: contextvars.ContextVar[bool] = contextvars.ContextVar("llm_slot_holding", default=False)
+_END = object()
+
+
+def default_llm_concurrency() -> int:
+    return max(1, int(os.getenv("LLM_MAX_CONCURRENCY", DEFAULT_LLM_CONCURRENCY)))
+
+
+class LLMSlots:
+    """
+    Semáforo justo (FIFO) com contadores, utilizável por threads e por
+    corrotinas. Uma vaga liberada passa direto para o waiter mais antigo: um
+    threading.Event (thread) ou um future do event loop da corrotina.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._lock = threading.Lock()
+        self._free = size
+        self._waiters: Deque[Union[threading.Event, asyncio.Future]] = deque()
+        self.in_flight = 0
+        self.waiting = 0
+        self.peak = 0
+
+    def _enter_or_queue(self, waiter) -> bool:
+        """Ocupa uma vaga livre (True) ou entra no fim da fila (False)."""
+        with self._lock:
+            if self._free and not self._waiters:
+                self._free -= 1
+                self._entered()
+                return True
+            self._waiters.append(waiter)
+            self.waiting += 1
+            return False
+
+    def _entered(self) -> None:
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+
+    def _abandon(self, waiter) -> None:
+        """O waiter desistiu (cancelamento, interrupção): sai da fila ou devolve a vaga já recebida."""
+        with self._lock:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                self.waiting -= 1
+                return
+        self.release()
+
+    @staticmethod
+    def _wake(future: asyncio.Future) -> None:
+        # Se a tarefa foi cancelada depois de receber a vaga, _abandon a devolve.
+        if not future.done():
+            future.set_result(None)
+
+    def acquire(self) -> None:
+        event = threading.Event()
+        if self._enter_or_queue(event):
+            return
+        try:
+            event.wait()
+        except BaseException:
+            self._abandon(event)
+            raise
+
+    async def aacquire(self) -> None:
+        future = asyncio.get_running_loop().create_future()
+        if self._enter_or_queue(future):
+            return
+        try:
+            await future
+        except BaseException:
+            self._abandon(future)
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                self.waiting -= 1
+                if isinstance(waiter, threading.Event):
+                    self._entered()
+                    waiter.set()
+                    return
+                try:
+                    waiter.get_loop().call_soon_threadsafe(self._wake, waiter)
+                except RuntimeError:
+                    continue  # event loop já fechado: a vaga vai para o próximo
+                self._entered()
+                return
+            self._free += 1
+
+    @contextmanager
+    def slot(self):
+        if _holding.get():
+            yield
+            return
+        self.acquire()
+        token = _holding.set(True)
+        try:
+            yield
+        finally:
+            _holding.reset(token)
+            self.release()
+
+    @asynccontextmanager
+    async def aslot(self):
+        if _holding.get():
+            yield
+            return
+        await self.aacquire()
+        token = _holding.set(True)
+        try:
+            yield
+        finally:
+            _holding.reset(token)
+            self.release()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {"size": self.size, "in_flight": self.in_flight, "waiting": self.waiting, "peak": self.peak}
+
+
+_slots: Optional[LLMSlots] = None
+_slots_lock = threading.Lock()
+
+
+def get_llm_slots() -> LLMSlots:
+    global _slots
+    with _slots_lock:
+        if _slots is None:
+            _slots = LLMSlots(default_llm_concurrency())
+        return _slots
+
+
+def _streams_natively(cls) -> bool:
+    """Se a classe depois do mixin implementa _stream (e não herda o de BaseChatModel)."""
+    mro = cls.__mro__
+    for base in mro[mro.index(BoundedChatModel) + 1:]:
+        if "_stream" in base.__dict__:
+            return base is not BaseChatModel
+    return False
+
+
+class BoundedChatModel:
+    """
+    Mixin para modelos de chat do LangChain: cada geração ocupa uma vaga do
+    pool. Implementações async que caem nas síncronas (run_in_executor) não
+    pegam uma segunda vaga: a primeira fica marcada no contexto.
+    """
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        with get_llm_slots().slot():
+            return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        async with get_llm_slots().aslot():
+            return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        # A vaga fica ocupada até o último token ou até o consumidor largar o
+        # stream. _holding só vale durante cada passo do stream interno: entre
+        # um yield e outro o contexto é do consumidor.
+        inner = self._stream_unbounded(messages, stop=stop, run_manager=run_manager, **kwargs)
+        if _holding.get():
+            yield from inner
+            return
+        slots = get_llm_slots()
+        slots.acquire()
+        try:
+            while True:
+                token = _holding.set(True)
+                try:
+                    chunk = next(inner, _END)
+                finally:
+                    _holding.reset(token)
+                if chunk is _END:
+                    return
+                yield chunk
+        finally:
+            inner.close()
+            slots.release()
+
+    def _stream_unbounded(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        if _streams_natively(type(self)):
+            yield from super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            return
+        # Modelo sem streaming: a resposta inteira vira um único pedaço.
+        result = super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        yield ChatGenerationChunk(message=AIMessageChunk(content=result.generations[0].message.content))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        inner = super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs)
+        if _holding.get():
+            async for chunk in inner:
+                yield chunk
+            return
+        slots = get_llm_slots()
+        await slots.aacquire()
+        try:
+            while True:
+                token = _holding.set(True)
+                try:
+                    chunk = await anext(inner, _END)
+                finally:
+                    _holding.reset(token)
+                if chunk is _END:
+                    return
+                yield chunk
+        finally:
+            await inner.aclose()
+            slots.release()
+
+
+class BoundedChatGroq(BoundedChatModel, ChatGroq):
+    pass
@@ -0,0 +1,305 @@
+"""
+Provedor de LLM compartilhado pelos agentes.
+
+LLM_PROVIDER escolhe o backend de todos os modelos de chat:
+
+- groq (padrão): ChatGroq, com o limite de concorrência de llm_pool.
+- stub: modelo local e determinístico, sem rede nem chave. Responde com
+  respostas gravadas ou regras (LLM_STUB_REPLAY) e espera uma latência
+  sorteada de LLM_STUB_LATENCY. Serve para medir orquestração, busca e parsing
+  separados do tempo do Groq.
+
+Com LLM_RECORD=<arquivo.jsonl>, cada resposta do provedor (ex.: Groq) é gravada
+no formato que o stub reproduz.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    BaseCallbackHandler,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult, LLMResult
+from pydantic import PrivateAttr
+
+from llm_pool import BoundedChatGroq, BoundedChatModel
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+STUB_REPLAY_PATH = BASE_DIR / "data" / "llm_stub" / "responses.jsonl"
+
+DEFAULT_PROVIDER = "groq"
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
+PROVIDERS = ("groq", "stub")
+
+
+def default_provider() -> str:
+    return os.getenv("LLM_PROVIDER", DEFAULT_PROVIDER).strip().lower() or DEFAULT_PROVIDER
+
+
+def default_stub_replay() -> str:
+    return os.getenv("LLM_STUB_REPLAY") or str(STUB_REPLAY_PATH)
+
+
+def default_stub_latency() -> str:
+    return os.getenv("LLM_STUB_LATENCY", "fixed:0")
+
+
+def default_stub_seed() -> int:
+    return int(os.getenv("LLM_STUB_SEED", 0))
+
+
+def prompt_text(messages: List[BaseMessage]) -> str:
+    return "\n".join(str(m.content) for m in messages)
+
+
+def prompt_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Distribuição de latência, em segundos:
+    "0.3" ou "fixed:0.3", "uniform:0.1,0.5", "normal:média,desvio" (truncada
+    em zero) e "lognormal:mediana,sigma" (cauda longa, como APIs reais).
+    """
+    kind, _, params = spec.strip().partition(":")
+    if not params:
+        kind, params = "fixed", kind
+    try:
+        values = [float(v) for v in params.split(",")]
+    except ValueError:
+        raise ValueError(f"Latência inválida: {spec!r}") from None
+
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: max(0.0, values[0])
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal" and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal" and len(values) == 2:
+        return lambda rng: values[0] * math.exp(rng.gauss(0.0, values[1]))
+    raise ValueError(f"Latência inválida: {spec!r} (use fixed, uniform, normal ou lognormal)")
+
+
+def load_replay(paths: str) -> Tuple[Dict[str, str], List[Tuple[re.Pattern, str]]]:
+    """
+    Lê arquivos JSONL (separados por os.pathsep) com linhas
+    {"prompt_sha256": ..., "response": ...} (gravadas com LLM_RECORD) ou
+    {"match": "<regex>", "response": ...} (regras, na ordem do arquivo).
+    """
+    recorded: Dict[str, str] = {}
+    rules: List[Tuple[re.Pattern, str]] = []
+    for path in filter(None, paths.split(os.pathsep)):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                item = json.loads(line)
+                if "prompt_sha256" in item:
+                    recorded[item["prompt_sha256"]] = item["response"]
+                else:
+                    rules.append((re.compile(item["match"], re.IGNORECASE | re.DOTALL), item["response"]))
+    return recorded, rules
+
+
+class StubChatModel(BaseChatModel):
+    """
+    LLM local e determinístico. A resposta é a gravada para o mesmo prompt,
+    senão a da primeira regra que casar, senão `default_response`. A latência
+    vem de `latency` com semente derivada de `seed`, do prompt e de quantas
+    vezes ele já foi pedido: a sequência de esperas de cada prompt é sempre a
+    mesma, qualquer que seja a ordem entre prompts diferentes.
+    """
+
+    model_name: str = "stub"
+    replay: str = ""
+    latency: str = "fixed:0"
+    seed: int = 0
+    default_response: str = ""
+
+    _responses: Optional[Tuple[Dict[str, str], List[Tuple[re.Pattern, str]]]] = PrivateAttr(default=None)
+    _sample: Optional[Callable[[random.Random], float]] = PrivateAttr(default=None)
+    _calls: Dict[str, int] = PrivateAttr(default_factory=dict)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name, "replay": self.replay, "default_response": self.default_response}
+
+    def _load(self) -> None:
+        with self._lock:
+            if self._responses is None:
+                self._sample = parse_latency(self.latency)
+                self._responses = load_replay(self.replay)
+
+    def respond(self, messages: List[BaseMessage]) -> Tuple[str, float]:
+        """(resposta, segundos de espera) para as mensagens."""
+        self._load()
+        text = prompt_text(messages)
+        key = prompt_key(text)
+        recorded, rules = self._responses
+        response = recorded.get(key)
+        if response is None:
+            response = next((r for pattern, r in rules if pattern.search(text)), self.default_response)
+        with self._lock:
+            n = self._calls.get(key, 0)
+            self._calls[key] = n + 1
+        delay = self._sample(random.Random(f"{self.seed}:{key}:{n}"))
+        return response, delay
+
+    @staticmethod
+    def _result(response: str) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=response))])
+
+    @staticmethod
+    def _chunks(response: str) -> List[str]:
+        return re.findall(r"\S+\s*|\s+", response) or [""]
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        response, delay = self.respond(messages)
+        time.sleep(delay)
+        return self._result(response)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        response, delay = self.respond(messages)
+        await asyncio.sleep(delay)
+        return self._result(response)
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        # A latência toda antes do primeiro token; o resto sai palavra a palavra.
+        response, delay = self.respond(messages)
+        time.sleep(delay)
+        for piece in self._chunks(response):
+            if run_manager:
+                run_manager.on_llm_new_token(piece)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        response, delay = self.respond(messages)
+        await asyncio.sleep(delay)
+        for piece in self._chunks(response):
+            if run_manager:
+                await run_manager.on_llm_new_token(piece)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+
+class BoundedStubChatModel(BoundedChatModel, StubChatModel):
+    pass
+
+
+class ReplayRecorder(BaseCallbackHandler):
+    """Grava prompt e resposta de cada chamada em JSONL, no formato de load_replay."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._prompts: Dict[Any, str] = {}
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized, messages: List[List[BaseMessage]], *, run_id, **kwargs) -> None:
+        self._prompts[run_id] = prompt_text(messages[0])
+
+    def on_llm_end(self, response: LLMResult, *, run_id, **kwargs) -> None:
+        text = self._prompts.pop(run_id, None)
+        if text is None:
+            return
+        item = {"prompt_sha256": prompt_key(text), "prompt": text, "response": response.generations[0][0].text}
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+    def on_llm_error(self, error: BaseException, *, run_id, **kwargs) -> None:
+        self._prompts.pop(run_id, None)
+
+
+_recorders: Dict[str, ReplayRecorder] = {}
+_recorders_lock = threading.Lock()
+
+
+def _recorder() -> Optional[ReplayRecorder]:
+    path = os.getenv("LLM_RECORD")
+    if not path:
+        return None
+    with _recorders_lock:
+        if path not in _recorders:
+            _recorders[path] = ReplayRecorder(path)
+        return _recorders[path]
+
+
+def make_chat_model(
+    api_key: Optional[str] = None,
+    model_name: str = DEFAULT_MODEL,
+    temperature: float = 0.0,
+    cache=None,
+    provider: Optional[str] = None,
+    **kwargs: Any,
+) -> BaseChatModel:
+    """
+    Modelo de chat do provedor configurado, sempre limitado pelo pool de
+    llm_pool. `kwargs` (ex.: max_tokens) só valem para o Groq.
+    """
+    provider = provider or default_provider()
+    recorder = _recorder()
+    callbacks = [recorder] if recorder else None
+
+    if provider == "groq":
+        if not api_key:
+            raise RuntimeError("GROQ_API_KEY não definida no ambiente.")
+        return BoundedChatGroq(
+            api_key=api_key,
+            model_name=model_name,
+            temperature=temperature,
+            cache=cache,
+            callbacks=callbacks,
+            **kwargs,
+        )
+    if provider == "stub":
+        return BoundedStubChatModel(
+            replay=default_stub_replay(),
+            latency=default_stub_latency(),
+            seed=default_stub_seed(),
+            cache=cache,
+            callbacks=callbacks,
+        )
+    raise ValueError(f"LLM_PROVIDER desconhecido: {provider!r} (use {', '.join(PROVIDERS)})")
@@ -0,0 +1,216 @@
+"""
+Auditoria de fraude em paralelo, com um pool de processos.
+
+O ledger (um ou vários CSVs) é dividido em partições:
+
+- "bytes": fatias de bytes alinhadas a linhas (split_byte_ranges); escala
+  com o número de processos porque cada um lê só a sua fatia.
+- "funcionario": cada processo lê os arquivos inteiros e fica só com os
+  funcionários da sua partição (hash estável do nome).
+
+Cada partição roda as mesmas regras de FraudDetectionAgent. O fracionamento
+é feito em duas fases para continuar correto entre partições: a primeira
+devolve agregados por (funcionário, dia), que são somados aqui para achar os
+grupos suspeitos; a segunda busca os IDs só nas partições que têm esses
+grupos. A junção é determinística e segue a ordem das linhas, então o
+resultado é o mesmo de `executar_auditoria` sobre os arquivos concatenados.
+
+    cd src
+    python parallel_audit.py ../data/transacoes_bancarias.csv --workers 4
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Literal, Optional, Sequence, Tuple
+
+from agent_fraud_detection import EMAILS_PATH, POLICY_PATH, TRANSACTIONS_PATH, FraudDetectionAgent
+from transaction_table import (
+    TransactionTable,
+    iter_csv_chunks,
+    iter_csv_partition,
+    iter_csv_rows,
+    split_byte_ranges,
+    to_float,
+)
+
+Particao = Literal["bytes", "funcionario"]
+
+# Uma partição: (índice do arquivo, caminho, modo, (início, fim) ou (parte, partes)).
+Spec = Tuple[int, str, str, Tuple[int, int]]
+
+# Estado de cada processo do pool, montado uma vez em _iniciar_worker.
+_AGENTE: Optional[FraudDetectionAgent] = None
+_DISPARADAS: list = []
+_CHUNK_SIZE = 50_000
+
+
+def _iniciar_worker(opcoes: Dict, chunk_size: int) -> None:
+    global _AGENTE, _DISPARADAS, _CHUNK_SIZE
+    _AGENTE = FraudDetectionAgent(carregar_transacoes=False, **opcoes)
+    _DISPARADAS = _AGENTE._regras_contexto_disparadas()
+    _CHUNK_SIZE = chunk_size
+
+
+def _blocos(spec: Spec) -> Iterator[Tuple[TransactionTable, object]]:
+    """
+    Blocos da partição, cada um com a função que dá a posição global de uma
+    linha: (arquivo, início da fatia, linha na fatia) ou (arquivo, linha no arquivo).
+    """
+    arquivo, path, modo, faixa = spec
+    if modo == "bytes":
+        for c, chunk in enumerate(iter_csv_chunks(path, _CHUNK_SIZE, byte_range=faixa)):
+            yield chunk, (lambda i, base=c * _CHUNK_SIZE: (arquivo, faixa[0], base + i))
+    else:
+        parte, partes = faixa
+        for linhas, chunk in iter_csv_partition(path, "funcionario", parte, partes, _CHUNK_SIZE):
+            yield chunk, (lambda i, linhas=linhas: (arquivo, int(linhas[i])))
+
+
+def _auditar_particao(spec: Spec) -> Dict:
+    """Fase 1: achados diretos, flags de contexto e agregados de fracionamento."""
+    agente = _AGENTE
+    automato = agente._automato()
+    regra_idx = {rule["name"]: k for k, (rule, _, _) in enumerate(_DISPARADAS)}
+    diretos, contexto = [], []
+    agregados: Dict = {}
+    for chunk, ordem in _blocos(spec):
+        _, postings = agente._indexar_tabela(chunk, automato)
+        diretos.extend((ordem(i), f) for i, f in agente._violacoes_diretas(chunk, postings))
+        contexto.extend(
+            ((regra_idx[f["regra"]], ordem(i)), f) for i, f in agente._flags_contexto(chunk, postings, _DISPARADAS)
+        )
+        agente._acumular_fracionamento(chunk, agregados)
+    return {"direct": diretos, "contextual": contexto, "agregados": agregados}
+
+
+def _membros_particao(args: Tuple[Spec, Dict]) -> Dict[int, List[tuple]]:
+    """
+    Fase 2: linhas da partição que pertencem aos grupos suspeitos. Basta ler as
+    linhas cruas: `cluster_da_chave` já vem restrito aos grupos desta partição.
+    """
+    (arquivo, path, modo, faixa), cluster_da_chave = args
+    reader = iter_csv_rows(path, faixa if modo == "bytes" else None)
+    header = next(reader, [])
+    if not all(col in header for col in ("id_transacao", "funcionario", "data", "valor")):
+        return {}
+    c_id, c_func, c_data, c_valor = (
+        header.index(col) for col in ("id_transacao", "funcionario", "data", "valor")
+    )
+    largura = max(c_id, c_func, c_data, c_valor) + 1
+
+    membros: Dict[int, List[tuple]] = {}
+    n = -1
+    for linha, row in enumerate(reader):
+        if not row:
+            continue
+        n += 1
+        if len(row) < largura:
+            continue
+        key = (row[c_func], row[c_data])
+        cluster = cluster_da_chave.get(key)
+        if cluster is None:
+            continue
+        ordem = (arquivo, faixa[0], n) if modo == "bytes" else (arquivo, linha)
+        membros.setdefault(cluster, []).append((ordem, row[c_id], key[0], key[1], to_float(row[c_valor])))
+    return membros
+
+
+def particionar(paths: Sequence[Path], workers: int, particao: Particao = "bytes") -> List[Spec]:
+    if particao == "funcionario":
+        return [(a, str(p), particao, (k, workers)) for a, p in enumerate(paths) for k in range(workers)]
+    if particao != "bytes":
+        raise ValueError(f"Partição desconhecida: {particao!r}")
+
+    # Algumas fatias por processo equilibram arquivos de tamanhos diferentes.
+    total = sum(os.path.getsize(p) for p in paths) or 1
+    specs: List[Spec] = []
+    for a, p in enumerate(paths):
+        partes = max(1, round(4 * workers * os.path.getsize(p) / total))
+        specs.extend((a, str(p), particao, faixa) for faixa in split_byte_ranges(p, partes))
+    return specs
+
+
+def auditar_em_paralelo(
+    paths: Sequence[str | Path] | None = None,
+    workers: int | None = None,
+    particao: Particao = "bytes",
+    chunk_size: int = 50_000,
+    emails_path: Path = EMAILS_PATH,
+    policy_path: Path = POLICY_PATH,
+    janela_fracionamento_dias: int = 1,
+    limite_fracionamento: float = 500.0,
+) -> Dict:
+    """
+    Mesmo formato de FraudDetectionAgent.executar_auditoria. Com workers=1 roda
+    no próprio processo. O fracionamento por fornecedor não roda aqui.
+    """
+    paths = [Path(p) for p in (paths or [TRANSACTIONS_PATH])]
+    paths = [p for p in paths if p.exists()]
+    workers = workers or os.cpu_count() or 1
+    opcoes = {
+        "emails_path": emails_path,
+        "policy_path": policy_path,
+        "janela_fracionamento_dias": janela_fracionamento_dias,
+        "limite_fracionamento": limite_fracionamento,
+    }
+    specs = particionar(paths, workers, particao)
+
+    if workers == 1:
+        _iniciar_worker(opcoes, chunk_size)
+        return _combinar(_AGENTE, specs, list(map(_auditar_particao, specs)), lambda fn, xs: list(map(fn, xs)))
+
+    with ProcessPoolExecutor(workers, initializer=_iniciar_worker, initargs=(opcoes, chunk_size)) as pool:
+        fases = list(pool.map(_auditar_particao, specs))
+        agente = FraudDetectionAgent(carregar_transacoes=False, **opcoes)
+        return _combinar(agente, specs, fases, lambda fn, xs: list(pool.map(fn, xs)))
+
+
+def _combinar(agente: FraudDetectionAgent, specs: List[Spec], fases: List[Dict], mapear) -> Dict:
+    diretos = sorted((item for fase in fases for item in fase["direct"]), key=lambda item: item[0])
+    contexto = sorted((item for fase in fases for item in fase["contextual"]), key=lambda item: item[0])
+
+    agregados: Dict = {}
+    for fase in fases:
+        for key, (c, v, g) in fase["agregados"].items():
+            acc = agregados.setdefault(key, [0, 0.0, 0.0])
+            acc[0] += c
+            acc[1] += v
+            acc[2] += g
+
+    alertas: List[Dict] = []
+    cluster_da_chave = agente._grupos_fracionamento(agregados)
+    if cluster_da_chave:
+        # Cada partição recebe só os grupos suspeitos que ela contém.
+        tarefas = []
+        for spec, fase in zip(specs, fases):
+            local = {k: cluster_da_chave[k] for k in fase["agregados"] if k in cluster_da_chave}
+            if local:
+                tarefas.append((spec, local))
+        membros: Dict[int, List[tuple]] = {}
+        for parcial in mapear(_membros_particao, tarefas):
+            for n, linhas in parcial.items():
+                membros.setdefault(n, []).extend(linhas)
+        alertas = agente._alertas_de_membros(membros)
+
+    return {
+        "policy_path": str(agente.policy_path),
+        "direct_violations": [f for _, f in diretos] + alertas,
+        "contextual_flags": [f for _, f in contexto],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="*", type=Path, default=[TRANSACTIONS_PATH])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--particao", choices=["bytes", "funcionario"], default="bytes")
+    parser.add_argument("--janela", type=int, default=1)
+    args = parser.parse_args()
+
+    report = auditar_em_paralelo(args.paths, args.workers, args.particao, janela_fracionamento_dias=args.janela)
+    FraudDetectionAgent(carregar_transacoes=False).imprimir_relatorio(report)
+
+
+if __name__ == "__main__":
+    main()
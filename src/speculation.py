@@ -0,0 +1,138 @@
+"""
+Execução especulativa enquanto o LLM classifica a intenção.
+
+Quando a intenção depende do LLM, o trabalho barato e sem efeitos colaterais
+das intenções mais prováveis (busca no FAISS da política, pré-filtro dos
+e-mails, relatório de fraude) começa junto com a classificação. O ramo da
+intenção vencedora é aproveitado; os demais são cancelados. Os ramos são
+funções bloqueantes num pool de threads, então servem tanto ao caminho
+síncrono (invoke) quanto ao async; o ramo que já começou termina em
+background e o resultado é descartado.
+
+Ligado por SPECULATIVE_PREFETCH=1 (padrão desligado).
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+DEFAULT_BRANCHES = 2
+
+
+def default_speculative() -> bool:
+    return os.getenv("SPECULATIVE_PREFETCH", "0").lower() in ("1", "true", "yes", "on")
+
+
+def default_branches() -> int:
+    return max(1, int(os.getenv("SPECULATIVE_BRANCHES", DEFAULT_BRANCHES)))
+
+
+class SpeculationStats:
+    """
+    Acertos: a intenção vencedora tinha ramo especulativo. Latência poupada:
+    quanto do ramo vencedor rodou em paralelo com a classificação.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rounds = 0
+        self.branches = 0
+        self.hits = 0
+        self.cancelled = 0
+        self.saved_seconds = 0.0
+
+    def record(self, branches: int, hit: bool, cancelled: int, saved: float) -> None:
+        with self._lock:
+            self.rounds += 1
+            self.branches += branches
+            self.cancelled += cancelled
+            if hit:
+                self.hits += 1
+                self.saved_seconds += saved
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "rounds": self.rounds,
+                "branches": self.branches,
+                "hits": self.hits,
+                "cancelled": self.cancelled,
+                "hit_rate": (self.hits / self.rounds) if self.rounds else 0.0,
+                "saved_seconds": round(self.saved_seconds, 4),
+                "avg_saved_seconds": round(self.saved_seconds / self.hits, 4) if self.hits else 0.0,
+            }
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(thread_name_prefix="speculation")
+        return _executor
+
+
+class Speculation:
+    """Ramos especulativos de uma única classificação."""
+
+    def __init__(self, stats: SpeculationStats):
+        self.stats = stats
+        self.started = time.perf_counter()
+        self._futures: Dict[str, Future] = {}
+        self._finished: Dict[str, float] = {}
+
+    def start(self, branch: str, fn: Callable, *args: Any) -> None:
+        if branch in self._futures:
+            return
+        self._futures[branch] = _get_executor().submit(self._timed, branch, fn, *args)
+
+    def _timed(self, branch: str, fn: Callable, *args: Any):
+        try:
+            return fn(*args)
+        finally:
+            self._finished[branch] = time.perf_counter()
+
+    def resolve(self, branch: str) -> Optional[Future]:
+        """
+        Chamado quando a classificação termina: devolve o future do ramo
+        vencedor (None se não foi especulado) e cancela os outros.
+        """
+        decided = time.perf_counter()
+        winner = self._futures.pop(branch, None)
+        for future in self._futures.values():
+            future.cancel()
+        if self._futures or winner is not None:
+            saved = min(self._finished.get(branch, decided), decided) - self.started
+            self.stats.record(
+                branches=len(self._futures) + (winner is not None),
+                hit=winner is not None,
+                cancelled=len(self._futures),
+                saved=saved,
+            )
+        self._futures = {}
+        return winner
+
+
+def take(future: Optional[Future]):
+    """Resultado do ramo vencedor, ou None se não havia ramo ou ele falhou."""
+    if future is None:
+        return None
+    try:
+        return future.result()
+    except Exception:
+        return None
+
+
+async def atake(future: Optional[Future]):
+    """Como `take`, sem bloquear o event loop."""
+    if future is None:
+        return None
+    try:
+        return await asyncio.wrap_future(future)
+    except Exception:
+        return None
@@ -0,0 +1,29 @@
+"""
+Ledger sintético para benchmarks e testes da auditoria: reamostra as linhas
+do CSV real, sorteando funcionário, data e valor.
+"""
+import csv
+import random
+from datetime import date, timedelta
+from pathlib import Path
+
+from agent_fraud_detection import TRANSACTIONS_PATH
+
+
+def synthetic_ledger(path: Path, rows: int, employees: int = 2000, days: int = 365, seed: int = 42) -> None:
+    rng = random.Random(seed)
+    with TRANSACTIONS_PATH.open("r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames
+        base = list(reader)
+    inicio = date(2008, 1, 1)
+    with path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for i in range(rows):
+            row = dict(rng.choice(base))
+            row["id_transacao"] = f"TX_{i}"
+            row["funcionario"] = f"Funcionario {rng.randrange(employees)}"
+            row["data"] = (inicio + timedelta(days=rng.randrange(days))).isoformat()
+            row["valor"] = f"{rng.lognormvariate(4.0, 1.0):.2f}"
+            writer.writerow(row)
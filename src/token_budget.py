@@ -0,0 +1,84 @@
+import logging
+import math
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Palavras, números e pontuação: aproxima a pré-tokenização dos BPEs (Llama 3, GPT).
+_PIECES = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimativa sem tokenizer: cada palavra vale ~1 token a cada 4 caracteres,
+    cada sinal de pontuação vale 1. Costuma errar para cima, o que é o lado
+    seguro para um orçamento.
+    """
+    total = 0
+    for piece in _PIECES.findall(text or ""):
+        total += math.ceil(len(piece) / CHARS_PER_TOKEN) if piece[0].isalnum() or piece[0] == "_" else 1
+    return total
+
+
+class TokenCounter:
+    """
+    Conta tokens com o tokenizer do modelo quando há um configurado em
+    LLM_TOKENIZER (caminho de um tokenizer.json ou id no HuggingFace Hub, já
+    em cache). Sem tokenizer, ou se ele não carregar, usa estimate_tokens.
+    """
+
+    def __init__(self, tokenizer: Optional[str] = None):
+        self.tokenizer_name = tokenizer if tokenizer is not None else os.getenv("LLM_TOKENIZER", "")
+        self._tokenizer = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _get_tokenizer(self):
+        if self._loaded:
+            return self._tokenizer
+        with self._lock:
+            if not self._loaded:
+                self._tokenizer = self._load(self.tokenizer_name)
+                self._loaded = True
+        return self._tokenizer
+
+    @staticmethod
+    def _load(name: str):
+        if not name:
+            return None
+        try:
+            from tokenizers import Tokenizer
+
+            if Path(name).exists():
+                return Tokenizer.from_file(name)
+            return Tokenizer.from_pretrained(name)
+        except Exception as e:
+            logger.warning("Tokenizer %s indisponível (%s); usando estimativa.", name, e)
+            return None
+
+    def count(self, text: str) -> int:
+        tokenizer = self._get_tokenizer()
+        if tokenizer is None:
+            return estimate_tokens(text)
+        return len(tokenizer.encode(text or "", add_special_tokens=False).ids)
+
+
+_counter: Optional[TokenCounter] = None
+_counter_lock = threading.Lock()
+
+
+def get_token_counter() -> TokenCounter:
+    global _counter
+    with _counter_lock:
+        if _counter is None:
+            _counter = TokenCounter()
+        return _counter
+
+
+def count_tokens(text: str) -> int:
+    return get_token_counter().count(text)
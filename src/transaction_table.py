@@ -0,0 +1,304 @@
+import csv
+import os
+import zlib
+from array import array
+from collections.abc import Sequence
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+CATEGORICAL_COLUMNS = ("data", "funcionario", "cargo", "categoria", "departamento")
+
+
+def to_float(value: str) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def to_ordinal(value: str) -> int:
+    try:
+        return date.fromisoformat(value).toordinal()
+    except (TypeError, ValueError):
+        return -1
+
+
+class TableBuilder:
+    """Monta uma TransactionTable linha a linha, já codificando as colunas categóricas."""
+
+    def __init__(self, fieldnames: List[str]):
+        self.fieldnames = list(fieldnames)
+        if "valor" not in self.fieldnames:
+            self.fieldnames.append("valor")
+        self.valor = array("d")
+        self.codes: Dict[str, array] = {}
+        self.lookups: Dict[str, Dict[str, int]] = {}
+        self.text: Dict[str, List[str]] = {}
+
+        appenders = []
+        for name in self.fieldnames:
+            if name == "valor":
+                appenders.append(self._append_valor)
+            elif name in CATEGORICAL_COLUMNS:
+                self.codes[name] = array("i")
+                self.lookups[name] = {}
+                appenders.append(self._categorical_appender(self.codes[name], self.lookups[name]))
+            else:
+                self.text[name] = []
+                appenders.append(self.text[name].append)
+        self._appenders = appenders
+
+    def _append_valor(self, value) -> None:
+        self.valor.append(to_float(value))
+
+    @staticmethod
+    def _categorical_appender(codes: array, lookup: Dict[str, int]):
+        def append(value):
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(lookup)
+            codes.append(code)
+        return append
+
+    def __len__(self) -> int:
+        return len(self.valor)
+
+    def append(self, values: List[str]) -> None:
+        """`values` na ordem de `fieldnames`; colunas faltantes viram string vazia."""
+        if len(values) < len(self._appenders):
+            values = list(values) + [""] * (len(self._appenders) - len(values))
+        for append, value in zip(self._appenders, values):
+            append(value if value is not None else "")
+
+    def append_dict(self, row: Dict) -> None:
+        self.append([row.get(name) for name in self.fieldnames])
+
+    def build(self) -> "TransactionTable":
+        return TransactionTable(
+            self.fieldnames,
+            np.array(self.valor, dtype=np.float64),
+            {name: np.array(c, dtype=np.int32) for name, c in self.codes.items()},
+            {name: list(lookup) for name, lookup in self.lookups.items()},
+            self.text,
+        )
+
+
+class TransactionTable(Sequence):
+    """
+    Tabela colunar de transações.
+
+    - `valor`: float64
+    - colunas categóricas (funcionário, cargo, categoria, departamento, data):
+      códigos int32 + lista de rótulos
+    - `data_ordinal`: datas como ordinais (-1 quando inválidas)
+    - demais colunas (id, descrição): listas de str
+
+    Indexar ou iterar devolve dicts no mesmo formato de antes
+    (`csv.DictReader` com `valor` já convertido).
+    """
+
+    def __init__(
+        self,
+        fieldnames: List[str],
+        valor: np.ndarray,
+        codes: Dict[str, np.ndarray],
+        labels: Dict[str, List[str]],
+        text: Dict[str, List[str]],
+    ):
+        self.fieldnames = list(fieldnames)
+        self.valor = valor
+        self.codes = codes
+        self.labels = labels
+        self.text = text
+        self._n = len(valor)
+
+        if "data" in labels:
+            ordinals = np.array([to_ordinal(d) for d in labels["data"]], dtype=np.int32)
+            self.data_ordinal = ordinals[codes["data"]]
+        else:
+            self.data_ordinal = np.full(self._n, -1, dtype=np.int32)
+
+    @classmethod
+    def empty(cls) -> "TransactionTable":
+        return TableBuilder([]).build()
+
+    @classmethod
+    def from_rows(cls, fieldnames: List[str], rows: Iterable[Dict]) -> "TransactionTable":
+        builder = TableBuilder(fieldnames)
+        for row in rows:
+            builder.append_dict(row)
+        return builder.build()
+
+    @classmethod
+    def from_csv(cls, path: str | Path) -> "TransactionTable":
+        with Path(path).open("r", encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            builder = TableBuilder(next(reader, []))
+            for row in reader:
+                if row:
+                    builder.append(row)
+            return builder.build()
+
+    def __len__(self) -> int:
+        return self._n
+
+    def column(self, name: str) -> List:
+        """Valores de uma coluna, linha a linha."""
+        return self.take(name, None)
+
+    def take(self, name: str, rows) -> List:
+        """Valores da coluna `name` nas posições `rows` (todas, se None)."""
+        if name == "valor":
+            return (self.valor if rows is None else self.valor[rows]).tolist()
+        if name in self.text:
+            col = self.text[name]
+            return col if rows is None else [col[i] for i in rows]
+        if name not in self.labels:
+            return [""] * (self._n if rows is None else len(rows))
+        labels = np.empty(len(self.labels[name]), dtype=object)
+        labels[:] = self.labels[name]
+        codes = self.codes[name] if rows is None else self.codes[name][rows]
+        return labels[codes].tolist()
+
+    def mask_in(self, name: str, predicate) -> np.ndarray:
+        """Máscara booleana das linhas cujo rótulo categórico satisfaz `predicate`."""
+        if name not in self.codes:
+            return np.zeros(self._n, dtype=bool)
+        hits = np.array([bool(predicate(label)) for label in self.labels[name]], dtype=bool)
+        return hits[self.codes[name]]
+
+    def row(self, i: int) -> Dict:
+        result = {}
+        for name in self.fieldnames:
+            if name == "valor":
+                result[name] = float(self.valor[i])
+            elif name in self.codes:
+                result[name] = self.labels[name][self.codes[name][i]]
+            else:
+                result[name] = self.text[name][i]
+        return result
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.row(j) for j in range(*i.indices(self._n))]
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError(i)
+        return self.row(i)
+
+    def __iter__(self) -> Iterator[Dict]:
+        columns = [(name, self.column(name)) for name in self.fieldnames]
+        for i in range(self._n):
+            yield {name: col[i] for name, col in columns}
+
+
+def _iter_lines(path: str | Path, byte_range: Optional[Tuple[int, int]] = None) -> Iterator[str]:
+    """Linhas do arquivo (cabeçalho primeiro); com `byte_range`, só as que começam no intervalo."""
+    with Path(path).open("rb") as f:
+        header = f.readline()
+        yield header.decode("utf-8")
+        pos = f.tell()
+        start, end = byte_range if byte_range else (pos, None)
+        if start > pos:
+            f.seek(start)
+            pos = start
+        for line in f:
+            if end is not None and pos >= end:
+                break
+            pos += len(line)
+            yield line.decode("utf-8")
+
+
+def iter_csv_rows(path: str | Path, byte_range: Optional[Tuple[int, int]] = None) -> Iterator[List[str]]:
+    """Linhas do CSV como listas de str, cabeçalho primeiro (sempre o do arquivo)."""
+    return csv.reader(_iter_lines(path, byte_range))
+
+
+def split_byte_ranges(path: str | Path, parts: int) -> List[Tuple[int, int]]:
+    """
+    Divide o corpo do CSV (sem o cabeçalho) em até `parts` intervalos de bytes
+    alinhados ao início de linha. Supõe que nenhum campo contém quebra de linha.
+    """
+    size = os.path.getsize(path)
+    with Path(path).open("rb") as f:
+        f.readline()
+        body_start = f.tell()
+        bounds = [body_start]
+        for k in range(1, max(parts, 1)):
+            target = body_start + (size - body_start) * k // parts
+            if target <= bounds[-1]:
+                continue
+            f.seek(target - 1)
+            f.readline()
+            if f.tell() < size and f.tell() > bounds[-1]:
+                bounds.append(f.tell())
+    bounds.append(size)
+    return [(lo, hi) for lo, hi in zip(bounds, bounds[1:]) if hi > lo]
+
+
+def partition_of(value: str, parts: int) -> int:
+    """Partição estável (igual em qualquer processo) de um valor de texto."""
+    return zlib.crc32(value.encode("utf-8")) % parts
+
+
+def iter_csv_chunks(
+    path: str | Path,
+    chunk_size: int = 50_000,
+    byte_range: Optional[Tuple[int, int]] = None,
+) -> Iterator[TransactionTable]:
+    """
+    Lê o CSV em blocos de até `chunk_size` linhas; só um bloco fica em memória
+    por vez. `byte_range` (de `split_byte_ranges`) restringe a leitura a uma fatia.
+    """
+    reader = iter_csv_rows(path, byte_range)
+    header = next(reader, [])
+    builder = TableBuilder(header)
+    for row in reader:
+        if not row:
+            continue
+        builder.append(row)
+        if len(builder) >= chunk_size:
+            yield builder.build()
+            builder = TableBuilder(header)
+    if len(builder):
+        yield builder.build()
+
+
+def iter_csv_partition(
+    path: str | Path,
+    column: str,
+    part: int,
+    parts: int,
+    chunk_size: int = 50_000,
+) -> Iterator[Tuple[np.ndarray, TransactionTable]]:
+    """
+    Blocos só com as linhas cuja coluna `column` cai na partição `part` de
+    `parts` (ver `partition_of`), junto com o número de cada linha no arquivo.
+    """
+    reader = iter_csv_rows(path)
+    header = next(reader, [])
+    col = header.index(column) if column in header else None
+    builder = TableBuilder(header)
+    numbers = array("q")
+    assigned: Dict[str, bool] = {}
+    for n, row in enumerate(reader):
+        if not row:
+            continue
+        value = row[col] if col is not None and col < len(row) else ""
+        mine = assigned.get(value)
+        if mine is None:
+            mine = assigned[value] = partition_of(value, parts) == part
+        if not mine:
+            continue
+        builder.append(row)
+        numbers.append(n)
+        if len(builder) >= chunk_size:
+            yield np.array(numbers, dtype=np.int64), builder.build()
+            builder = TableBuilder(header)
+            numbers = array("q")
+    if len(builder):
+        yield np.array(numbers, dtype=np.int64), builder.build()
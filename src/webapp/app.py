@@ -1,8 +1,10 @@
 # src/webapp/app.py
+import argparse
+import json
 import os
 import sys
 from dotenv import load_dotenv
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 
 # Caminho para src/
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
@@ -10,51 +12,131 @@ sys.path.insert(0, BASE_DIR)
 
 # Importa Orquestrador
 from agent_orchestrator import TobyOrchestrator
+from llm_pool import get_llm_slots
+from llm_provider import default_provider
 
 # Carrega .env na pasta src/
 load_dotenv(os.path.join(BASE_DIR, ".env"))
 
 API_KEY = os.getenv("GROQ_API_KEY")
-if not API_KEY:
-    raise RuntimeError("GROQ_API_KEY não definida no .env!")
-
-bot = TobyOrchestrator()
 
 # app aponta para o diretório atual (webapp/)
 WEBAPP_DIR = os.path.dirname(__file__)
-app = Flask(__name__, static_folder=WEBAPP_DIR)
-
+DEFAULT_THREADS = 32
 
-@app.route("/")
-def index():
-    return send_from_directory(WEBAPP_DIR, "index.html")
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
-@app.route("/style.css")
-def css():
-    return send_from_directory(WEBAPP_DIR, "style.css")
 
+def _eventos(bot, message: str):
+    """Server-Sent Events: um "delta" por pedaço da resposta e "done" no fim."""
+    try:
+        for delta in bot.stream(message):
+            if delta:
+                yield _sse("delta", {"text": delta})
+        yield _sse("done", {})
+    except Exception as e:
+        yield _sse("error", {"error": f"Erro interno: {e}"})
+
+
+def create_app(bot=None) -> Flask:
+    """
+    Monta o app Flask em volta de um orquestrador compartilhado por todas as
+    requisições. O orquestrador e os agentes só guardam estado imutável depois
+    de construídos (ou protegido por locks), então podem atender várias threads
+    ao mesmo tempo; as chamadas ao LLM passam pelo pool de llm_pool.
+    """
+    if bot is None:
+        if not API_KEY and default_provider() == "groq":
+            raise RuntimeError("GROQ_API_KEY não definida no .env!")
+        # Agentes sobem em background; fraude e conspiração respondem
+        # enquanto o modelo de embeddings ainda carrega.
+        bot = TobyOrchestrator(warm_up=True)
+
+    app = Flask(__name__, static_folder=WEBAPP_DIR)
+
+    @app.route("/")
+    def index():
+        return send_from_directory(WEBAPP_DIR, "index.html")
+
+    @app.route("/style.css")
+    def css():
+        return send_from_directory(WEBAPP_DIR, "style.css")
+
+    @app.route("/chat.js")
+    def js():
+        return send_from_directory(WEBAPP_DIR, "chat.js")
+
+    @app.route("/api/health")
+    def health():
+        speculation = getattr(bot, "speculation_stats", None)
+        return jsonify({
+            "llm": get_llm_slots().snapshot(),
+            "speculation": speculation.snapshot() if speculation else None,
+        })
+
+    @app.route("/api/chat", methods=["POST"])
+    def chat():
+        data = request.get_json() or {}
+        message = data.get("message", "").strip()
+
+        if not message:
+            return jsonify({"error": "Mensagem vazia"}), 400
+
+        # Com "Accept: text/event-stream" a resposta sai em SSE, token a token.
+        if "text/event-stream" in request.headers.get("Accept", ""):
+            return Response(
+                stream_with_context(_eventos(bot, message)),
+                mimetype="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+
+        try:
+            resposta = bot.ask(message)
+            return jsonify({"reply": resposta})
+        except Exception as e:
+            return jsonify({"error": f"Erro interno: {e}"}), 500
+
+    return app
+
+
+def serve(app: Flask, host: str = "127.0.0.1", port: int = 5000, threads: int = DEFAULT_THREADS) -> None:
+    """
+    Servidor de produção multi-thread: waitress quando instalado, senão o
+    servidor threaded do Werkzeug. Cada requisição ocupa uma thread enquanto
+    espera o LLM; quantas chamadas vão ao provedor ao mesmo tempo é
+    LLM_MAX_CONCURRENCY.
+    """
+    try:
+        from waitress import serve as waitress_serve
+    except ImportError:
+        waitress_serve = None
 
-@app.route("/chat.js")
-def js():
-    return send_from_directory(WEBAPP_DIR, "chat.js")
+    print(f"Servidor iniciado em http://{host}:{port}")
+    if waitress_serve is not None:
+        waitress_serve(app, host=host, port=port, threads=threads)
+    else:
+        from werkzeug.serving import run_simple
 
+        run_simple(host, port, app, threaded=True)
 
-@app.route("/api/chat", methods=["POST"])
-def chat():
-    data = request.get_json() or {}
-    message = data.get("message", "").strip()
 
-    if not message:
-        return jsonify({"error": "Mensagem vazia"}), 400
+def main():
+    parser = argparse.ArgumentParser(description="Webapp do chatbot de auditoria.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=int(os.getenv("WEB_THREADS", DEFAULT_THREADS)))
+    parser.add_argument("--dev", action="store_true", help="servidor de desenvolvimento do Flask (debug, reload)")
+    args = parser.parse_args()
 
-    try:
-        resposta = bot.ask(message)
-        return jsonify({"reply": resposta})
-    except Exception as e:
-        return jsonify({"error": f"Erro interno: {e}"}), 500
+    app = create_app()
+    if args.dev:
+        print(f"Servidor iniciado em http://{args.host}:{args.port}")
+        app.run(host=args.host, port=args.port, debug=True, threaded=True)
+    else:
+        serve(app, args.host, args.port, args.threads)
 
 
 if __name__ == "__main__":
-    print("Servidor iniciado em http://127.0.0.1:5000")
-    app.run(host="127.0.0.1", port=5000, debug=True)
+    main()
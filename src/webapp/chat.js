@@ -18,6 +18,7 @@ document.addEventListener("DOMContentLoaded", () => {
     messages.appendChild(div);
     // rolar a página inteira até o elemento (já que o scroll é da página)
     div.scrollIntoView({ behavior: "smooth", block: "end" });
+    return div;
   }
 
   // adiciona um indicador simples de "aguarde"
@@ -27,6 +28,46 @@ document.addEventListener("DOMContentLoaded", () => {
     else sendBtn.style.opacity = "1";
   }
 
+  // re-renderiza o Markdown acumulado no máximo uma vez por frame
+  function streamInto(div) {
+    let text = "";
+    let pending = false;
+    return (delta) => {
+      text += delta;
+      if (pending) return;
+      pending = true;
+      requestAnimationFrame(() => {
+        pending = false;
+        div.innerHTML = marked.parse(text);
+        div.scrollIntoView({ block: "end" });
+      });
+    };
+  }
+
+  // lê a resposta SSE (event: delta | done | error) e repassa cada evento
+  async function readEvents(res, onEvent) {
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let sep;
+      while ((sep = buffer.indexOf("\n\n")) >= 0) {
+        const raw = buffer.slice(0, sep);
+        buffer = buffer.slice(sep + 2);
+        let event = "message";
+        let data = "";
+        for (const line of raw.split("\n")) {
+          if (line.startsWith("event:")) event = line.slice(6).trim();
+          else if (line.startsWith("data:")) data += line.slice(5).trim();
+        }
+        onEvent(event, data ? JSON.parse(data) : {});
+      }
+    }
+  }
+
   async function sendMessage() {
     const text = input.value.trim();
     if (!text) return;
@@ -41,20 +82,33 @@ document.addEventListener("DOMContentLoaded", () => {
     try {
       const res = await fetch("/api/chat", {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
+        headers: { "Content-Type": "application/json", "Accept": "text/event-stream" },
         body: JSON.stringify({ message: text })
       });
 
-      const data = await res.json();
-
-      if (res.ok && data.reply) {
-        addMessage("bot", data.reply);
-      } else {
-        // mostra erro vindo do backend ou do parsing
-        const err = data.error || "Resposta inválida do servidor";
-        addMessage("bot", `**Erro:** ${err}`);
-        console.error("Resposta inválida:", data);
+      const type = res.headers.get("Content-Type") || "";
+      if (!res.ok || !type.startsWith("text/event-stream")) {
+        // erro de validação (JSON) ou servidor sem streaming
+        const data = await res.json();
+        if (res.ok && data.reply) {
+          addMessage("bot", data.reply);
+        } else {
+          const err = data.error || "Resposta inválida do servidor";
+          addMessage("bot", `**Erro:** ${err}`);
+          console.error("Resposta inválida:", data);
+        }
+        return;
       }
+
+      const div = addMessage("bot", "");
+      const append = streamInto(div);
+      await readEvents(res, (event, data) => {
+        if (event === "delta") append(data.text);
+        else if (event === "error") {
+          append(`\n\n**Erro:** ${data.error}`);
+          console.error("Erro no stream:", data);
+        }
+      });
     } catch (err) {
       addMessage("bot", `**Erro de rede:** ${err.message}`);
       console.error("Erro fetch:", err);
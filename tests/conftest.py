@@ -0,0 +1,44 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Os módulos ficam soltos em src/ (como quando se roda `cd src && python ...`).
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+
+
+@pytest.fixture(scope="session")
+def sem_ordem():
+    """Torna achados comparáveis sem depender da ordem em que saíram."""
+
+    def normalizar(achados):
+        return sorted(json.dumps(a, sort_keys=True, ensure_ascii=False) for a in achados)
+
+    return normalizar
+
+
+@pytest.fixture(scope="session")
+def ledger(tmp_path_factory) -> Path:
+    """
+    Ledger sintético (linhas do CSV real reamostradas) com poucos funcionários
+    e dias, para que haja fracionamento além das quebras diretas e de contexto.
+    """
+    from synthetic_ledger import synthetic_ledger
+
+    path = tmp_path_factory.mktemp("ledger") / "transacoes.csv"
+    synthetic_ledger(path, 3000, employees=40, days=60)
+    return path
+
+
+@pytest.fixture(scope="session")
+def auditoria_completa(ledger, tmp_path_factory) -> dict:
+    """Relatório de referência: executar_auditoria com o ledger todo em memória."""
+    from agent_fraud_detection import FraudDetectionAgent
+
+    findings = tmp_path_factory.mktemp("findings") / "findings.sqlite3"
+    report = FraudDetectionAgent(ledger, findings_path=findings).executar_auditoria()
+    assert report["contextual_flags"]
+    assert any("fracionamento" in f.get("regras", ()) for f in report["direct_violations"])
+    return report
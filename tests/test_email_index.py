@@ -0,0 +1,24 @@
+import pytest
+
+from agent_conspiracy import EmailIndex
+
+REMETENTES = {
+    "michael": {0},
+    "michael scott <michael.scott@dundermifflin.com>": {1, 2},
+    "dwight schrute <dwight.schrute@dundermifflin.com>": {3},
+}
+
+
+@pytest.mark.parametrize(
+    "nome, esperado",
+    [
+        ("michael", {0, 1, 2}),
+        ("Michael Scott", {1, 2}),
+        ("dwight", {3}),
+        ("dundermifflin", {1, 2, 3}),
+        ("angela", set()),
+        ("", set()),
+    ],
+)
+def test_busca_parcial_por_pessoa(nome, esperado):
+    assert EmailIndex._lookup(REMETENTES, nome) == esperado
@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+from agent_fraud_detection import FraudDetectionAgent
+from findings_query import interpretar_consulta
+from findings_store import CONTEXTUAL, DIRECT, STRUCTURING, FindingsQuery
+
+NOMES = ["Dwight Schrute", "Michael Scott", "Pam Beesly"]
+ANOS = [2008]
+ANO_TODO = (("2008-01-01", "2008-12-31"),)
+
+
+@pytest.mark.parametrize(
+    "mensagem, esperado",
+    [
+        (
+            "quebras do Dwight acima de 500 em abril",
+            FindingsQuery(
+                funcionarios=("Dwight Schrute",), periodos=(("2008-04-01", "2008-04-30"),), valor_acima_de=500.0
+            ),
+        ),
+        ("gastos entre 100 e 1.000,50", FindingsQuery(valor_acima_de=100.0, valor_ate=1000.5)),
+        ("compras de até US$ 49.50", FindingsQuery(valor_ate=49.5)),
+        ("quebras simples em 2008", FindingsQuery(periodos=ANO_TODO, tipos=(DIRECT, STRUCTURING))),
+        ("fraudes com e-mail do Michael", FindingsQuery(funcionarios=("Michael Scott",), tipos=(CONTEXTUAL,))),
+        ("quebras complexas", FindingsQuery(tipos=(CONTEXTUAL,))),
+        (
+            "fracionamento em 03/2008",
+            FindingsQuery(periodos=(("2008-03-01", "2008-03-31"),), regras=("fracionamento",)),
+        ),
+        (
+            "transações da Pam em 2008-02",
+            FindingsQuery(funcionarios=("Pam Beesly",), periodos=(("2008-02-01", "2008-02-29"),)),
+        ),
+        ("gastos no Hooters", FindingsQuery(regras=("hooters",))),
+        ("compras de katana", FindingsQuery(regras=("armamento_itens_taticos_proibidos",))),
+        ("mostrar tudo", FindingsQuery()),
+    ],
+)
+def test_interpretar_consulta(mensagem, esperado):
+    assert interpretar_consulta(mensagem, NOMES, ANOS) == esperado
+
+
+@pytest.mark.parametrize("mensagem", ["mostrar tudo", "quebras simples", "quebras complexas"])
+def test_sem_filtros(mensagem):
+    assert not interpretar_consulta(mensagem, NOMES, ANOS).tem_filtros()
+
+
+def test_ano_da_mensagem_vale_mesmo_fora_dos_disponiveis():
+    assert interpretar_consulta("quebras em 2009", NOMES, ANOS).periodos == (("2009-01-01", "2009-12-31"),)
+
+
+def test_agente_interpreta_sem_auditar(tmp_path):
+    agente = FraudDetectionAgent(findings_path=tmp_path / "findings.sqlite3")
+    consulta = agente.interpretar_consulta("quebras do Dwight em 2008")
+    assert consulta.funcionarios == ("Dwight Schrute",)
+    assert consulta.periodos == ANO_TODO
+    assert agente._store is None
+
+
+def test_calculo_frio_nao_trava_o_cache(tmp_path):
+    agente = FraudDetectionAgent(findings_path=tmp_path / "findings.sqlite3")
+    relatorio = agente.relatorio_quebras_diretas()
+    liberar, iniciou = threading.Event(), threading.Event()
+
+    def lento():
+        iniciou.set()
+        liberar.wait(10)
+        return "pronto"
+
+    fria = threading.Thread(target=agente._memo, args=("lento", lento))
+    fria.start()
+    try:
+        assert iniciou.wait(5)
+        inicio = time.perf_counter()
+        assert agente.relatorio_quebras_diretas() == relatorio
+        assert agente.interpretar_consulta("quebras do Dwight").funcionarios == ("Dwight Schrute",)
+        assert time.perf_counter() - inicio < 5
+    finally:
+        liberar.set()
+        fria.join()
+    assert agente._memo("lento", lambda: "outro") == "pronto"
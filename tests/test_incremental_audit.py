@@ -0,0 +1,64 @@
+import pytest
+
+from agent_fraud_detection import FraudDetectionAgent
+from findings_store import FindingsStore
+from incremental_audit import auditar_incremental
+
+
+@pytest.fixture
+def linhas(ledger):
+    cabecalho, *corpo = ledger.read_text(encoding="utf-8").splitlines(keepends=True)
+    return cabecalho, corpo
+
+
+def auditar(path, store_path):
+    agente = FraudDetectionAgent(path, carregar_transacoes=False)
+    store = FindingsStore(store_path)
+    return agente, store, auditar_incremental(agente, store, chunk_size=300)
+
+
+def test_apendices_igual_a_auditoria_completa(linhas, auditoria_completa, tmp_path):
+    cabecalho, corpo = linhas
+    path, store_path = tmp_path / "transacoes.csv", tmp_path / "inc.sqlite3"
+    path.write_text(cabecalho, encoding="utf-8")
+
+    novas = 0
+    for inicio, fim in [(0, 1000), (1000, 2199), (2199, len(corpo))]:
+        with path.open("a", encoding="utf-8") as f:
+            f.writelines(corpo[inicio:fim])
+        agente, store, resumo = auditar(path, store_path)
+        assert not resumo["reprocessado"]
+        novas += resumo["transacoes_novas"]
+    assert novas == len(corpo)
+
+    report = store.relatorio(str(agente.policy_path))
+    assert report["direct_violations"] == auditoria_completa["direct_violations"]
+    assert report["contextual_flags"] == auditoria_completa["contextual_flags"]
+
+    _, _, resumo = auditar(path, store_path)
+    assert resumo["transacoes_novas"] == 0
+    assert resumo["achados_novos"] == 0
+
+
+def test_linha_incompleta_fica_para_a_proxima(linhas, tmp_path):
+    cabecalho, corpo = linhas
+    path, store_path = tmp_path / "transacoes.csv", tmp_path / "inc.sqlite3"
+    ultima = corpo[10]
+    path.write_text(cabecalho + "".join(corpo[:10]) + ultima[:5], encoding="utf-8")
+    assert auditar(path, store_path)[2]["transacoes_novas"] == 10
+
+    with path.open("a", encoding="utf-8") as f:
+        f.write(ultima[5:])
+    assert auditar(path, store_path)[2]["transacoes_novas"] == 1
+
+
+def test_arquivo_reescrito_reprocessa(linhas, tmp_path):
+    cabecalho, corpo = linhas
+    path, store_path = tmp_path / "transacoes.csv", tmp_path / "inc.sqlite3"
+    path.write_text(cabecalho + "".join(corpo[:50]), encoding="utf-8")
+    auditar(path, store_path)
+
+    path.write_text(cabecalho + "".join(corpo[100:120]), encoding="utf-8")
+    resumo = auditar(path, store_path)[2]
+    assert resumo["reprocessado"]
+    assert resumo["transacoes_novas"] == 20
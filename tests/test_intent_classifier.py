@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from agent_fraud_detection import FraudChatRouter
+from agent_orchestrator import TobyOrchestrator
+from intent_classifier import DEFAULT_THRESHOLD, EXAMPLES_DIR, LocalIntentClassifier
+
+
+def sem_llm(text: str) -> str:
+    raise AssertionError(f"a mensagem não deveria ir para o LLM: {text!r}")
+
+
+@pytest.fixture(scope="module")
+def orquestrador() -> LocalIntentClassifier:
+    return LocalIntentClassifier.from_file(EXAMPLES_DIR / "orchestrator.jsonl", threshold=DEFAULT_THRESHOLD)
+
+
+@pytest.fixture(scope="module")
+def fraude() -> LocalIntentClassifier:
+    return LocalIntentClassifier.from_file(EXAMPLES_DIR / "fraud.jsonl", threshold=DEFAULT_THRESHOLD)
+
+
+# Mensagens que não estão nos exemplos, com a rota esperada.
+@pytest.mark.parametrize(
+    "mensagem, intencao",
+    [
+        ("Qual a regra para reembolso de almoço com cliente?", "policy"),
+        ("Existe limite para presentes de fornecedores?", "policy"),
+        ("O Dwight está tramando contra o Toby?", "conspiracy"),
+        ("Tem e-mail do Michael falando mal do Toby?", "conspiracy"),
+        ("Mostre o relatório completo de auditoria", "fraud_all"),
+        ("Quais transações violam a política sozinhas?", "fraud_simple"),
+        ("Quais fraudes só aparecem cruzando com os e-mails?", "fraud_complex"),
+        ("qual a previsão do tempo?", "other"),
+        ("me ajuda", "other"),
+    ],
+)
+def test_orquestrador_roteia_sem_llm(orquestrador, mensagem, intencao):
+    assert orquestrador.classify(mensagem, sem_llm) == intencao
+
+
+@pytest.mark.parametrize(
+    "mensagem, intencao",
+    [
+        ("Mostre o relatório completo de auditoria", "all"),
+        ("Quais transações violam a política sozinhas?", "simple"),
+        ("Quais fraudes só aparecem cruzando com os e-mails?", "complex"),
+        ("olá, tudo bem?", "greeting"),
+        ("me ajuda", "help"),
+        ("qual a previsão do tempo?", "unknown"),
+    ],
+)
+def test_fraude_roteia_sem_llm(fraude, mensagem, intencao):
+    assert fraude.classify(mensagem, sem_llm) == intencao
+
+
+@pytest.mark.parametrize("mensagem", ["asdf", "O Dwight está tramando contra o Toby?"])
+def test_baixa_confianca_vai_para_o_llm(fraude, mensagem):
+    assert fraude.predict(mensagem).confidence < fraude.threshold
+    antes = fraude.stats.snapshot()["fallback"]
+    assert fraude.classify(mensagem, lambda text: "llm") == "llm"
+    assert fraude.stats.snapshot()["fallback"] == antes + 1
+
+
+def test_aclassify_decide_como_classify(orquestrador):
+    async def llm(text: str) -> str:
+        return "llm"
+
+    for mensagem in ("Existe limite para presentes de fornecedores?", "asdf"):
+        esperado = orquestrador.classify(mensagem, lambda text: "llm")
+        assert asyncio.run(orquestrador.aclassify(mensagem, llm)) == esperado
+
+
+@pytest.mark.parametrize(
+    "mensagem, intencao",
+    [
+        ("Existe conspiração contra o Toby?", "conspiracy"),
+        ("O Toby aparece em algum email?", "conspiracy"),
+        ("Quero as quebras de compliance simples", "fraud_simple"),
+        ("fraude direta do Dwight", "fraud_simple"),
+        ("quebras complexas com contexto", "fraud_complex"),
+        ("compliance: o que cruza com email?", "fraud_complex"),
+        ("Quero o relatório completo de fraudes", None),
+        ("Qual o limite de gastos?", None),
+    ],
+)
+def test_regras_por_palavra_do_orquestrador(mensagem, intencao):
+    assert TobyOrchestrator._keyword_intent(mensagem) == intencao
+
+
+@pytest.mark.parametrize(
+    "mensagem, intencao",
+    [
+        ("quebras simples", "simple"),
+        ("fraude direta", "simple"),
+        ("compliance com contexto de email", "complex"),
+        ("quebras", None),
+        ("oi", None),
+    ],
+)
+def test_regras_por_palavra_da_fraude(mensagem, intencao):
+    assert FraudChatRouter._classificar_por_palavras(mensagem) == intencao
@@ -0,0 +1,40 @@
+import pytest
+
+from parallel_audit import auditar_em_paralelo, particionar
+from transaction_table import iter_csv_rows, split_byte_ranges
+
+
+@pytest.mark.parametrize("particao", ["bytes", "funcionario"])
+@pytest.mark.parametrize("workers", [1, 3])
+def test_paralelo_igual_a_completa(ledger, auditoria_completa, particao, workers):
+    report = auditar_em_paralelo([ledger], workers=workers, particao=particao, chunk_size=337)
+    assert report["direct_violations"] == auditoria_completa["direct_violations"]
+    assert report["contextual_flags"] == auditoria_completa["contextual_flags"]
+
+
+@pytest.mark.parametrize("particao", ["bytes", "funcionario"])
+def test_varios_arquivos_igual_ao_ledger_concatenado(ledger, auditoria_completa, particao, tmp_path):
+    cabecalho, *linhas = ledger.read_text(encoding="utf-8").splitlines(keepends=True)
+    partes = [tmp_path / "a.csv", tmp_path / "b.csv"]
+    partes[0].write_text(cabecalho + "".join(linhas[:1234]), encoding="utf-8")
+    partes[1].write_text(cabecalho + "".join(linhas[1234:]), encoding="utf-8")
+
+    report = auditar_em_paralelo(partes, workers=2, particao=particao, chunk_size=500)
+    assert report["direct_violations"] == auditoria_completa["direct_violations"]
+    assert report["contextual_flags"] == auditoria_completa["contextual_flags"]
+
+
+@pytest.mark.parametrize("partes", [1, 2, 5, 64])
+def test_faixas_de_bytes_cobrem_o_arquivo_sem_sobrepor(ledger, partes):
+    faixas = split_byte_ranges(ledger, partes)
+    assert all(lo < hi for lo, hi in faixas)
+    assert all(a[1] == b[0] for a, b in zip(faixas, faixas[1:]))
+    assert faixas[-1][1] == ledger.stat().st_size
+
+    total = sum(sum(1 for _ in iter_csv_rows(ledger, faixa)) - 1 for faixa in faixas)
+    assert total == sum(1 for _ in iter_csv_rows(ledger)) - 1
+
+
+def test_particao_desconhecida(ledger):
+    with pytest.raises(ValueError):
+        particionar([ledger], 2, "departamento")
@@ -0,0 +1,44 @@
+import pytest
+
+from agent_fraud_detection import FraudDetectionAgent
+from findings_store import FindingsQuery
+from transaction_table import TransactionTable, iter_csv_chunks
+
+
+@pytest.mark.parametrize("chunk_size", [7, 337, 100_000])
+def test_blocos_reconstroem_o_ledger(ledger, chunk_size):
+    linhas = [row for chunk in iter_csv_chunks(ledger, chunk_size) for row in chunk]
+    assert linhas == list(TransactionTable.from_csv(ledger))
+
+
+@pytest.mark.parametrize("chunk_size", [7, 337, 100_000])
+def test_auditoria_em_fluxo_igual_a_completa(ledger, auditoria_completa, sem_ordem, chunk_size, tmp_path):
+    agente = FraudDetectionAgent(ledger, carregar_transacoes=False, findings_path=tmp_path / "findings.sqlite3")
+    report = {"direct_violations": [], "contextual_flags": []}
+    for tipo, achado in agente.auditar_em_fluxo(ledger, chunk_size=chunk_size):
+        report[tipo].append(achado)
+
+    assert report["direct_violations"] == auditoria_completa["direct_violations"]
+    # Em fluxo as flags saem bloco a bloco; na auditoria completa, regra a regra.
+    assert sem_ordem(report["contextual_flags"]) == sem_ordem(auditoria_completa["contextual_flags"])
+
+
+def test_sem_carregar_transacoes_audita_em_fluxo(ledger, auditoria_completa, sem_ordem, tmp_path):
+    agente = FraudDetectionAgent(ledger, carregar_transacoes=False, findings_path=tmp_path / "findings.sqlite3")
+    report = agente.executar_auditoria()
+    assert len(agente.transactions) == 0
+    assert report["direct_violations"] == auditoria_completa["direct_violations"]
+    assert sem_ordem(report["contextual_flags"]) == sem_ordem(auditoria_completa["contextual_flags"])
+
+
+def test_store_compartilhado_entre_modos(ledger, auditoria_completa, tmp_path):
+    findings = tmp_path / "findings.sqlite3"
+    total = len(auditoria_completa["direct_violations"]) + len(auditoria_completa["contextual_flags"])
+
+    em_fluxo = FraudDetectionAgent(ledger, carregar_transacoes=False, findings_path=findings)
+    assert len(em_fluxo.consultar_achados(FindingsQuery())) == total
+    assert em_fluxo.findings_store().estado("auditoria")["carregar_transacoes"] is False
+
+    em_memoria = FraudDetectionAgent(ledger, findings_path=findings)
+    assert len(em_memoria.consultar_achados(FindingsQuery())) == total
+    assert em_memoria.findings_store().estado("auditoria")["carregar_transacoes"] is True